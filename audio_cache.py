@@ -0,0 +1,103 @@
+"""
+Caché LRU en memoria de los archivos de audio más reproducidos
+
+Guarda los bytes de cada canción indexados por (ID, mtime) para que las
+sintonías y cortinillas que suenan cientos de veces al día se carguen desde
+memoria en vez de desde disco (tarjetas SD lentas). El tamaño total está
+acotado: al superarlo se descartan las canciones usadas hace más tiempo.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class AudioCache:
+    """
+    Caché LRU de buffers de audio
+
+    Args:
+        max_bytes: tamaño máximo total de la caché
+        max_item_bytes: los archivos mayores que esto no se guardan
+            (por defecto, una cuarta parte de la caché)
+    """
+
+    def __init__(self, max_bytes: int, max_item_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes or max_bytes // 4
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # song_id -> (mtime, bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def open(self, song_id: str, path: str, mtime: Optional[float] = None) -> io.BytesIO:
+        """
+        Devuelve un objeto tipo archivo con el audio de la canción
+
+        Si la versión en caché corresponde al mismo mtime se sirve desde
+        memoria; si no, se lee el archivo una vez y se guarda.
+        """
+        if mtime is None:
+            mtime = os.path.getmtime(path)
+
+        with self._lock:
+            entry = self._entries.get(song_id)
+            if entry and entry[0] == mtime:
+                self._entries.move_to_end(song_id)
+                self.hits += 1
+                return io.BytesIO(entry[1])
+            self.misses += 1
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        with self._lock:
+            self._store(song_id, mtime, data)
+        return io.BytesIO(data)
+
+    def _store(self, song_id: str, mtime: float, data: bytes):
+        old = self._entries.pop(song_id, None)
+        if old:
+            self._size -= len(old[1])
+        if len(data) > self.max_item_bytes:
+            return
+        self._entries[song_id] = (mtime, data)
+        self._size += len(data)
+        while self._size > self.max_bytes and self._entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self, song_id: str):
+        """Elimina una canción de la caché (por ejemplo, al borrarla)"""
+        with self._lock:
+            old = self._entries.pop(song_id, None)
+            if old:
+                self._size -= len(old[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Devuelve los contadores de la caché"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "items": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def get_formatted_stats(self) -> str:
+        stats = self.get_stats()
+        total = stats["hits"] + stats["misses"]
+        hit_rate = 100 * stats["hits"] / total if total else 0
+        return (f"Audio cache: {stats['hits']} hits / {stats['misses']} misses ({hit_rate:.0f}%), "
+                f"{stats['items']} songs, {stats['bytes'] / 1048576:.1f}/{stats['max_bytes'] / 1048576:.0f} MB")
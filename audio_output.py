@@ -0,0 +1,440 @@
+"""
+Salidas de audio para las zonas de reproducción
+
+El reproductor principal usa pygame.mixer.music, que es un único flujo por
+proceso. Cada zona adicional necesita su propia salida con la misma interfaz
+que usa MusicPlayer (load, play, stop, pause, unpause, set_volume, get_busy):
+
+    NullOutput     no suena; avanza el tiempo de la canción con un reloj, a
+                   tiempo real o acelerado (pruebas sin tarjeta de sonido,
+                   benchmarks, o una zona sin altavoces)
+    WavOutput      escribe lo que suena en un archivo WAV, tan rápido como
+                   ffmpeg decodifica (renderizar una sesión sin audio)
+    DeviceOutput   un dispositivo de audio concreto, abierto con SDL2
+                   (pygame._sdl2.audio); ffmpeg decodifica la canción a PCM y
+                   el dispositivo la pide por bloques desde su propio hilo
+
+Las salidas pueden declarar time_source (el reloj con el que MusicPlayer mide
+la posición y el tiempo escuchado) y poll_interval (cada cuántos segundos
+reales comprueba si la canción terminó); sin ellos se usan time.monotonic y 1 s.
+
+open_output() crea la salida a partir de la especificación que se escribe en
+el comando zone o en AUDIO_OUTPUT (config.py): "null", "null:<velocidad>",
+"wav:<ruta>" o "device:<nombre>".
+"""
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import wave
+from array import array
+from typing import Callable, List, Optional
+
+from mp3_index import Mp3FrameIndex
+from playback_clock import PlaybackClock, scaled_time
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+CHUNK_FRAMES = 1024
+NULL_PREFIX = "null:"
+WAV_PREFIX = "wav:"
+DEVICE_PREFIX = "device:"
+
+
+def _read_source(source) -> bytes:
+    """Contenido de lo que recibe load(): ruta o archivo en memoria"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()
+    return source.read()
+
+
+def scale_pcm(pcm: bytes, volume: float) -> bytes:
+    """Aplica el volumen (0.0 - 1.0) a PCM s16le"""
+    if volume >= 1.0:
+        return pcm
+    if volume <= 0.0:
+        return bytes(len(pcm))
+    samples = array("h")
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    if sys.byteorder != "little":
+        samples.byteswap()
+    scaled = array("h", [int(sample * volume) for sample in samples])
+    if sys.byteorder != "little":
+        scaled.byteswap()
+    return scaled.tobytes()
+
+
+def _start_decoder(source, frequency: int, channels: int, start: float = 0.0) -> subprocess.Popen:
+    """ffmpeg decodifica source (ruta o archivo en memoria) desde start segundos a PCM s16le por su salida estándar"""
+    from_memory = not isinstance(source, (str, os.PathLike))
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error']
+    if not from_memory:
+        command.append('-nostdin')
+    if start > 0:
+        command += ['-ss', f"{start:.3f}"]
+    command += ['-i', 'pipe:0' if from_memory else os.fspath(source),
+                '-f', 's16le', '-acodec', 'pcm_s16le', '-ar', str(frequency), '-ac', str(channels), '-']
+    decoder = subprocess.Popen(command, stdin=subprocess.PIPE if from_memory else subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if from_memory:
+        data = _read_source(source)
+
+        def feed():
+            try:
+                decoder.stdin.write(data)
+                decoder.stdin.close()
+            except (BrokenPipeError, OSError, ValueError):
+                pass
+
+        threading.Thread(target=feed, daemon=True).start()
+    return decoder
+
+
+def _stop_decoder(decoder: Optional[subprocess.Popen]):
+    if decoder is not None:
+        decoder.kill()
+        decoder.wait()
+        decoder.stdout.close()
+
+
+class NullOutput:
+    """
+    Salida sin sonido con la interfaz de pygame.mixer.music
+
+    load() mide la duración de la canción con el índice de tramas MP3 y
+    get_busy() es verdadero hasta que el reloj llega a esa duración, así que
+    el fin de canción y el paso a la siguiente funcionan igual que con audio.
+
+    Args:
+        time_source: reloj base (time.monotonic)
+        speed: cuántas veces más rápido que el tiempo real avanza la canción
+    """
+
+    supports_crossfade = False
+
+    def __init__(self, time_source: Callable[[], float] = time.monotonic, speed: float = 1.0):
+        self.speed = float(speed)
+        self.time_source = scaled_time(self.speed, time_source) if self.speed != 1.0 else time_source
+        # El fin de canción se comprueba una vez por segundo de canción
+        self.poll_interval = 1.0 / self.speed
+        self._clock = PlaybackClock(self.time_source)
+        self.duration = 0.0
+        self.volume = 1.0
+        self.loads = 0
+
+    def load(self, source, namehint: str = ""):
+        self._clock.stop()
+        self.duration = Mp3FrameIndex.from_bytes(_read_source(source)).duration
+        self.loads += 1
+
+    def play(self, loops: int = 0, start: float = 0.0, fade_ms: int = 0):
+        self._clock.start(start)
+
+    def stop(self):
+        self._clock.stop()
+
+    def pause(self):
+        self._clock.pause()
+
+    def unpause(self):
+        self._clock.resume()
+
+    def set_volume(self, volume: float):
+        self.volume = max(0.0, min(1.0, float(volume)))
+
+    def get_volume(self) -> float:
+        return self.volume
+
+    def get_busy(self) -> bool:
+        clock = self._clock
+        return clock.running and not clock.paused and clock.position < self.duration
+
+    def close(self):
+        self.stop()
+
+    def describe(self) -> str:
+        return "null" if self.speed == 1.0 else f"{NULL_PREFIX}{self.speed:g}"
+
+
+class WavOutput:
+    """
+    Salida a un archivo WAV: cada canción se decodifica con ffmpeg y se añade al archivo
+
+    Sin esperar al tiempo real: una lista se renderiza tan rápido como
+    decodifica ffmpeg. stop() o cargar otra canción cortan la actual donde
+    iba (un salto se oye en el archivo igual que en los altavoces) y la pausa
+    detiene la escritura hasta unpause(). Su reloj (time_source) son los
+    segundos de audio escritos, así que la posición, el historial y las
+    estadísticas cuentan la duración de lo renderizado, no el tiempo real.
+
+    Args:
+        path: archivo WAV de salida (se sobrescribe)
+    """
+
+    supports_crossfade = False
+    poll_interval = 0.01
+
+    def __init__(self, path: str, frequency: int = SAMPLE_RATE, channels: int = CHANNELS,
+                 chunk_frames: int = CHUNK_FRAMES):
+        self.path = path
+        self.frequency = frequency
+        self.channels = channels
+        self.chunk_frames = chunk_frames
+        self.volume = 1.0
+        self.frames_written = 0
+        self._lock = threading.Lock()
+        self._writer: Optional[wave.Wave_write] = None
+        self._source = None
+        self._decoder: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._running = threading.Event()  # despejado mientras está en pausa
+        self._running.set()
+
+    def _open_writer(self) -> wave.Wave_write:
+        if self._writer is None:
+            writer = wave.open(self.path, "wb")
+            writer.setnchannels(self.channels)
+            writer.setsampwidth(2)
+            writer.setframerate(self.frequency)
+            self._writer = writer
+        return self._writer
+
+    def _render(self, decoder: subprocess.Popen, stopped: threading.Event):
+        """Hilo de escritura: PCM del decodificador -> archivo, bloque a bloque"""
+        block = self.chunk_frames * self.channels * 2
+        while not stopped.is_set():
+            self._running.wait()
+            data = decoder.stdout.read(block)
+            if not data:
+                break
+            with self._lock:
+                if stopped.is_set():
+                    break
+                data = scale_pcm(data, self.volume)
+                self._writer.writeframes(data)
+                self.frames_written += len(data) // (self.channels * 2)
+
+    def _cut(self):
+        """Corta la canción en curso (el hilo de escritura termina)"""
+        self._stopped.set()
+        self._running.set()
+        decoder, self._decoder = self._decoder, None
+        thread, self._thread = self._thread, None
+        if decoder is not None:
+            decoder.kill()  # la lectura pendiente del hilo termina con fin de datos
+        if thread is not None:
+            thread.join()
+        _stop_decoder(decoder)
+
+    @property
+    def rendered_seconds(self) -> float:
+        return self.frames_written / self.frequency
+
+    def time_source(self) -> float:
+        """Reloj de la salida: avanza con cada bloque escrito en el archivo"""
+        return self.frames_written / self.frequency
+
+    def load(self, source, namehint: str = ""):
+        self._cut()
+        self._source = source
+
+    def play(self, loops: int = 0, start: float = 0.0, fade_ms: int = 0):
+        self._cut()
+        if self._source is None:
+            return
+        if not isinstance(self._source, (str, os.PathLike)):
+            self._source.seek(0)
+        self._open_writer()
+        self._stopped = threading.Event()
+        self._running.set()
+        self._decoder = _start_decoder(self._source, self.frequency, self.channels, start)
+        self._thread = threading.Thread(target=self._render, args=(self._decoder, self._stopped), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._cut()
+
+    def pause(self):
+        self._running.clear()
+
+    def unpause(self):
+        self._running.set()
+
+    def set_volume(self, volume: float):
+        self.volume = max(0.0, min(1.0, float(volume)))
+
+    def get_volume(self) -> float:
+        return self.volume
+
+    def get_busy(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive() and self._running.is_set()
+
+    def close(self):
+        self._cut()
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def describe(self) -> str:
+        return f"{WAV_PREFIX}{self.path}"
+
+
+class DeviceOutput:
+    """
+    Salida a un dispositivo de audio concreto (SDL2), independiente de mixer.music
+
+    Args:
+        device_name: nombre del dispositivo (ver list_devices()); None para el predeterminado
+    """
+
+    supports_crossfade = False
+
+    def __init__(self, device_name: Optional[str], frequency: int = SAMPLE_RATE, channels: int = CHANNELS,
+                 chunk_frames: int = CHUNK_FRAMES):
+        self.device_name = device_name
+        self.frequency = frequency
+        self.channels = channels
+        self.chunk_frames = chunk_frames
+        self.volume = 1.0
+        self._lock = threading.Lock()
+        self._device = None
+        self._source = None
+        self._decoder: Optional[subprocess.Popen] = None
+        self._playing = False
+        self._paused = False
+        self._finished = False
+
+    def _open_device(self):
+        if self._device is not None:
+            return self._device
+        import pygame
+        from pygame._sdl2 import audio as sdl2_audio
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()  # inicializa el subsistema de audio de SDL
+        self._device = sdl2_audio.AudioDevice(
+            devicename=self.device_name,
+            iscapture=False,
+            frequency=self.frequency,
+            audioformat=sdl2_audio.AUDIO_S16,
+            numchannels=self.channels,
+            chunksize=self.chunk_frames,
+            allowed_changes=0,
+            callback=self._fill,
+        )
+        return self._device
+
+    def _fill(self, device, stream):
+        """Callback de SDL: rellena el bloque que pide el dispositivo"""
+        size = len(stream)
+        data = b""
+        with self._lock:
+            if self._playing and not self._paused and not self._finished and self._decoder is not None:
+                data = self._decoder.stdout.read(size)
+                if len(data) < size:
+                    self._finished = True
+            volume = self.volume
+        data = scale_pcm(data, volume) + bytes(size - len(data))
+        stream[:] = data
+
+    def load(self, source, namehint: str = ""):
+        with self._lock:
+            _stop_decoder(self._decoder)
+            self._decoder = None
+            self._source = source
+            self._playing = False
+            self._finished = False
+
+    def play(self, loops: int = 0, start: float = 0.0, fade_ms: int = 0):
+        device = self._open_device()
+        with self._lock:
+            _stop_decoder(self._decoder)
+            self._decoder = None
+            if self._source is None:
+                return
+            if not isinstance(self._source, (str, os.PathLike)):
+                self._source.seek(0)
+            self._decoder = _start_decoder(self._source, self.frequency, self.channels, start)
+            self._playing = True
+            self._paused = False
+            self._finished = False
+        device.pause(0)
+
+    def stop(self):
+        with self._lock:
+            self._playing = False
+            _stop_decoder(self._decoder)
+            self._decoder = None
+        if self._device is not None:
+            self._device.pause(1)
+
+    def pause(self):
+        with self._lock:
+            self._paused = True
+        if self._device is not None:
+            self._device.pause(1)
+
+    def unpause(self):
+        with self._lock:
+            self._paused = False
+        if self._device is not None:
+            self._device.pause(0)
+
+    def set_volume(self, volume: float):
+        self.volume = max(0.0, min(1.0, float(volume)))
+
+    def get_volume(self) -> float:
+        return self.volume
+
+    def get_busy(self) -> bool:
+        return self._playing and not self._paused and not self._finished
+
+    def close(self):
+        self.stop()
+        if self._device is not None:
+            self._device.close()
+            self._device = None
+
+    def describe(self) -> str:
+        return f"{DEVICE_PREFIX}{self.device_name or 'default'}"
+
+
+def list_devices() -> List[str]:
+    """Nombres de los dispositivos de salida que ve SDL ([] sin pygame 2)"""
+    try:
+        import pygame
+        from pygame._sdl2 import audio as sdl2_audio
+    except ImportError:
+        return []
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    return list(sdl2_audio.get_audio_device_names(False))
+
+
+def open_output(spec: str):
+    """Salida a partir de su especificación: "null", "null:<velocidad>", "wav:<ruta>" o "device:<nombre>" """
+    spec = (spec or "").strip()
+    kind = spec.lower()
+    if kind == "null":
+        return NullOutput()
+    if kind.startswith(NULL_PREFIX):
+        try:
+            speed = float(spec[len(NULL_PREFIX):])
+            if speed <= 0:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"Velocidad no válida en {spec!r} (p. ej. {NULL_PREFIX}60)")
+        return NullOutput(speed=speed)
+    if kind.startswith(WAV_PREFIX) and spec[len(WAV_PREFIX):].strip():
+        return WavOutput(spec[len(WAV_PREFIX):].strip())
+    if kind.startswith(DEVICE_PREFIX):
+        return DeviceOutput(spec[len(DEVICE_PREFIX):].strip() or None)
+    raise ValueError(f"Salida no válida: {spec!r} "
+                     f"(usa null, {NULL_PREFIX}<velocidad>, {WAV_PREFIX}<ruta> o {DEVICE_PREFIX}<nombre>)")
@@ -0,0 +1,176 @@
+"""
+Benchmark del flujo de descarga sin red
+
+Sustituye yt-dlp y Spotify por los backends falsos de fake_backends.py
+(resultados enlatados, MP3 locales, latencia y fallos configurables) y mide
+tres escenarios completos dentro de una biblioteca temporal:
+
+    youtube   MusicPlayer.download_youtube_video con URLs directas
+              (cada fallo hace saltar a la siguiente estrategia)
+    search    MusicPlayer.search_song -> SmartDownloader.download_by_name
+              (en las búsquedas ambiguas se elige el primer resultado)
+    spotify   MusicPlayer.download_spotify_playlist de una lista sintética
+
+Para cada uno se guarda el rendimiento (canciones/min), la latencia por
+canción y por etapa (spotify_api, search, download, download_failed) y el
+coste de los reintentos entre estrategias. Por defecto se incluyen las pausas
+fijas del flujo real (time.sleep tras cada descarga); --no-pauses las quita
+para ver solo el coste del propio flujo.
+
+Uso:
+    python benchmarks/download_pipeline.py [--tracks 20] [--scenarios youtube,search,spotify]
+                                           [--search-latency 0.05] [--download-latency 0.2]
+                                           [--api-latency 0.1] [--failure-rate 0.1]
+                                           [--ambiguous-rate 0.1] [--no-pauses] [--output FILE]
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import fake_backends  # noqa: E402
+
+SCENARIOS = ("youtube", "search", "spotify")
+
+
+def _latency_summary(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {"median_ms": round(statistics.median(values) * 1000, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1)}
+
+
+@contextlib.contextmanager
+def _timed(obj, name, samples):
+    """Sustituye obj.name por una versión que anota cuánto tarda cada llamada"""
+    original = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+
+    with mock.patch.object(obj, name, wrapper):
+        yield
+
+
+def run_scenario(scenario, config, tracks, pauses=True):
+    """Ejecuta un escenario en una biblioteca vacía y devuelve sus métricas"""
+    root = tempfile.mkdtemp(prefix=f"pymusic-dl-{scenario}-")
+    cwd = os.getcwd()
+    timer = fake_backends.StageTimer()
+    backend = fake_backends.install(config, timer)
+    spotify = fake_backends.FakeSpotify(backend, tracks)
+    per_track = []
+    # Las búsquedas ambiguas piden un número y luego confirmación
+    answers = itertools.cycle(["1", "s"])
+    try:
+        # user_stats.json se crea en el directorio actual: que no toque el del usuario
+        os.chdir(root)
+        patches = [mock.patch("builtins.input", lambda *_: next(answers))]
+        if not pauses:
+            patches.append(mock.patch("time.sleep", lambda _: None))
+        with contextlib.ExitStack() as stack, contextlib.redirect_stdout(io.StringIO()):
+            for patch in patches:
+                stack.enter_context(patch)
+            from main import MusicPlayer
+            player = MusicPlayer(base_dir=root)
+            player._spotify, player._spotify_loaded = spotify, True
+            player.library.sync()
+
+            started = time.perf_counter()
+            if scenario == "youtube":
+                with _timed(player, "download_youtube_video", per_track):
+                    for i in range(tracks):
+                        player.download_youtube_video(f"https://www.youtube.com/watch?v=bench{i:06d}")
+            elif scenario == "search":
+                with _timed(player.downloader, "download_by_name", per_track):
+                    for track in spotify.tracks:
+                        player.search_song(track["name"], track["artists"][0]["name"])
+            else:
+                with _timed(player.downloader, "download_by_name", per_track):
+                    player.download_spotify_playlist("https://open.spotify.com/playlist/bench?si=1")
+            elapsed = time.perf_counter() - started
+            player.library.stop()
+            downloaded = len(player.metadata.data)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+    stages = timer.summary()
+    counters = stages["counters"]
+    failed = stages["stages"].get("download_failed", {})
+    attempts = counters.get("downloads", 0) + counters.get("failed_attempts", 0)
+    return {
+        "scenario": scenario,
+        "tracks": tracks,
+        "downloaded": downloaded,
+        "elapsed_s": round(elapsed, 3),
+        "tracks_per_min": round(downloaded / elapsed * 60, 1) if elapsed else 0,
+        "per_track": _latency_summary(per_track),
+        "stages": stages["stages"],
+        "attempts_per_track": round(attempts / tracks, 2) if tracks else 0,
+        "fallback_cost_s": failed.get("total_s", 0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del flujo de descarga con backends falsos")
+    parser.add_argument("--tracks", type=int, default=20, help="canciones por escenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="escenarios, separados por comas")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="segundos por búsqueda")
+    parser.add_argument("--download-latency", type=float, default=0.2, help="segundos por descarga")
+    parser.add_argument("--api-latency", type=float, default=0.1, help="segundos por llamada a Spotify")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="probabilidad de fallo por intento")
+    parser.add_argument("--ambiguous-rate", type=float, default=0.1, help="probabilidad de búsqueda ambigua")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-pauses", action="store_true", help="quita las pausas fijas (time.sleep) del flujo")
+    parser.add_argument("--output", default="download_pipeline.json", help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(unknown)} (disponibles: {', '.join(SCENARIOS)})")
+
+    config = fake_backends.FakeConfig(search_latency=args.search_latency, download_latency=args.download_latency,
+                                      api_latency=args.api_latency, failure_rate=args.failure_rate,
+                                      ambiguous_rate=args.ambiguous_rate, seed=args.seed)
+    started = time.time()
+    results = {"python": sys.version.split()[0], "timestamp": int(started), "pauses": not args.no_pauses,
+               "config": vars(config), "scenarios": []}
+    for scenario in scenarios:
+        results["scenarios"].append(run_scenario(scenario, config, args.tracks, pauses=not args.no_pauses))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    for result in results["scenarios"]:
+        print(f"\n{result['scenario']}: {result['downloaded']}/{result['tracks']} canciones en "
+              f"{result['elapsed_s']} s ({result['tracks_per_min']} canciones/min)")
+        print(f"  {'por canción':16} {result['per_track'].get('median_ms', '-'):>10} ms "
+              f"(p95 {result['per_track'].get('p95_ms', '-')} ms)")
+        for stage, summary in result["stages"].items():
+            print(f"  {stage:16} {summary['median_ms']:>10} ms (p95 {summary['p95_ms']} ms, {summary['count']}x)")
+        print(f"  intentos por canción {result['attempts_per_track']}, "
+              f"coste de los reintentos {result['fallback_cost_s']} s")
+    print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Sustitutos locales de yt-dlp y Spotify para medir la descarga sin red
+
+FakeYtDlp imita la parte de la API de yt_dlp que usa PyMusic (YoutubeDL como
+gestor de contexto, extract_info, download y los progress_hooks): las búsquedas
+devuelven resultados enlatados generados a partir de la consulta y las
+descargas copian un MP3 local en la ruta de outtmpl. FakeSpotify sirve listas,
+álbumes y canciones sintéticos. Ambos tienen latencia y tasa de fallos
+configurables, y anotan cuánto tarda cada etapa en un StageTimer.
+
+install() registra el módulo falso como yt_dlp en sys.modules; debe llamarse
+antes de importar downloader.
+"""
+import hashlib
+import random
+import statistics
+import sys
+import threading
+import time
+import types
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from library import silent_mp3
+
+# Tiempo de espera real de los backends: no depende de que se parchee time.sleep
+_sleep = time.sleep
+
+_ARTISTS = ["Luna Roja", "The Parallels", "DJ Norte", "Mar Azul", "Kite Engine", "Los Sótanos",
+            "Velvet Static", "Nora Vale", "Siete Puertas", "Neon Harbor"]
+_WORDS = ["noche", "fuego", "ciudad", "verano", "sombra", "latido", "camino", "espejo", "norte", "marea",
+          "golden", "signal", "runaway", "paper", "echo", "satellite", "daylight", "mirror"]
+
+
+class DownloadError(Exception):
+    """Equivalente a yt_dlp.utils.DownloadError"""
+
+
+class FakeConfig:
+    """
+    Comportamiento de los backends falsos
+
+    Args:
+        search_latency: segundos por búsqueda
+        download_latency: segundos por descarga
+        api_latency: segundos por llamada a Spotify
+        failure_rate: probabilidad de que falle cada intento de descarga
+        ambiguous_rate: probabilidad de que una búsqueda no tenga un resultado claro
+            (download_by_name pasa entonces a preguntar al usuario)
+        frames: tramas del MP3 que se "descarga"
+    """
+
+    def __init__(self, search_latency: float = 0.05, download_latency: float = 0.2, api_latency: float = 0.1,
+                 failure_rate: float = 0.0, ambiguous_rate: float = 0.0, frames: int = 40, seed: int = 1):
+        self.search_latency = search_latency
+        self.download_latency = download_latency
+        self.api_latency = api_latency
+        self.failure_rate = failure_rate
+        self.ambiguous_rate = ambiguous_rate
+        self.frames = frames
+        self.seed = seed
+
+
+class StageTimer:
+    """Duraciones por etapa (search, download, download_failed, spotify_api...) y contadores"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def summary(self) -> dict:
+        stages = {}
+        for stage, values in self.samples.items():
+            ordered = sorted(values)
+            stages[stage] = {
+                "count": len(values),
+                "total_s": round(sum(values), 3),
+                "median_ms": round(statistics.median(values) * 1000, 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+            }
+        return {"stages": stages, "counters": dict(self.counters)}
+
+
+def _video_id(text: str) -> str:
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:11]
+
+
+class FakeYtDlp:
+    """Estado compartido por todas las instancias de YoutubeDL del módulo falso"""
+
+    def __init__(self, config: FakeConfig, timer: StageTimer):
+        self.config = config
+        self.timer = timer
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._audio = silent_mp3(config.frames)
+        self.titles: Dict[str, str] = {}  # video_id -> título (para las descargas por URL)
+        self.catalog: Dict[str, Tuple[str, str]] = {}  # "nombre artista" -> (nombre, artista)
+
+    def add_track(self, name: str, artist: str):
+        """Da a conocer una canción para que sus búsquedas devuelvan títulos realistas"""
+        self.catalog[f"{name} {artist}".lower()] = (name, artist)
+
+    def chance(self, probability: float) -> bool:
+        with self._rng_lock:
+            return self._rng.random() < probability
+
+    def search(self, query: str, count: int) -> dict:
+        """
+        Resultados enlatados
+
+        Si la consulta corresponde a una canción del catálogo, el primero es
+        "nombre - artista (Official Audio)" y SmartDownloader lo acepta sin
+        preguntar; en las búsquedas ambiguas ningún resultado lleva el artista.
+        """
+        _sleep(self.config.search_latency)
+        lowered = query.lower()
+        name, artist = next((track for key, track in self.catalog.items() if lowered.startswith(key)),
+                            (query.replace(" official audio", "").strip(), ""))
+        base = f"{name} - {artist}" if artist and not self.chance(self.config.ambiguous_rate) else name
+        variants = [
+            ("{} (Official Audio)", 200),
+            ("{} (Live at the Arena)", 260),
+            ("{} - Extended Remix", 420),
+            ("{} [Lyrics]", 205),
+            ("{} full album", 2400),
+        ]
+        entries = []
+        for i in range(count):
+            template, duration = variants[i % len(variants)]
+            title = template.format(base) if i < len(variants) else f"{base} #{i}"
+            video_id = _video_id(f"{query}|{i}")
+            self.titles[video_id] = title
+            entries.append({"id": video_id, "title": title, "duration": duration,
+                            "url": f"https://www.youtube.com/watch?v={video_id}"})
+        return {"entries": entries}
+
+    def download(self, url: str, opts: dict) -> dict:
+        """Copia el MP3 local donde indica outtmpl (o falla según failure_rate)"""
+        video_id = url.rsplit("v=", 1)[-1].split("&")[0] if "v=" in url else _video_id(url)
+        started = time.perf_counter()
+        _sleep(self.config.download_latency)
+        if self.chance(self.config.failure_rate):
+            self.timer.record("download_failed", time.perf_counter() - started)
+            self.timer.count("failed_attempts")
+            raise DownloadError(f"ERROR: [youtube] {video_id}: simulated failure")
+
+        info = {"id": video_id, "title": self.titles.get(video_id, f"Video {video_id}"), "duration": 200, "ext": "mp3"}
+        path = opts.get("outtmpl", "%(id)s.%(ext)s") % info
+        hooks = opts.get("progress_hooks") or []
+        total = len(self._audio)
+        for hook in hooks:
+            hook({"status": "downloading", "downloaded_bytes": total // 2, "total_bytes": total})
+        with open(path, "wb") as f:
+            f.write(self._audio)
+        for hook in hooks:
+            hook({"status": "finished", "filename": path})
+        self.timer.record("download", time.perf_counter() - started)
+        self.timer.count("downloads")
+        return info
+
+    def make_module(self) -> types.ModuleType:
+        """Módulo que se hace pasar por yt_dlp"""
+        backend = self
+
+        class YoutubeDL:
+            def __init__(self, opts=None):
+                self.opts = opts or {}
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def extract_info(self, url, download=True):
+                if url.startswith("ytsearch"):
+                    prefix, _, query = url.partition(":")
+                    count = int(prefix[len("ytsearch"):] or 1)
+                    started = time.perf_counter()
+                    result = backend.search(query, count)
+                    backend.timer.record("search", time.perf_counter() - started)
+                    return result
+                if not download:
+                    video_id = _video_id(url)
+                    return {"id": video_id, "title": backend.titles.get(video_id, f"Video {video_id}"), "duration": 200}
+                return backend.download(url, self.opts)
+
+            def download(self, urls):
+                for url in urls:
+                    backend.download(url, self.opts)
+                return 0
+
+        module = types.ModuleType("yt_dlp")
+        module.YoutubeDL = YoutubeDL
+        module.utils = types.SimpleNamespace(DownloadError=DownloadError)
+        module.DownloadError = DownloadError
+        module.__fake__ = True
+        return module
+
+
+class FakeSpotify:
+    """Cliente de Spotify con listas, álbumes y canciones sintéticos"""
+
+    def __init__(self, backend: FakeYtDlp, tracks: int = 20):
+        self.config = backend.config
+        self.timer = backend.timer
+        rng = random.Random(self.config.seed)
+        self._tracks = []
+        for i in range(tracks):
+            name = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 3))).title()
+            self._tracks.append({
+                "id": f"track{i}",
+                "name": f"{name} {i}",
+                "artists": [{"name": rng.choice(_ARTISTS)}],
+                "album": {"name": f"Album {i // 10}"},
+            })
+            backend.add_track(self._tracks[-1]["name"], self._tracks[-1]["artists"][0]["name"])
+
+    @property
+    def tracks(self) -> List[dict]:
+        """Canciones del catálogo (sin pasar por la latencia de la API)"""
+        return list(self._tracks)
+
+    def _call(self, result):
+        started = time.perf_counter()
+        _sleep(self.config.api_latency)
+        self.timer.record("spotify_api", time.perf_counter() - started)
+        return result
+
+    def playlist(self, playlist_id):
+        return self._call({"name": f"Bench {playlist_id}", "tracks": {"items": [{"track": t} for t in self._tracks]}})
+
+    def album(self, album_id):
+        return self._call({"name": f"Bench album {album_id}", "tracks": {"items": list(self._tracks)}})
+
+    def track(self, track_id):
+        for track in self._tracks:
+            if track["id"] == track_id:
+                return self._call(track)
+        return self._call(self._tracks[0])
+
+
+def install(config: Optional[FakeConfig] = None, timer: Optional[StageTimer] = None) -> FakeYtDlp:
+    """Registra el yt_dlp falso en sys.modules (antes de importar downloader) y lo devuelve"""
+    backend = FakeYtDlp(config or FakeConfig(), timer or StageTimer())
+    sys.modules["yt_dlp"] = backend.make_module()
+    # downloader hace "import yt_dlp" al importarse: si ya estaba cargado, que use el falso
+    if "downloader" in sys.modules:
+        sys.modules["downloader"].yt_dlp = sys.modules["yt_dlp"]
+    return backend
@@ -0,0 +1,179 @@
+"""
+Reproducción sin tarjeta de sonido: listas enteras en segundos
+
+Reproduce una lista sintética con una salida de audio_output en vez de
+pygame.mixer.music, con el mismo MusicPlayer, el mismo hilo de fin de canción
+y los mismos eventos de integración que en uso normal:
+
+    null   NullOutput con el reloj acelerado --speed veces (por defecto 1000:
+           una canción de 3 minutos dura 0.18 s)
+    wav    WavOutput: lo que suena se escribe en --wav (necesita ffmpeg)
+
+Al terminar comprueba el orden de los eventos (playlist_changed,
+song_changed, playback_started, un song_changed por canción y
+playback_stopped al parar), que las estadísticas y el historial cuenten
+cada canción, y mide la latencia de transición: cuánto pasa desde que la
+canción termina hasta que se avisa de la siguiente, en milisegundos reales.
+El sondeo del fin de canción se acelera con el reloj, pero cargar la
+siguiente canción, escribir estadísticas e historial y avisar a las
+integraciones no: eso es lo que se oiría como silencio entre canciones.
+
+Uso:
+    python benchmarks/headless.py [--transitions 50] [--songs 200] [--list-size 100]
+                                  [--song-seconds 180] [--speed 1000] [--wav FILE]
+                                  [--timeout 120] [--output headless.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from library import generate_library
+
+import logs  # noqa: E402  (library.py ya puso la raíz del repositorio en sys.path)
+from audio_output import NullOutput, WavOutput  # noqa: E402
+
+# Duración de una trama MP3 de 44.1 kHz (las de library.silent_mp3)
+FRAME_SECONDS = 1152 / 44100
+EXPECTED_START = ["playlist_changed", "song_changed", "playback_started"]
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def check_events(names):
+    """Errores en el orden de los eventos ([] si es el esperado)"""
+    errors = []
+    if names[:3] != EXPECTED_START:
+        errors.append(f"inicio inesperado: {names[:3]}")
+    if not names or names[-1] != "playback_stopped":
+        errors.append(f"el último evento no es playback_stopped: {names[-1:] or 'ninguno'}")
+    unexpected = sorted({name for name in names[3:-1] if name != "song_changed"})
+    if unexpected:
+        errors.append(f"eventos inesperados durante la lista: {', '.join(unexpected)}")
+    return errors
+
+
+def run_headless(root, transitions, songs, list_size, song_seconds, speed, wav, timeout):
+    from main import MusicPlayer
+    from integrations.integration_base import IntegrationManager
+
+    frames = max(2, round(song_seconds / FRAME_SECONDS))
+    generate_library(root, songs, 1, list_size, frames=frames)
+    output = WavOutput(wav) if wav else NullOutput(speed=speed)
+    player = MusicPlayer(base_dir=root, output=output)
+    manager = IntegrationManager(player)
+    player.integration_manager = manager
+
+    events = []
+    wanted = transitions + 1
+    done = threading.Event()
+
+    def recorder(name):
+        def handler(data=None):
+            events.append((name, time.perf_counter(), output.duration if name == "song_changed" and not wav else 0))
+            if name == "song_changed" and sum(1 for event in events if event[0] == name) >= wanted:
+                done.set()
+        return handler
+
+    for name in list(manager._event_handlers):
+        manager.register_event_handler(name, recorder(name))
+
+    started = time.perf_counter()
+    player.play_playlist("1L")
+    finished = done.wait(timeout)
+    player.stop_playback()
+    elapsed = time.perf_counter() - started
+    output.close()
+    player.library.stop()
+
+    names = [event[0] for event in events]
+    changes = [event for event in events if event[0] == "song_changed"]
+    gaps = [later[1] - (earlier[1] + earlier[2] / speed) for earlier, later in zip(changes, changes[1:])]
+    stats = player.stats.get_stats()
+    history = player.history.totals()
+
+    errors = check_events(names)
+    if not finished:
+        errors.append(f"solo {len(changes)} de {wanted} canciones en {timeout:g}s")
+    if stats.get("songs_played", 0) != len(changes):
+        errors.append(f"songs_played = {stats.get('songs_played', 0)}, se esperaban {len(changes)}")
+    if history["plays"] != len(changes):
+        errors.append(f"el historial tiene {history['plays']} reproducciones, se esperaban {len(changes)}")
+
+    result = {
+        "output": output.describe(),
+        "songs": songs,
+        "list_size": min(list_size, songs),
+        "song_seconds": round(frames * FRAME_SECONDS, 2),
+        "songs_played": len(changes),
+        "elapsed_s": round(elapsed, 2),
+        "events": len(names),
+        "history_seconds": history["seconds"],
+        "errors": errors,
+    }
+    if wav:
+        result["rendered_seconds"] = round(output.rendered_seconds, 2)
+    elif gaps:
+        result["transition_ms"] = {
+            "median": round(statistics.median(gaps) * 1000, 2),
+            "p95": round(_percentile(gaps, 0.95) * 1000, 2),
+            "max": round(max(gaps) * 1000, 2),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducción de listas sin tarjeta de sonido")
+    parser.add_argument("--transitions", type=int, default=50, help="cambios de canción a esperar")
+    parser.add_argument("--songs", type=int, default=200, help="canciones de la biblioteca")
+    parser.add_argument("--list-size", type=int, default=100, help="canciones de la lista que se reproduce")
+    parser.add_argument("--song-seconds", type=float, default=180, help="duración de cada canción")
+    parser.add_argument("--speed", type=float, default=1000, help="aceleración del reloj de la salida nula")
+    parser.add_argument("--wav", help="renderizar a este archivo WAV en vez de usar la salida nula")
+    parser.add_argument("--timeout", type=float, default=120, help="segundos máximos de la prueba")
+    parser.add_argument("--output", default="headless.json", help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    logs.setup_logging("WARNING")
+    wav = os.path.abspath(args.wav) if args.wav else None
+    speed = 1.0 if wav else args.speed
+    root = tempfile.mkdtemp(prefix="pymusic-headless-")
+    cwd = os.getcwd()
+    try:
+        # user_stats.json se crea en el directorio actual: que no toque el del usuario
+        os.chdir(root)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = run_headless(root, args.transitions, args.songs, args.list_size,
+                                  args.song_seconds, speed, wav, args.timeout)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+    result["python"] = sys.version.split()[0]
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"{result['songs_played']} canciones de {result['song_seconds']:g}s por {result['output']} "
+          f"en {result['elapsed_s']}s ({result['events']} eventos)")
+    if "transition_ms" in result:
+        latency = result["transition_ms"]
+        print(f"Transición: mediana {latency['median']} ms, p95 {latency['p95']} ms, máx {latency['max']} ms")
+    if "rendered_seconds" in result:
+        print(f"Audio escrito en {wav}: {result['rendered_seconds']}s")
+    print(f"Resultados guardados en {args.output}")
+    if result["errors"]:
+        print("\nFALLO: " + "; ".join(result["errors"]))
+        sys.exit(1)
+    print("OK: eventos, estadísticas e historial coherentes")
+
+
+if __name__ == "__main__":
+    main()
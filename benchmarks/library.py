@@ -0,0 +1,198 @@
+"""
+Benchmark de las operaciones sobre la biblioteca a gran escala
+
+Genera bibliotecas sintéticas (N canciones como MP3 mínimos en silencio, M
+listas y su metadata.json) y mide, para cada tamaño, los comandos que recorren
+la biblioteca: show_songs, show_list_content, check_playlist, edit_playlist,
+remove_song_from_playlists, get_song_title y PyMusicAPI.get_all_songs. El
+resultado se guarda en JSON para poder comparar entre versiones.
+
+Los MP3 son enlaces duros a un único archivo cuando el sistema lo permite,
+así que 100k canciones apenas ocupan disco.
+
+Uso:
+    python benchmarks/library.py [--sizes 1000,10000,100000] [--playlists 20] [--list-size 1000]
+                                 [--repeat 5] [--output library.json] [--keep DIR]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import playlist_format  # noqa: E402
+
+# Cabecera MPEG-1 Layer III, 128 kbps, 44.1 kHz, estéreo: cada trama ocupa 417 bytes.
+# Con la información lateral a cero la trama se decodifica como silencio.
+_FRAME_HEADER = b"\xff\xfb\x90\x00"
+_FRAME_SIZE = 417
+_WORDS = ["love", "night", "dance", "remix", "live", "feat", "official", "audio", "video", "summer",
+          "heart", "fire", "rain", "city", "dream", "blue", "gold", "wild", "home", "road"]
+
+
+def silent_mp3(frames=2):
+    return (_FRAME_HEADER + bytes(_FRAME_SIZE - len(_FRAME_HEADER))) * frames
+
+
+def generate_library(root, songs, playlists, list_size, seed=1, frames=2):
+    """Crea Songs/, Lists/ y metadata.json con datos sintéticos dentro de root (frames: tramas por MP3)"""
+    rng = random.Random(seed)
+    songs_dir = os.path.join(root, "Songs")
+    lists_dir = os.path.join(root, "Lists")
+    os.makedirs(songs_dir, exist_ok=True)
+    os.makedirs(lists_dir, exist_ok=True)
+
+    template = os.path.join(root, "silence.mp3")
+    with open(template, "wb") as f:
+        f.write(silent_mp3(frames))
+    use_links = True
+    for i in range(1, songs + 1):
+        path = os.path.join(songs_dir, f"{i}.mp3")
+        if use_links:
+            try:
+                os.link(template, path)
+                continue
+            except OSError:
+                use_links = False
+        shutil.copyfile(template, path)
+
+    start = time.time() - 365 * 24 * 3600
+    metadata = {
+        str(i): {
+            "title": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 5))) + f" {i}",
+            "added_date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + i * 60)),
+        }
+        for i in range(1, songs + 1)
+    }
+    with open(os.path.join(songs_dir, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False)
+
+    ids = [str(i) for i in range(1, songs + 1)]
+    for n in range(1, playlists + 1):
+        playlist = {"name": f"list {n}", "songs": rng.sample(ids, min(list_size, songs))}
+        playlist_format.write_v2(os.path.join(lists_dir, f"{n}L{playlist_format.V2_EXTENSION}"), playlist)
+
+    with open(os.path.join(songs_dir, "counter.json"), "w", encoding="utf-8") as f:
+        json.dump({"next_id": songs + 1, "next_list_id": playlists + 1}, f)
+
+
+def _time_ms(func, repeat, setup=None):
+    """Mide func repeat veces (con la salida silenciada); setup prepara cada repetición"""
+    times = []
+    for i in range(repeat):
+        args = setup(i) if setup else ()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t = time.perf_counter()
+            func(*args)
+            times.append((time.perf_counter() - t) * 1000)
+    return {"min_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3),
+            "max_ms": round(max(times), 3)}
+
+
+def bench_size(root, songs, playlists, list_size, repeat):
+    """Genera una biblioteca de songs canciones y mide cada operación sobre ella"""
+    from main import MusicPlayer
+    from integrations.integration_base import PyMusicAPI
+
+    t = time.perf_counter()
+    generate_library(root, songs, playlists, list_size)
+    result = {"songs": songs, "playlists": playlists, "list_size": min(list_size, songs),
+              "generate_s": round(time.perf_counter() - t, 2)}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        t = time.perf_counter()
+        player = MusicPlayer(base_dir=root)
+        player.library.sync()
+        result["init_ms"] = round((time.perf_counter() - t) * 1000, 1)
+
+    rng = random.Random(2)
+    ids = [str(i) for i in range(1, songs + 1)]
+    ops = result["operations"] = {}
+    ops["show_songs"] = _time_ms(player.show_songs, repeat)
+    ops["show_songs_all"] = _time_ms(lambda: player.show_songs("--limit", "0"), repeat)
+    ops["show_list_content"] = _time_ms(lambda: player.show_list_content("1L"), repeat)
+    ops["check_playlist"] = _time_ms(lambda: player.check_playlist("1L"), repeat)
+
+    batches = [rng.sample(ids, min(100, songs)) for _ in range(repeat)]
+    ops["edit_playlist_add_100"] = _time_ms(lambda batch: player.edit_playlist("2L", "add", *batch), repeat,
+                                            setup=lambda i: (batches[i],))
+    ops["edit_playlist_remove_100"] = _time_ms(lambda batch: player.edit_playlist("2L", "remove", *batch), repeat,
+                                               setup=lambda i: (batches[i],))
+    ops["edit_playlist_union"] = _time_ms(lambda: player.edit_playlist("3L", "union", "4L", "5L"), repeat)
+
+    # Cada repetición quita una canción distinta de todas las listas
+    victims = rng.sample(ids, min(repeat, songs))
+    ops["remove_song_from_playlists"] = _time_ms(player.remove_song_from_playlists, repeat,
+                                                 setup=lambda i: (victims[i],))
+
+    lookups = [rng.choice(ids) for _ in range(1000)]
+    ops["get_song_title_x1000"] = _time_ms(lambda: [player.get_song_title(s) for s in lookups], repeat)
+    api = PyMusicAPI(player)
+    ops["api_get_all_songs"] = _time_ms(api.get_all_songs, repeat)
+
+    player.library.stop()
+    return result
+
+
+def run_benchmark(sizes, playlists=20, list_size=1000, repeat=5, keep=None):
+    results = {"python": sys.version.split()[0], "repeat": repeat, "sizes": []}
+    for songs in sizes:
+        if keep:
+            root = os.path.join(keep, str(songs))
+            shutil.rmtree(root, ignore_errors=True)
+            os.makedirs(root)
+        else:
+            root = tempfile.mkdtemp(prefix=f"pymusic-bench-{songs}-")
+        cwd = os.getcwd()
+        try:
+            # user_stats.json se crea en el directorio actual: que no toque el del usuario
+            os.chdir(root)
+            # check_playlist pregunta si faltan canciones; en el benchmark no faltan, pero por si acaso
+            with mock.patch("builtins.input", return_value="n"):
+                results["sizes"].append(bench_size(root, songs, playlists, list_size, repeat))
+        finally:
+            os.chdir(cwd)
+            if not keep:
+                shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las operaciones sobre la biblioteca")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="número de canciones, separados por comas")
+    parser.add_argument("--playlists", type=int, default=20, help="listas por biblioteca")
+    parser.add_argument("--list-size", type=int, default=1000, help="canciones por lista")
+    parser.add_argument("--repeat", type=int, default=5, help="repeticiones por operación")
+    parser.add_argument("--output", default="library.json", help="fichero JSON de resultados")
+    parser.add_argument("--keep", help="carpeta donde generar (y conservar) las bibliotecas")
+    args = parser.parse_args()
+    if args.playlists < 5:
+        parser.error("--playlists debe ser al menos 5 (edit_playlist union usa las listas 3L, 4L y 5L)")
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    started = time.time()
+    results = run_benchmark(sizes, args.playlists, args.list_size, args.repeat, args.keep)
+    results["timestamp"] = int(started)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    for size in results["sizes"]:
+        print(f"\n{size['songs']} canciones, {size['playlists']} listas de {size['list_size']} "
+              f"(generada en {size['generate_s']} s, arranque {size['init_ms']} ms)")
+        for name, summary in size["operations"].items():
+            print(f"  {name:28} {summary['median_ms']:>10} ms")
+    print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
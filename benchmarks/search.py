@@ -0,0 +1,89 @@
+"""
+Benchmark de la búsqueda en la biblioteca
+
+Construye un SearchIndex con títulos sintéticos y mide el tiempo de
+construcción, de las actualizaciones incrementales y de distintas consultas
+(palabra exacta, prefijo corto, varias palabras y con errores de tecleo).
+
+Uso:
+    python benchmarks/search.py [--titles 100000] [--repeat 20] [--output search.json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from search_index import SearchIndex  # noqa: E402
+
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _titles(count, seed=1):
+    rng = random.Random(seed)
+    words = ["".join(rng.choice(_LETTERS) for _ in range(rng.randint(3, 9))) for _ in range(count // 5 or 1)]
+    titles = [(str(i), " ".join(rng.choice(words) for _ in range(rng.randint(2, 6)))) for i in range(1, count + 1)]
+    return titles, words
+
+
+def _time_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - t) * 1000)
+    return {"min_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3),
+            "max_ms": round(max(times), 3)}
+
+
+def run_benchmark(count=100000, repeat=20):
+    titles, words = _titles(count)
+    index = SearchIndex()
+    t = time.perf_counter()
+    index.rebuild(titles)
+    results = {"titles": count, "build_ms": round((time.perf_counter() - t) * 1000, 1), "queries": {}}
+
+    word = words[0]
+    two_words = " ".join(titles[len(titles) // 2][1].split()[:2])
+    typo = word[:-1] + ("a" if word[-1] != "a" else "b") if len(word) > 4 else word + "x"
+    queries = {
+        "exact": word,
+        "prefix_1": word[:1],
+        "prefix_3": word[:3],
+        "two_words": two_words,
+        "typo": typo,
+        "no_match": "qqqqqqq",
+    }
+    for name, query in queries.items():
+        results["queries"][name] = dict(_time_ms(lambda: index.search(query), repeat), query=query)
+
+    counter = iter(range(count + 1, count + 1 + repeat))
+    results["add"] = _time_ms(lambda: index.add(str(next(counter)), "nuevo titulo de prueba"), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda en la biblioteca")
+    parser.add_argument("--titles", type=int, default=100000, help="número de títulos sintéticos")
+    parser.add_argument("--repeat", type=int, default=20, help="repeticiones por consulta")
+    parser.add_argument("--output", default="search.json", help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.titles, args.repeat)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"Índice de {results['titles']} títulos construido en {results['build_ms']} ms")
+    for name, summary in results["queries"].items():
+        print(f"  {name:12} {summary['median_ms']:>8} ms  ({summary['query']!r})")
+    print(f"  {'add':12} {results['add']['median_ms']:>8} ms")
+    print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Prueba de resistencia: memoria de una sesión larga
+
+Simula semanas de reproducción sin audio: genera una biblioteca sintética,
+reproduce una lista con un mixer nulo y salta de canción N veces (100k por
+defecto), con manejadores de integraciones conectados y recargando las
+integraciones de vez en cuando. Cada --sample-every cambios anota la memoria
+trazada por tracemalloc y la RSS del proceso.
+
+Tras el calentamiento (el primer 10 % de los cambios llena cachés, índices y
+resúmenes del historial) la memoria trazada no debe crecer más de
+--max-growth-kb; si crece, el script termina con error y muestra las líneas
+que más han crecido. sys.path y los manejadores registrados tampoco deben
+cambiar al recargar las integraciones.
+
+Cada cambio de canción escribe las estadísticas y el historial en disco, así
+que 100k cambios tardan varios minutos.
+
+Uso:
+    python benchmarks/soak.py [--transitions 100000] [--songs 2000] [--list-size 500]
+                              [--sample-every 5000] [--max-growth-kb 512] [--output soak.json]
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from library import generate_library
+
+import logs  # noqa: E402  (library.py ya puso la raíz del repositorio en sys.path)
+import profiling  # noqa: E402
+
+
+class NullMixer:
+    """Sustituto de pygame.mixer.music: acepta todo y la canción nunca termina sola"""
+
+    def load(self, *args):
+        pass
+
+    def play(self, *args, **kwargs):
+        pass
+
+    def stop(self):
+        pass
+
+    def pause(self):
+        pass
+
+    def unpause(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+    def get_busy(self):
+        return True
+
+
+def _sample(done, started):
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    return {"transitions": done, "elapsed_s": round(time.perf_counter() - started, 2),
+            "traced_kb": round(current / 1024, 1), "rss_kb": (profiling.rss_bytes() or 0) // 1024}
+
+
+def run_soak(root, transitions, songs, list_size, sample_every, reload_every):
+    from main import MusicPlayer
+    from integrations.integration_base import IntegrationManager
+
+    generate_library(root, songs, 1, list_size)
+    player = MusicPlayer(base_dir=root)
+    player._mixer = NullMixer()
+    manager = IntegrationManager(player)
+    player.integration_manager = manager
+    events = {"song_changed": 0}
+
+    def on_song_changed(data):
+        events["song_changed"] += 1
+
+    manager.register_event_handler("song_changed", on_song_changed)
+    manager.load_integrations()
+    path_length = len(sys.path)
+    handler_count = sum(len(handlers) for handlers in manager._event_handlers.values())
+
+    tracemalloc.start()
+    audit = profiling.MemoryAudit()
+    player._start_playlist("1L", player._load_playlist("1L"))
+    started = time.perf_counter()
+    samples = [_sample(0, started)]
+    baseline = None
+    warmup = max(sample_every, transitions // 10)
+    for done in range(1, transitions + 1):
+        player.skip_song()
+        if done % reload_every == 0:
+            manager.load_integrations()
+        if done % sample_every == 0 or done == transitions:
+            samples.append(_sample(done, started))
+            if baseline is None and done >= warmup:
+                baseline = samples[-1]
+                audit.diff()  # instantánea de referencia para explicar el crecimiento
+    player.stop_playback()
+    final = _sample(transitions, started)
+    growth = audit.get_formatted_diff(10) if baseline else ""
+    tracemalloc.stop()
+    player.library.stop()
+
+    return {
+        "transitions": transitions,
+        "songs": songs,
+        "list_size": min(list_size, songs),
+        "transitions_per_s": round(transitions / max(final["elapsed_s"], 1e-9), 1),
+        "song_changed_events": events["song_changed"],
+        "sys_path_growth": len(sys.path) - path_length,
+        "handler_growth": sum(len(handlers) for handlers in manager._event_handlers.values()) - handler_count,
+        "traced_growth_kb": round(final["traced_kb"] - baseline["traced_kb"], 1) if baseline else 0.0,
+        "rss_growth_kb": final["rss_kb"] - baseline["rss_kb"] if baseline else 0,
+        "samples": samples,
+        "top_growth": growth,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de resistencia de memoria (cambios de canción)")
+    parser.add_argument("--transitions", type=int, default=100000, help="cambios de canción a simular")
+    parser.add_argument("--songs", type=int, default=2000, help="canciones de la biblioteca")
+    parser.add_argument("--list-size", type=int, default=500, help="canciones de la lista que se reproduce")
+    parser.add_argument("--sample-every", type=int, default=5000, help="cambios entre muestras de memoria")
+    parser.add_argument("--reload-every", type=int, default=1000, help="cambios entre recargas de integraciones")
+    parser.add_argument("--max-growth-kb", type=float, default=512, help="crecimiento máximo tras el calentamiento")
+    parser.add_argument("--output", default="soak.json", help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    # Una línea de registro por canción serían 100k líneas: solo avisos y errores
+    logs.setup_logging("WARNING")
+    root = tempfile.mkdtemp(prefix="pymusic-soak-")
+    cwd = os.getcwd()
+    try:
+        # user_stats.json se crea en el directorio actual: que no toque el del usuario
+        os.chdir(root)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = run_soak(root, args.transitions, args.songs, args.list_size,
+                              args.sample_every, args.reload_every)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+    result["python"] = sys.version.split()[0]
+    result["max_growth_kb"] = args.max_growth_kb
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"{result['transitions']} cambios de canción ({result['transitions_per_s']}/s) "
+          f"sobre una lista de {result['list_size']} canciones")
+    for sample in result["samples"]:
+        print(f"  {sample['transitions']:>8}  traced {sample['traced_kb']:>10.1f} KiB  RSS {sample['rss_kb']:>8} KiB")
+    print(f"Crecimiento tras el calentamiento: {result['traced_growth_kb']} KiB trazados, "
+          f"{result['rss_growth_kb']} KiB de RSS")
+    print(f"Resultados guardados en {args.output}")
+
+    failures = []
+    if result["traced_growth_kb"] > args.max_growth_kb:
+        failures.append(f"la memoria trazada creció {result['traced_growth_kb']} KiB "
+                        f"(máximo {args.max_growth_kb:g})")
+    if result["sys_path_growth"]:
+        failures.append(f"sys.path creció en {result['sys_path_growth']} entradas al recargar integraciones")
+    if result["handler_growth"]:
+        failures.append(f"se registraron {result['handler_growth']} manejadores de más al recargar integraciones")
+    if failures:
+        print("\nFALLO: " + "; ".join(failures))
+        if result["top_growth"]:
+            print(result["top_growth"])
+        sys.exit(1)
+    print("OK: memoria acotada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark de arranque de PyMusic
+
+Mide, en un intérprete limpio por componente, el tiempo de importación de cada
+módulo y el tiempo de inicialización de cada subsistema (MusicPlayer, mixer,
+Spotify, SmartDownloader, integraciones). El resultado se guarda en JSON para
+poder comparar entre versiones.
+
+Uso:
+    python benchmarks/startup.py [--repeat N] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos cuyo coste de importación queremos conocer por separado
+IMPORTS = [
+    "main",
+    "pygame",
+    "yt_dlp",
+    "spotipy",
+    "pyperclip",
+    "downloader",
+    "integrations.integration_base",
+]
+
+# Fragmentos que se ejecutan después de crear el MusicPlayer
+INIT_STEPS = {
+    "mixer": "player.mixer",
+    "spotify": "player.spotify",
+    "downloader": "player.downloader",
+    "integrations": (
+        "from integrations.integration_base import IntegrationManager\n"
+        "IntegrationManager(player).load_integrations()"
+    ),
+}
+
+_IMPORT_SNIPPET = """
+import time, json
+t = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - t}}))
+"""
+
+_INIT_SNIPPET = """
+import contextlib, io, json, time
+t = time.perf_counter()
+import main
+with contextlib.redirect_stdout(io.StringIO()):
+    player = main.MusicPlayer()
+ready = time.perf_counter() - t
+t = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+{step}
+print(json.dumps({{"ready": ready, "seconds": time.perf_counter() - t}}))
+"""
+
+
+def _run(snippet):
+    """Ejecuta un fragmento en un intérprete nuevo y devuelve su JSON o el error"""
+    proc = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=REPO_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit code {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _summary(samples):
+    times = [s["seconds"] for s in samples if "error" not in s]
+    if not times:
+        return {"error": samples[-1]["error"]}
+    return {
+        "min_ms": round(min(times) * 1000, 2),
+        "median_ms": round(statistics.median(times) * 1000, 2),
+        "max_ms": round(max(times) * 1000, 2),
+    }
+
+
+def run_benchmark(repeat=5):
+    results = {"python": sys.version.split()[0], "repeat": repeat, "imports": {}, "init": {}}
+
+    for module in IMPORTS:
+        samples = [_run(_IMPORT_SNIPPET.format(module=module)) for _ in range(repeat)]
+        results["imports"][module] = _summary(samples)
+
+    ready_samples = []
+    for name, step in INIT_STEPS.items():
+        code = "\n".join("    " + line for line in step.splitlines())
+        samples = [_run(_INIT_SNIPPET.format(step=code)) for _ in range(repeat)]
+        results["init"][name] = _summary(samples)
+        ready_samples.extend({"seconds": s["ready"]} for s in samples if "ready" in s)
+
+    # Tiempo hasta 'listo': importar main + crear el MusicPlayer
+    results["ready"] = _summary(ready_samples or [{"error": "MusicPlayer no pudo inicializarse"}])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de PyMusic")
+    parser.add_argument("--repeat", type=int, default=5, help="repeticiones por medida")
+    parser.add_argument("--output", default="startup.json", help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    started = time.time()
+    results = run_benchmark(args.repeat)
+    results["timestamp"] = int(started)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"Listo en (mediana): {results['ready'].get('median_ms', 'error')} ms")
+    for section in ("imports", "init"):
+        print(f"\n{section}:")
+        for name, summary in results[section].items():
+            value = f"{summary['median_ms']} ms" if "median_ms" in summary else summary["error"]
+            print(f"  {name:32} {value}")
+    print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
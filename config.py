@@ -3,4 +3,19 @@ SPOTIFY_CLIENT_ID = "PUT YOUR SPOTIFY CLIENT ID HERE"
 SPOTIFY_CLIENT_SECRET = "PUT YOUR SPOTIFY CLIENT SECRET HERE"
 
 # Configuración del reproductor
-DEFAULT_VOLUME = 2.0  # Volumen por defecto (0.0 a 3.0) 
\ No newline at end of file
+DEFAULT_VOLUME = 2.0  # Volumen por defecto (0.0 a 3.0)
+NORMALIZE_LOUDNESS = True  # Igualar el volumen entre canciones con la ganancia medida al añadirlas
+TARGET_LOUDNESS = -14.0  # Nivel objetivo de la normalización (LUFS)
+NORMALIZE_HEADROOM_DB = 6.0  # Lo más que se sube una canción floja (solo con el volumen por debajo de 100)
+AUDIO_CACHE_MB = 64  # Caché en memoria de las canciones más reproducidas (0 para desactivarla)
+CROSSFADE_SECONDS = 0  # Fundido entre canciones de una lista (0 lo desactiva; necesita ffmpeg)
+CROSSFADE_CHANNELS = 2  # Canales de audio reservados para la canción que se apaga
+AUDIO_OUTPUT = ""  # Salida de audio: vacío para los altavoces, "null", "null:60" (60x más rápido, sin sonido) o "wav:sesion.wav"
+FINGERPRINT_ON_IMPORT = True  # Calcular la huella acústica al añadir canciones y avisar de duplicados
+LIST_PAGE_SIZE = 50  # Elementos por página en songs, lists y showlist (0 para mostrarlo todo) 
+
+# Registro de eventos (reproducción, descargas, integraciones...)
+LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING o ERROR
+LOG_FORMAT = "text"  # "text" (mensajes normales) o "json" (una línea JSON por evento)
+LOG_FILE = ""  # Archivo donde guardar también el registro (vacío: solo consola)
+LOG_PROGRESS_INTERVAL = 0.5  # Segundos mínimos entre dos avisos de progreso de una descarga
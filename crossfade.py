@@ -0,0 +1,229 @@
+"""
+Motor de fundido cruzado (crossfade) entre canciones
+
+La canción actual suena por pygame.mixer.music. Poco antes de su final se
+decodifica solo la ventana de solapamiento (los últimos N segundos) a un
+pygame.mixer.Sound. En el instante del fundido, esa cola pasa a un canal
+reservado que se va apagando, mientras la siguiente canción arranca en
+mixer.music con fade-in. La memoria usada es la de esa ventana, no la de la
+canción entera.
+
+Los instantes se calculan a partir del reloj de reproducción y los ejecuta un
+planificador con cola de prioridad (MixScheduler), en lugar de consultar
+get_busy() cada segundo.
+"""
+import heapq
+import itertools
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from logs import get_logger
+
+log = get_logger("crossfade")
+
+# Margen con el que se decodifica la cola antes de que empiece el fundido
+PREPARE_LEAD = 5.0
+# Si no se conoce la duración, cada cuánto se comprueba si la canción terminó
+FALLBACK_CHECK = 1.0
+
+
+class MixScheduler:
+    """Ejecuta callbacks en instantes concretos (reloj monótono) desde un único hilo"""
+
+    def __init__(self):
+        self._queue = []  # heap de (instante, secuencia, generación, callback)
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._generation = 0
+        self._thread = None
+
+    def schedule(self, delay: float, callback: Callable[[], None]):
+        """Programa callback dentro de delay segundos"""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="MixScheduler", daemon=True)
+                self._thread.start()
+            when = time.monotonic() + max(0.0, delay)
+            heapq.heappush(self._queue, (when, next(self._seq), self._generation, callback))
+            self._cond.notify()
+
+    def cancel_all(self):
+        """Descarta todo lo programado (incluido lo que esté a punto de ejecutarse)"""
+        with self._cond:
+            self._generation += 1
+            self._queue.clear()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._queue:
+                        self._cond.wait()
+                        continue
+                    when, _, generation, callback = self._queue[0]
+                    timeout = when - time.monotonic()
+                    if timeout > 0:
+                        self._cond.wait(timeout)
+                        continue
+                    heapq.heappop(self._queue)
+                    if generation == self._generation:
+                        break
+            try:
+                callback()
+            except Exception as e:
+                log.error(f"Error en el planificador de mezcla: {e}")
+
+
+def decode_window(path: str, start: float, seconds: float, frequency: int, channels: int) -> Optional[bytes]:
+    """Decodifica solo [start, start + seconds] a PCM s16le con ffmpeg"""
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+             '-ss', f"{max(0.0, start):.3f}", '-t', f"{seconds:.3f}", '-i', path,
+             '-f', 's16le', '-acodec', 'pcm_s16le', '-ar', str(frequency), '-ac', str(channels), '-'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return None
+    return result.stdout or None
+
+
+class CrossfadeEngine:
+    """
+    Programa los fundidos entre canciones del MusicPlayer
+
+    Args:
+        player: MusicPlayer al que pertenece
+        seconds: duración del fundido (0 lo desactiva)
+        channels: canales de pygame reservados para las colas que se apagan
+    """
+
+    def __init__(self, player, seconds: float = 0.0, channels: int = 2):
+        self._player = player
+        self.seconds = max(0.0, float(seconds))
+        self.channel_count = max(1, int(channels))
+        self.scheduler = MixScheduler()
+        self._tail = None  # (song_id, pygame.mixer.Sound)
+        self._decoder = None  # Hilo que decodifica las colas (se crea en el primer fundido)
+        self._channels = None
+        self._next_channel = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.seconds > 0
+
+    def set_seconds(self, seconds: float):
+        self.seconds = max(0.0, float(seconds))
+        self.reschedule()
+
+    # ========== Programación ==========
+
+    def reschedule(self):
+        """Recalcula los eventos de la canción actual según la posición del reloj"""
+        self.scheduler.cancel_all()
+        player = self._player
+        song_id = player.current_song_id
+        if not self.enabled or not player.is_playing or player.is_paused or not song_id:
+            return
+
+        duration = self._song_duration()
+        if duration <= 0:
+            self.scheduler.schedule(FALLBACK_CHECK, lambda: self._end_check(song_id))
+            return
+
+        remaining = duration - player.clock.position
+        if duration > 2 * self.seconds and remaining > self.seconds:
+            fade_at = remaining - self.seconds
+            self.scheduler.schedule(fade_at - PREPARE_LEAD, lambda: self._prepare(song_id))
+            self.scheduler.schedule(fade_at, lambda: self._start_fade(song_id))
+        # Red de seguridad: si el fundido no pudo hacerse, avanzar al terminar
+        self.scheduler.schedule(remaining + 0.5, lambda: self._end_check(song_id))
+
+    def cancel(self):
+        self.scheduler.cancel_all()
+
+    def stop(self):
+        """Cancela lo programado y corta las colas que estén sonando"""
+        self.cancel()
+        self._tail = None
+        if self._channels:
+            for channel in self._channels:
+                channel.stop()
+
+    # ========== Eventos ==========
+
+    def _song_duration(self) -> float:
+        """Duración exacta de la canción actual (índice de tramas), no la redondeada de los metadatos"""
+        player = self._player
+        try:
+            return player._frame_index(player.current_song_id).duration or player.current_song_duration or 0
+        except Exception:
+            return player.current_song_duration or 0
+
+    def _prepare(self, song_id: str):
+        """Encarga la decodificación de la cola sin ocupar el hilo del planificador"""
+        if self._player.current_song_id != song_id:
+            return
+        if self._decoder is None:
+            self._decoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crossfade")
+        self._decoder.submit(self._decode_tail, song_id, self._song_duration())
+
+    def _decode_tail(self, song_id: str, duration: float):
+        """Decodifica la cola de la canción (solo la ventana del fundido)"""
+        import pygame
+        player = self._player
+        if player.current_song_id != song_id:
+            return
+        try:
+            frequency, _size, channels = pygame.mixer.get_init()
+            path = os.path.join(player.songs_dir, f"{song_id}.mp3")
+            pcm = decode_window(path, duration - self.seconds, self.seconds, frequency, channels)
+            tail = (song_id, pygame.mixer.Sound(buffer=pcm)) if pcm else None
+        except Exception as e:
+            log.error(f"Error al preparar el fundido: {e}")
+            tail = None
+        if player.current_song_id == song_id:
+            self._tail = tail
+
+    def _start_fade(self, song_id: str):
+        import pygame
+        player = self._player
+        with player._transition_lock:
+            if (player.current_song_id != song_id or not player.is_playing or player.is_paused
+                    or not player.current_playlist):
+                return
+            tail = self._tail
+            if not tail or tail[0] != song_id:
+                return  # Sin cola decodificada (¿ffmpeg?): la comprobación final avanzará
+            self._tail = None
+
+            if self._channels is None:
+                pygame.mixer.set_reserved(self.channel_count)
+                self._channels = [pygame.mixer.Channel(i) for i in range(self.channel_count)]
+            channel = self._channels[self._next_channel]
+            self._next_channel = (self._next_channel + 1) % self.channel_count
+
+            fade_ms = int(self.seconds * 1000)
+            channel.set_volume(player._effective_volume(song_id))
+            channel.play(tail[1])
+            channel.fadeout(fade_ms)
+            player.play_next_song(fade_ms=fade_ms)
+
+    def _end_check(self, song_id: str):
+        player = self._player
+        with player._transition_lock:
+            if player.current_song_id != song_id or not player.is_playing or player.is_paused:
+                return
+            if player.mixer.get_busy():
+                # La duración estimada se quedó corta: volver a mirar en breve
+                self.scheduler.schedule(0.5 if player.current_song_duration else FALLBACK_CHECK,
+                                        lambda: self._end_check(song_id))
+            elif player.current_playlist:
+                player.play_next_song()
@@ -6,6 +6,11 @@ import difflib
 from typing import List, Dict, Optional, Tuple
 import yt_dlp
 
+import metrics
+from logs import get_logger
+
+log = get_logger("download")
+
 class SmartDownloader:
     def __init__(self, songs_dir: str):
         self.songs_dir = songs_dir
@@ -119,7 +124,7 @@ class SmartDownloader:
                 return results_with_confidence[:max_results]  # Devolver solo los mejores resultados
                 
         except Exception as e:
-            print(f"Error en búsqueda: {e}")
+            log.error(f"Error en búsqueda: {e}")
             return []
     
     def download_video(self, video_info: Dict) -> Optional[str]:
@@ -139,10 +144,12 @@ class SmartDownloader:
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 ydl.download([video_info['url']])
+                metrics.DOWNLOAD_ATTEMPTS.labels("search", "success").inc()
                 return video_info['video_id']
                 
         except Exception as e:
-            print(f"Error al descargar video: {e}")
+            metrics.DOWNLOAD_ATTEMPTS.labels("search", "failure").inc()
+            log.error(f"Error al descargar video: {e}")
             return None
     
     def download_by_name(self, song_name: str, artist_name: str = "", album_name: str = "") -> Optional[str]:
@@ -159,19 +166,19 @@ class SmartDownloader:
         
         search_query += " official audio"
         
-        print(f"Buscando: {search_query}")
+        log.info(f"Buscando: {search_query}")
         
         try:
             # Buscar resultados con confianza
             results = self.search_with_confidence(search_query, expected_title, max_results=5)
             
             if not results:
-                print("No se encontraron resultados adecuados.")
+                log.warning("No se encontraron resultados adecuados.")
                 return None
                 
             # Si el mejor resultado tiene alta confianza (>70), descargarlo directamente
             if results[0]['confidence'] >= 70:
-                print(f"Descargando: {results[0]['title']} (Confianza: {results[0]['confidence']:.1f}%)")
+                log.info(f"Descargando: {results[0]['title']} (Confianza: {results[0]['confidence']:.1f}%)")
                 return self.download_video(results[0])
                 
             # Si no hay suficiente confianza, mostrar opciones
@@ -213,5 +220,5 @@ class SmartDownloader:
                 except ValueError:
                     print("Por favor ingrese un número o 's' para salir.")
         except Exception as e:
-            print(f"Error al procesar la búsqueda: {e}")
+            log.error(f"Error al procesar la búsqueda: {e}")
             return None
\ No newline at end of file
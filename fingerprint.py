@@ -0,0 +1,279 @@
+"""
+Huellas acústicas para reconocer la misma grabación con distinto nombre
+
+Las importaciones usan el nombre del archivo como título y las descargas el
+título que devuelve YouTube, así que la misma canción puede acabar en la
+biblioteca varias veces. La huella no depende del nombre ni de la
+codificación: se decodifica el principio de la canción a PCM mono a baja
+frecuencia, se calcula la FFT de ventanas solapadas y cada ventana se reduce
+a 32 bits que indican si la energía sube o baja entre bandas vecinas y entre
+ventanas consecutivas (esquema de Haitsma y Kalker).
+
+Para buscar, cada valor de 32 bits se usa como clave de un índice invertido;
+los candidatos que coinciden con un mismo desfase se verifican contando los
+bits distintos (tasa de error de bits).
+"""
+import base64
+import os
+import subprocess
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from storage import JsonStore
+
+SAMPLE_RATE = 5512
+WINDOW = 2048  # ~0.37 s
+HOP = 256  # ~46 ms entre ventanas
+SECONDS = 60  # Solo se analiza el principio de cada canción
+BANDS = 33  # 33 bandas -> 32 diferencias -> 32 bits por ventana
+MIN_FREQ, MAX_FREQ = 300.0, 2000.0
+
+# Tasa de bits distintos por debajo de la cual dos huellas son la misma grabación
+MATCH_THRESHOLD = 0.35
+# Ventanas coincidentes (con el mismo desfase) para considerar un candidato
+MIN_VOTES = 3
+
+
+def decode_pcm(path: str, seconds: float = SECONDS):
+    """PCM mono a SAMPLE_RATE como array de NumPy (ffmpeg, o pygame si no hay ffmpeg)"""
+    import numpy as np
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-t', str(seconds), '-i', path,
+             '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+        return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32)
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        pass
+
+    import pygame
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    frequency = pygame.mixer.get_init()[0]
+    raw = pygame.sndarray.array(pygame.mixer.Sound(path))
+    samples = raw.astype(np.float32)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    samples = samples[:int(seconds * frequency)]
+    # Remuestreo lineal a SAMPLE_RATE
+    positions = np.arange(0, len(samples), frequency / SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _band_edges():
+    import numpy as np
+    freqs = np.geomspace(MIN_FREQ, MAX_FREQ, BANDS + 1)
+    return np.round(freqs * WINDOW / SAMPLE_RATE).astype(np.int64)
+
+
+def compute(samples):
+    """Huella de una señal: array uint32 con un valor por ventana"""
+    import numpy as np
+    if len(samples) < WINDOW + HOP:
+        return np.zeros(0, dtype=np.uint32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, WINDOW)[::HOP]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(WINDOW), axis=1)) ** 2
+    edges = _band_edges()
+    energy = np.add.reduceat(spectrum[:, edges[0]:edges[-1]], edges[:-1] - edges[0], axis=1)
+    # Bit m de la ventana n: (E[n,m] - E[n,m+1]) - (E[n-1,m] - E[n-1,m+1]) > 0
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    weights = (1 << np.arange(BANDS - 2, -1, -1, dtype=np.uint64)).astype(np.uint64)
+    return (bits.astype(np.uint64) @ weights).astype(np.uint32)
+
+
+def fingerprint_file(path: str):
+    """Huella de un archivo de audio, o None si no se puede decodificar"""
+    try:
+        samples = decode_pcm(path)
+    except Exception:
+        return None
+    fp = compute(samples)
+    return fp if len(fp) else None
+
+
+def bit_error_rate(a, b, offset: int = 0) -> float:
+    """Fracción de bits distintos entre a y b desplazada b en offset ventanas"""
+    import numpy as np
+    if offset >= 0:
+        a = a[offset:]
+    else:
+        b = b[-offset:]
+    n = min(len(a), len(b))
+    if n == 0:
+        return 1.0
+    diff = np.bitwise_xor(a[:n], b[:n])
+    return float(np.unpackbits(diff.view(np.uint8)).sum()) / (n * 32)
+
+
+def encode(fp) -> str:
+    return base64.b64encode(fp.astype('<u4').tobytes()).decode('ascii')
+
+
+def decode(text: str):
+    import numpy as np
+    return np.frombuffer(base64.b64decode(text), dtype='<u4').astype(np.uint32)
+
+
+class FingerprintIndex:
+    """
+    Huellas de la biblioteca guardadas en disco, con índice invertido en memoria
+
+    Args:
+        path: archivo JSON con {song_id: {"mtime": ..., "fp": base64}}
+    """
+
+    def __init__(self, path: str):
+        self.store = JsonStore(path)
+        self._fps = None  # song_id -> array uint32 (decodificadas)
+        self._lookup = None  # valor de 32 bits -> [(song_id, ventana)]
+        self._source = None  # documento del que se construyó el índice
+        # El hilo de análisis añade huellas mientras otro puede estar buscando
+        self._lock = threading.RLock()
+
+    # ========== Mantenimiento ==========
+
+    def has(self, song_id: str, mtime: Optional[float] = None) -> bool:
+        entry = self.store.data.get(song_id)
+        return bool(entry) and (mtime is None or entry.get("mtime") == mtime)
+
+    def add(self, song_id: str, fp, mtime: Optional[float] = None):
+        text = encode(fp)
+        with self._lock:
+            self.store.set(song_id, {"mtime": mtime, "fp": text})
+            # El índice invertido se actualiza solo para esta canción (no se reconstruye entero)
+            if self._indexed():
+                self._unindex(song_id)
+                self._index(song_id, decode(text))
+
+    def remove(self, song_id: str) -> bool:
+        with self._lock:
+            removed = self.store.delete(song_id)
+            if self._indexed():
+                self._unindex(song_id)
+            return removed
+
+    def build_many(self, paths: Dict[str, Tuple[str, Optional[float]]], workers: Optional[int] = None,
+                   on_result: Optional[Callable[[str, bool], None]] = None) -> int:
+        """
+        Calcula en paralelo las huellas de varias canciones (cada una es un proceso ffmpeg)
+
+        Args:
+            paths: {song_id: (ruta, mtime)}
+            on_result: se llama con (song_id, éxito) según van terminando
+        """
+        workers = workers or os.cpu_count() or 2
+        computed = {}
+        # La decodificación va fuera del cerrojo del documento; las huellas se guardan juntas al final
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fingerprint_file, path): song_id for song_id, (path, _) in paths.items()}
+            for future in as_completed(futures):
+                song_id = futures[future]
+                fp = future.result()
+                if fp is not None:
+                    computed[song_id] = fp
+                if on_result:
+                    on_result(song_id, fp is not None)
+        with self.store.batch():
+            for song_id, fp in computed.items():
+                self.add(song_id, fp, paths[song_id][1])
+        return len(computed)
+
+    def _indexed(self) -> bool:
+        """El índice en memoria corresponde al documento actual"""
+        return self._lookup is not None and self._source is self.store.data
+
+    def _index(self, song_id: str, fp):
+        self._fps[song_id] = fp
+        for frame, value in enumerate(fp.tolist()):
+            self._lookup[value].append((song_id, frame))
+
+    def _unindex(self, song_id: str):
+        fp = self._fps.pop(song_id, None)
+        if fp is None:
+            return
+        for value in set(fp.tolist()):
+            entries = [entry for entry in self._lookup.get(value, ()) if entry[0] != song_id]
+            if entries:
+                self._lookup[value] = entries
+            else:
+                self._lookup.pop(value, None)
+
+    def _ensure_lookup(self):
+        with self._lock:
+            data = self.store.data
+            # El documento se sustituye si el archivo cambia en disco
+            if self._lookup is not None and self._source is data:
+                return
+            self._fps = {}
+            self._lookup = defaultdict(list)
+            self._source = data
+            for song_id, entry in data.items():
+                if entry.get("fp"):
+                    self._index(song_id, decode(entry["fp"]))
+
+    # ========== Búsqueda ==========
+
+    def match(self, fp, exclude: Optional[str] = None, threshold: float = MATCH_THRESHOLD) -> List[Tuple[str, float]]:
+        """
+        Canciones de la biblioteca con la misma grabación que la huella dada
+
+        Returns:
+            [(song_id, similitud 0-1)] de más a menos parecida
+        """
+        with self._lock:
+            self._ensure_lookup()
+            votes = Counter()
+            for frame, value in enumerate(fp.tolist()):
+                for song_id, other_frame in self._lookup.get(value, ()):
+                    if song_id != exclude:
+                        votes[(song_id, other_frame - frame)] += 1
+
+            best = {}
+            for (song_id, offset), count in votes.most_common():
+                if count < MIN_VOTES:
+                    break
+                if song_id in best:
+                    continue
+                ber = bit_error_rate(self._fps[song_id], fp, offset)
+                if ber <= threshold:
+                    best[song_id] = 1.0 - ber
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)
+
+    def identify(self, path: str) -> Optional[List[Tuple[str, float]]]:
+        """Busca un archivo externo en la biblioteca (None si no se puede decodificar)"""
+        fp = fingerprint_file(path)
+        if fp is None:
+            return None
+        return self.match(fp)
+
+    def duplicates(self) -> List[List[str]]:
+        """Grupos de canciones que son la misma grabación"""
+        with self._lock:
+            self._ensure_lookup()
+            fps = list(self._fps.items())
+        parent = {}
+
+        def find(song_id):
+            while parent.get(song_id, song_id) != song_id:
+                song_id = parent[song_id]
+            return song_id
+
+        for song_id, fp in fps:
+            for other, _ in self.match(fp, exclude=song_id):
+                a, b = find(song_id), find(other)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+
+        groups = defaultdict(list)
+        for song_id in parent:
+            groups[find(song_id)].append(song_id)
+        for root, members in groups.items():
+            if root not in members:
+                members.append(root)
+        return [sorted(members, key=lambda s: int(s) if s.isdigit() else s) for members in groups.values()]
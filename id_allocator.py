@@ -0,0 +1,117 @@
+"""
+Reparto de IDs de canciones y listas sin colisiones
+
+Cada secuencia guarda su siguiente valor en un archivo JSON compartido
+(Songs/counter.json). La lectura-incremento-escritura se hace bajo un cerrojo
+de hilo y un bloqueo de archivo, de modo que varios hilos de descarga o varios
+procesos de PyMusic nunca reciben el mismo ID. reserve(n) aparta n IDs con una
+única escritura duradera.
+"""
+import os
+import threading
+from typing import Callable, List, Optional
+
+from storage import atomic_write_json, read_json
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+class _FileLock:
+    """Bloqueo exclusivo entre procesos sobre <archivo>.lock"""
+
+    def __init__(self, path: str):
+        self.path = path + ".lock"
+        with _thread_locks_guard:
+            self._thread_lock = _thread_locks.setdefault(self.path, threading.Lock())
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                # msvcrt.locking reintenta durante ~10 s antes de fallar
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._thread_lock.release()
+
+
+class IdSequence:
+    """
+    Secuencia de IDs persistida bajo una clave del archivo de contadores
+
+    Args:
+        counter_file: archivo JSON de contadores (compartido entre secuencias)
+        key: clave dentro del archivo ('next_id', 'next_list_id', ...)
+        fmt: formato del ID devuelto ('{}' para canciones, '{}L' para listas)
+        is_taken: comprueba si un ID ya existe; esos IDs se saltan
+        start: valor inicial si la clave aún no existe en el archivo
+    """
+
+    def __init__(self, counter_file: str, key: str, fmt: str = "{}",
+                 is_taken: Optional[Callable[[str], bool]] = None,
+                 start: Optional[Callable[[], int]] = None):
+        self.counter_file = counter_file
+        self.key = key
+        self.fmt = fmt
+        self._is_taken = is_taken
+        self._start = start
+        self._lock = _FileLock(counter_file)
+
+    def next(self) -> str:
+        """Devuelve el siguiente ID libre"""
+        return self.reserve(1)[0]
+
+    def reserve(self, count: int) -> List[str]:
+        """Aparta count IDs consecutivos libres con una sola escritura"""
+        if count <= 0:
+            return []
+        with self._lock:
+            # Se relee siempre del disco: otro proceso puede haber avanzado el contador
+            counter = read_json(self.counter_file, None) or {}
+            value = counter.get(self.key)
+            if not isinstance(value, int) or value < 1:
+                value = self._start() if self._start else 1
+
+            ids = []
+            while len(ids) < count:
+                candidate = self.fmt.format(value)
+                value += 1
+                if self._is_taken and self._is_taken(candidate):
+                    continue
+                ids.append(candidate)
+
+            counter[self.key] = value
+            atomic_write_json(self.counter_file, counter)
+        return ids
+
+    def peek(self) -> int:
+        """Siguiente valor sin reservarlo (solo informativo)"""
+        counter = read_json(self.counter_file, None) or {}
+        return counter.get(self.key, self._start() if self._start else 1)
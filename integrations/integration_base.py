@@ -4,8 +4,14 @@ Este módulo proporciona una API simple para que las integraciones puedan
 interactuar con PyMusic sin modificar el código base.
 """
 import threading
+import time
 from typing import Callable, Optional, Dict, Any, List
 
+import metrics
+from logs import get_logger
+
+log = get_logger("integrations")
+
 
 class PyMusicAPI:
     """
@@ -53,6 +59,12 @@ class PyMusicAPI:
         with self._lock:
             return self._player.is_paused
     
+    @property
+    def position(self) -> float:
+        """Obtiene la posición actual de la canción en segundos"""
+        with self._lock:
+            return self._player.clock.position if self._player.is_playing else 0.0
+    
     @property
     def volume(self) -> float:
         """Obtiene el volumen actual (0.0 - 3.0)"""
@@ -70,15 +82,12 @@ class PyMusicAPI:
             import os
             import json
             playlists = {}
-            for file in os.listdir(self._player.lists_dir):
-                if file.endswith('.json'):
-                    playlist_id = file[:-5]
-                    with open(os.path.join(self._player.lists_dir, file), 'r') as f:
-                        playlist_data = json.load(f)
-                        playlists[playlist_id] = playlist_data.get('name', playlist_id)
+            for file in self._player.library.playlist_files():
+                playlist_id = os.path.splitext(file)[0]
+                playlists[playlist_id] = self._player._load_playlist(playlist_id).name or playlist_id
             return playlists
         except Exception as e:
-            print(f"Error al obtener playlists: {e}")
+            log.error(f"Error al obtener playlists: {e}")
             return {}
     
     def get_all_songs(self) -> Dict[str, str]:
@@ -87,17 +96,30 @@ class PyMusicAPI:
             import os
             import json
             songs = {}
-            metadata_file = os.path.join(self._player.songs_dir, 'metadata.json')
-            if os.path.exists(metadata_file):
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                    for song_id, song_data in metadata.items():
-                        songs[song_id] = song_data.get('title', f'Canción {song_id}')
+            for song_id, song in self._player.metadata.data.items():
+                songs[song_id] = song.display_title
             return songs
         except Exception as e:
-            print(f"Error al obtener canciones: {e}")
+            log.error(f"Error al obtener canciones: {e}")
+            return {}
+    
+    def get_song(self, song_id: str) -> Optional[Dict[str, Any]]:
+        """Metadatos de una canción como en metadata.json (title, added_date, gain_db...), o None"""
+        song = self._player.metadata.data.get(song_id)
+        return song.to_json() if song else None
+    
+    def search_songs(self, query: str, limit: int = 20) -> Dict[str, str]:
+        """Busca canciones por título {id: título}, de más a menos relevante"""
+        try:
+            return dict(self._player.search_library(query, limit))
+        except Exception as e:
+            log.error(f"Error al buscar canciones: {e}")
             return {}
     
+    def get_command_timings(self) -> Dict[str, Dict[str, Any]]:
+        """Tiempos acumulados por comando en esta sesión {comando: {calls, avg_ms, max_ms, ...}}"""
+        return self._player.profiler.get_stats()
+    
     # ========== COMMANDS - Enviar órdenes ==========
     
     def next_song(self) -> bool:
@@ -105,11 +127,11 @@ class PyMusicAPI:
         try:
             with self._lock:
                 if self._player.is_playing and self._player.current_playlist:
-                    self._player.play_next_song()
+                    self._player.skip_song()
                     return True
             return False
         except Exception as e:
-            print(f"Error al pasar a la siguiente canción: {e}")
+            log.error(f"Error al pasar a la siguiente canción: {e}")
             return False
     
     def play_playlist(self, playlist_id: str) -> bool:
@@ -119,7 +141,7 @@ class PyMusicAPI:
                 self._player.play_playlist(playlist_id)
                 return True
         except Exception as e:
-            print(f"Error al reproducir playlist: {e}")
+            log.error(f"Error al reproducir playlist: {e}")
             return False
     
     def play_song(self, song_id: str) -> bool:
@@ -129,7 +151,7 @@ class PyMusicAPI:
                 self._player.play_song(song_id)
                 return True
         except Exception as e:
-            print(f"Error al reproducir canción: {e}")
+            log.error(f"Error al reproducir canción: {e}")
             return False
     
     def pause(self) -> bool:
@@ -141,7 +163,7 @@ class PyMusicAPI:
                     return True
             return False
         except Exception as e:
-            print(f"Error al pausar: {e}")
+            log.error(f"Error al pausar: {e}")
             return False
     
     def resume(self) -> bool:
@@ -153,7 +175,7 @@ class PyMusicAPI:
                     return True
             return False
         except Exception as e:
-            print(f"Error al reanudar: {e}")
+            log.error(f"Error al reanudar: {e}")
             return False
     
     def stop(self) -> bool:
@@ -163,7 +185,18 @@ class PyMusicAPI:
                 self._player.stop_playback()
                 return True
         except Exception as e:
-            print(f"Error al detener: {e}")
+            log.error(f"Error al detener: {e}")
+            return False
+    
+    def seek(self, seconds: float) -> bool:
+        """Salta a una posición (en segundos) de la canción actual"""
+        try:
+            with self._lock:
+                if self._player.is_playing and self._player.current_song_id:
+                    return self._player.seek_to(float(seconds))
+            return False
+        except Exception as e:
+            log.error(f"Error al cambiar de posición: {e}")
             return False
     
     def set_volume(self, volume: float) -> bool:
@@ -175,7 +208,7 @@ class PyMusicAPI:
                 self._player.set_volume(str(int(volume * 100)))
                 return True
         except Exception as e:
-            print(f"Error al establecer volumen: {e}")
+            log.error(f"Error al establecer volumen: {e}")
             return False
 
 
@@ -207,22 +240,34 @@ class IntegrationManager:
         if event_type in self._event_handlers:
             self._event_handlers[event_type].append(handler)
         else:
-            print(f"Advertencia: Tipo de evento desconocido: {event_type}")
+            log.warning(f"Advertencia: Tipo de evento desconocido: {event_type}")
     
     def trigger_event(self, event_type: str, data: Dict[str, Any] = None):
         """Dispara un evento a todos los manejadores registrados"""
         if event_type in self._event_handlers:
+            latency = metrics.EVENT_HANDLER_SECONDS.labels(event_type)
             for handler in self._event_handlers[event_type]:
+                started = time.perf_counter()
                 try:
                     if data:
                         handler(data)
                     else:
                         handler()
                 except Exception as e:
-                    print(f"Error en manejador de evento {event_type}: {e}")
+                    metrics.EVENT_HANDLER_ERRORS.labels(event_type).inc()
+                    log.error(f"Error en manejador de evento {event_type}: {e}",
+                              extra={"event": "handler_error", "event_type": event_type})
+                finally:
+                    latency.observe(time.perf_counter() - started)
     
     def load_integrations(self):
-        """Carga automáticamente todas las integraciones en la carpeta integrations"""
+        """
+        Carga automáticamente todas las integraciones en la carpeta integrations
+
+        Se puede llamar más de una vez: las integraciones ya cargadas no se
+        vuelven a ejecutar (ni a registrar sus manejadores) y cada carpeta se
+        añade a sys.path una sola vez.
+        """
         import os
         import importlib
         import sys
@@ -235,10 +280,11 @@ class IntegrationManager:
         
         # Ignorar ciertos directorios
         ignore_dirs = {'__pycache__', 'example'}  # example es solo para documentación
+        loaded = {integration['name'] for integration in self._integrations}
         
         for item in os.listdir(integrations_dir):
             # Ignorar archivos y directorios especiales
-            if item.startswith('.') or item in ignore_dirs:
+            if item.startswith('.') or item in ignore_dirs or item in loaded:
                 continue
                 
             integration_path = os.path.join(integrations_dir, item)
@@ -255,14 +301,15 @@ class IntegrationManager:
                         # Cargar el módulo desde el archivo
                         spec = importlib.util.spec_from_file_location(module_name, integration_file)
                         if spec is None or spec.loader is None:
-                            print(f"⚠ No se pudo crear spec para {item}")
+                            log.warning(f"⚠ No se pudo crear spec para {item}")
                             continue
                             
                         module = importlib.util.module_from_spec(spec)
                         
                         # Añadir el directorio de la integración al path para imports relativos
+                        # (al final: delante haría que cada import posterior mirase primero ahí)
                         if integration_path not in sys.path:
-                            sys.path.insert(0, integration_path)
+                            sys.path.append(integration_path)
                         
                         # Ejecutar el módulo
                         spec.loader.exec_module(module)
@@ -278,18 +325,14 @@ class IntegrationManager:
                             try:
                                 module.initialize(self._api, self)
                                 self._integrations.append(integration_data)
-                                print(f"✓ Integración cargada: {item}")
+                                log.info(f"✓ Integración cargada: {item}")
                             except Exception as e:
-                                print(f"⚠ Error al inicializar integración {item}: {e}")
-                                import traceback
-                                traceback.print_exc()
+                                log.exception(f"⚠ Error al inicializar integración {item}: {e}")
                         else:
-                            print(f"⚠ Integración {item} no tiene función 'initialize'")
+                            log.warning(f"⚠ Integración {item} no tiene función 'initialize'")
                     
                     except Exception as e:
-                        print(f"⚠ Error al cargar integración {item}: {e}")
-                        import traceback
-                        traceback.print_exc()
+                        log.exception(f"⚠ Error al cargar integración {item}: {e}")
     
     def get_api(self) -> PyMusicAPI:
         """Obtiene la instancia de la API para uso interno"""
@@ -9,24 +9,51 @@ import os
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
 
+import metrics
+from logs import get_logger
+
+log = get_logger("server")
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 STREAMLABS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 class StreamlabsHandler(http.server.SimpleHTTPRequestHandler):
     """Manejador HTTP personalizado para servir el overlay de Streamlabs"""
     
+    # Rutas que se cuentan por separado en pymusic_http_requests_total (el resto va como "other")
+    KNOWN_PATHS = {'/', '/index.html', '/api/current-song', '/api/command-timings', '/metrics'}
+    
     def __init__(self, *args, music_player=None, **kwargs):
         self.music_player = music_player
+        self._status = None
         super().__init__(*args, **kwargs)
     
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+    
     def do_GET(self):
         """Maneja las peticiones GET"""
         parsed_path = urlparse(self.path)
         path = parsed_path.path
-        
+        self._status = None
+        try:
+            self.route(path)
+        finally:
+            label = path if path in self.KNOWN_PATHS else '/assets/' if path.startswith('/assets/') else 'other'
+            metrics.HTTP_REQUESTS.labels(label, self._status or 0).inc()
+    
+    def route(self, path):
+        """Atiende una ruta GET"""
         # Endpoint para obtener información de la canción actual
         if path == '/api/current-song':
             self.send_song_info()
+        # Tiempos acumulados de cada comando en esta sesión
+        elif path == '/api/command-timings':
+            self.send_command_timings()
+        # Métricas para Prometheus
+        elif path == '/metrics':
+            self.send_metrics()
         # Servir el HTML del overlay
         elif path == '/' or path == '/index.html':
             self.serve_overlay()
@@ -43,6 +70,7 @@ class StreamlabsHandler(http.server.SimpleHTTPRequestHandler):
                 song_info = {
                     "song_name": self.music_player.current_song_title or "No hay canción reproduciéndose",
                     "duration": self.music_player.current_song_duration,
+                    "position": round(self.music_player.clock.position, 2) if self.music_player.is_playing else 0,
                     "playlist_name": self.music_player.current_playlist_name or "Reproducción individual",
                     "is_playing": self.music_player.is_playing and not self.music_player.is_paused
                 }
@@ -50,6 +78,7 @@ class StreamlabsHandler(http.server.SimpleHTTPRequestHandler):
                 song_info = {
                     "song_name": "No hay información disponible",
                     "duration": 0,
+                    "position": 0,
                     "playlist_name": "N/A",
                     "is_playing": False
                 }
@@ -62,6 +91,30 @@ class StreamlabsHandler(http.server.SimpleHTTPRequestHandler):
         except Exception as e:
             self.send_error(500, f"Error: {str(e)}")
     
+    def send_command_timings(self):
+        """Envía en JSON los tiempos acumulados por comando (llamadas, ms, lecturas, escrituras...)"""
+        try:
+            timings = self.music_player.profiler.get_stats() if self.music_player else {}
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps(timings, ensure_ascii=False).encode('utf-8'))
+        except Exception as e:
+            self.send_error(500, f"Error: {str(e)}")
+    
+    def send_metrics(self):
+        """Envía las métricas en el formato de texto de Prometheus"""
+        try:
+            body = metrics.exposition(self.music_player).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', metrics.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except Exception as e:
+            self.send_error(500, f"Error: {str(e)}")
+    
     def serve_overlay(self):
         """Sirve el archivo HTML del overlay"""
         overlay_path = os.path.join(STREAMLABS_DIR, 'overlay.html')
@@ -128,14 +181,14 @@ def start_server(music_player, port=8765):
     
     try:
         with socketserver.TCPServer(("", port), handler_class) as httpd:
-            print(f"Servidor Streamlabs iniciado en http://localhost:{port}")
-            print(f"Accede al overlay en: http://localhost:{port}/")
+            log.info(f"Servidor Streamlabs iniciado en http://localhost:{port}")
+            log.info(f"Accede al overlay en: http://localhost:{port}/")
             httpd.serve_forever()
     except OSError as e:
         if "Address already in use" in str(e):
-            print(f"Error: El puerto {port} ya está en uso. Intenta con otro puerto.")
+            log.error(f"Error: El puerto {port} ya está en uso. Intenta con otro puerto.")
         else:
-            print(f"Error al iniciar el servidor: {e}")
+            log.error(f"Error al iniciar el servidor: {e}")
     except KeyboardInterrupt:
-        print("\nServidor detenido")
+        log.info("Servidor detenido")
 
@@ -0,0 +1,341 @@
+"""
+Índice en memoria de la biblioteca (Songs/ y Lists/)
+
+Un hilo en segundo plano mantiene actualizada la lista de archivos de cada
+carpeta usando inotify (Linux) o, si no está disponible, sondeando las carpetas
+periódicamente. Así los comandos interactivos consultan el índice en lugar de
+recorrer el disco, y las descargas pueden saber exactamente qué archivo crearon.
+"""
+import os
+import re
+import select
+import struct
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+SONGS = "songs"
+LISTS = "lists"
+
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.flac', '.ogg', '.webm', '.opus', '.wav')
+PLAYLIST_EXTENSIONS = ('.list', '.json')  # v2 y v1 (ver playlist_format), en orden de preferencia
+
+# Constantes de inotify (<sys/inotify.h>)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO |
+               _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Envoltorio mínimo de inotify mediante ctypes (sin dependencias externas)"""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+        self._ctypes = ctypes
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(self._ctypes.get_errno(), f"inotify_add_watch falló para {path}")
+        return wd
+
+    def read_events(self):
+        """Lee los eventos pendientes sin bloquear: lista de (wd, mask, nombre)"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            if not data:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class LibraryIndex:
+    """
+    Vista en memoria de las carpetas Songs/ y Lists/
+
+    Cada carpeta se guarda como {nombre_archivo: mtime}. Las consultas esperan a
+    que termine el escaneo inicial, que se hace en el hilo de fondo para no
+    retrasar el arranque.
+    """
+
+    def __init__(self, songs_dir: str, lists_dir: str, poll_interval: float = 2.0):
+        self._dirs = {SONGS: songs_dir, LISTS: lists_dir}
+        self._files: Dict[str, Dict[str, float]] = {SONGS: {}, LISTS: {}}
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, str] = {}
+        self._poll_interval = poll_interval
+        # Registro de archivos añadidos: (secuencia, carpeta, nombre)
+        self._seq = 0
+        self._added = deque(maxlen=512)
+        # Resúmenes de listas ({'name', 'count'}) válidos mientras no cambie su mtime
+        self._summaries: Dict[str, tuple] = {}
+        self.backend = None
+
+    # ========== Ciclo de vida ==========
+
+    def start(self):
+        """Arranca el hilo que hace el escaneo inicial y vigila las carpetas"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        try:
+            self._inotify = _Inotify()
+            for key, path in self._dirs.items():
+                self._watches[self._inotify.add_watch(path)] = key
+            self.backend = "inotify"
+        except (OSError, AttributeError):
+            # Sin inotify (Windows, macOS o límite de watches alcanzado): sondeo
+            if self._inotify:
+                self._inotify.close()
+            self._inotify = None
+            self._watches = {}
+            self.backend = "polling"
+        self._thread = threading.Thread(target=self._run, name="LibraryIndex", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo de vigilancia"""
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def _run(self):
+        try:
+            self.rescan()
+        finally:
+            # Aunque el escaneo falle, las consultas no deben esperar para siempre
+            self._ready.set()
+        while not self._stop.is_set():
+            if self._inotify:
+                try:
+                    readable, _, _ = select.select([self._inotify.fd], [], [], 0.5)
+                except (OSError, ValueError):
+                    return
+                if readable:
+                    with self._lock:
+                        self._drain_events()
+            else:
+                self._stop.wait(self._poll_interval)
+                if not self._stop.is_set():
+                    self.rescan()
+
+    # ========== Actualización ==========
+
+    def rescan(self, key: Optional[str] = None):
+        """Vuelve a leer una carpeta (o todas) y registra los archivos nuevos"""
+        for k in ([key] if key else list(self._dirs)):
+            current = {}
+            try:
+                with os.scandir(self._dirs[k]) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_file():
+                                current[entry.name] = entry.stat().st_mtime
+                        except OSError:
+                            continue  # Borrado (o inaccesible) entre scandir y stat: solo se omite ese
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # Carpeta ilegible: se conserva lo que ya había en el índice
+            with self._lock:
+                previous = self._files[k]
+                for name in current:
+                    if name not in previous:
+                        self._record_added(k, name)
+                self._files[k] = current
+                if k == LISTS:
+                    for name in [n for n in self._summaries if n not in current]:
+                        del self._summaries[name]
+
+    def refresh_file(self, key: str, name: str):
+        """Actualiza una entrada concreta (para reflejar al instante escrituras propias)"""
+        try:
+            mtime = os.stat(os.path.join(self._dirs[key], name)).st_mtime
+        except OSError:
+            mtime = None
+        with self._lock:
+            files = self._files[key]
+            if mtime is None:
+                files.pop(name, None)
+                self._summaries.pop(name, None)
+            else:
+                if name not in files:
+                    self._record_added(key, name)
+                files[name] = mtime
+
+    def _record_added(self, key: str, name: str):
+        self._seq += 1
+        self._added.append((self._seq, key, name))
+
+    def _drain_events(self):
+        overflow = False
+        for wd, mask, name in self._inotify.read_events():
+            if mask & _IN_Q_OVERFLOW or mask & _IN_DELETE_SELF:
+                overflow = True
+                continue
+            key = self._watches.get(wd)
+            if key is None or not name or mask & _IN_ISDIR:
+                continue
+            self.refresh_file(key, name)
+        if overflow:
+            self.rescan()
+
+    def sync(self):
+        """Procesa los cambios pendientes antes de una consulta que necesita precisión"""
+        self._ready.wait()
+        if self._inotify:
+            with self._lock:
+                self._drain_events()
+        else:
+            self.rescan(SONGS)
+
+    # ========== Consultas ==========
+
+    def _snapshot(self, key: str) -> Dict[str, float]:
+        self._ready.wait()
+        with self._lock:
+            return dict(self._files[key])
+
+    def song_files(self) -> List[str]:
+        """Nombres de los archivos .mp3 de Songs/"""
+        return [name for name in self._snapshot(SONGS) if name.lower().endswith('.mp3')]
+
+    def has_song(self, song_id: str) -> bool:
+        self._ready.wait()
+        with self._lock:
+            return f"{song_id}.mp3" in self._files[SONGS]
+
+    def missing_songs(self, song_ids: Iterable[str]) -> List[str]:
+        """Los IDs de song_ids que no tienen archivo, consultando el índice una sola vez"""
+        self._ready.wait()
+        with self._lock:
+            files = self._files[SONGS]
+            return [song_id for song_id in song_ids if f"{song_id}.mp3" not in files]
+
+    def song_mtime(self, song_id: str) -> Optional[float]:
+        self._ready.wait()
+        with self._lock:
+            return self._files[SONGS].get(f"{song_id}.mp3")
+
+    def playlist_files(self, include_temp: bool = False) -> List[str]:
+        """Nombres de los archivos de Lists/ (uno por lista), ordenados por ID numérico"""
+        names = self._snapshot(LISTS)
+        if include_temp:
+            return sorted(names, key=_numeric_key)
+        # Si una lista está en los dos formatos (conversión a medias), manda la v2
+        chosen = {}
+        for name in names:
+            base, ext = os.path.splitext(name)
+            if ext in PLAYLIST_EXTENSIONS:
+                current = chosen.get(base)
+                if current is None or PLAYLIST_EXTENSIONS.index(ext) < PLAYLIST_EXTENSIONS.index(current[1]):
+                    chosen[base] = (name, ext)
+        return sorted((name for name, _ in chosen.values()), key=_numeric_key)
+
+    def playlist_file(self, playlist_id: str) -> Optional[str]:
+        """Nombre del archivo de una lista (el de formato más reciente) o None"""
+        self._ready.wait()
+        with self._lock:
+            files = self._files[LISTS]
+            for ext in PLAYLIST_EXTENSIONS:
+                if playlist_id + ext in files:
+                    return playlist_id + ext
+        return None
+
+    def has_playlist(self, playlist_id: str) -> bool:
+        return self.playlist_file(playlist_id) is not None
+
+    def playlist_summary(self, name: str, load: Callable[[str], dict]) -> Optional[dict]:
+        """
+        Resumen de una lista ({'name': ..., 'count': ...}) sin releer el archivo
+
+        load(nombre) solo se llama si la lista cambió desde la última vez.
+        """
+        self._ready.wait()
+        with self._lock:
+            mtime = self._files[LISTS].get(name)
+            cached = self._summaries.get(name)
+        if mtime is None:
+            return None
+        if cached and cached[0] == mtime:
+            return cached[1]
+        summary = load(name)
+        with self._lock:
+            self._summaries[name] = (mtime, summary)
+        return summary
+
+    def store_playlist_summary(self, name: str, summary: dict):
+        """Registra el resumen de una lista recién escrita por el propio programa"""
+        self.refresh_file(LISTS, name)
+        with self._lock:
+            mtime = self._files[LISTS].get(name)
+            if mtime is not None:
+                self._summaries[name] = (mtime, summary)
+
+    def next_playlist_id(self) -> str:
+        """Primer ID de lista libre por encima del mayor existente"""
+        highest = 0
+        for name in self.playlist_files():
+            match = re.match(r"(\d+)L\.", name)
+            if match:
+                highest = max(highest, int(match.group(1)))
+        return f"{highest + 1}L"
+
+    def mark(self) -> int:
+        """Devuelve una marca para consultar después qué archivos han aparecido"""
+        self._ready.wait()
+        with self._lock:
+            return self._seq
+
+    def added_since(self, token: int, key: str = SONGS) -> List[str]:
+        """Archivos de audio que aparecieron después de la marca y que aún existen"""
+        self.sync()
+        with self._lock:
+            files = self._files[key]
+            names = [name for seq, k, name in self._added
+                     if seq > token and k == key and name in files]
+        seen = set()
+        return [n for n in names
+                if n.lower().endswith(AUDIO_EXTENSIONS) and not (n in seen or seen.add(n))]
+
+
+def _numeric_key(name: str):
+    """Ordena '2L.json' antes que '10L.json' y deja lo no numérico al final"""
+    match = re.match(r"(\d+)", name)
+    return (0, int(match.group(1)), name) if match else (1, 0, name)
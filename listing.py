@@ -0,0 +1,110 @@
+"""
+Listados paginados para los comandos songs, lists y showlist
+
+Los comandos aceptan --page, --limit y --sort. Solo se ordena lo necesario
+para la página pedida (heapq.nsmallest sobre page * limit elementos) y las
+líneas se generan bajo demanda, así que una biblioteca grande no inunda la
+terminal ni formatea miles de líneas que no se van a mostrar.
+"""
+import heapq
+import re
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_LIMIT = 50
+
+
+class ListOptions:
+    """Opciones de un listado ya interpretadas"""
+
+    def __init__(self, page: int = 1, limit: int = DEFAULT_LIMIT, sort: Optional[str] = None):
+        self.page = page
+        self.limit = limit  # 0: sin límite
+        self.sort = sort
+
+
+def parse_options(args: Iterable[str], sorts: Iterable[str], default_sort: str,
+                  default_limit: int = DEFAULT_LIMIT) -> Tuple[ListOptions, List[str]]:
+    """
+    Separa --page N, --limit N y --sort campo del resto de argumentos
+
+    Acepta también la forma --opcion=valor.
+
+    Raises:
+        ValueError: con un mensaje para el usuario si alguna opción no es válida
+    """
+    sorts = tuple(sorts)
+    options = ListOptions(limit=default_limit, sort=default_sort)
+    rest = []
+    args = list(args)
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if not arg.startswith("--"):
+            rest.append(arg)
+            i += 1
+            continue
+        name, _, value = arg[2:].partition("=")
+        if not value:
+            if i + 1 >= len(args):
+                raise ValueError(f"Falta el valor de --{name}")
+            value = args[i + 1]
+            i += 1
+        i += 1
+
+        if name in ("page", "limit"):
+            if not value.isdigit() or (name == "page" and int(value) < 1):
+                raise ValueError(f"--{name} debe ser un número {'mayor que 0' if name == 'page' else 'positivo'}")
+            setattr(options, name, int(value))
+        elif name == "sort":
+            if value not in sorts:
+                raise ValueError(f"--sort debe ser uno de: {', '.join(sorts)}")
+            options.sort = value
+        else:
+            raise ValueError(f"Opción desconocida: --{name}")
+    return options, rest
+
+
+def numeric_key(item_id: str):
+    """Ordena '2' antes que '10' (y '2L' antes que '10L'); lo no numérico va al final"""
+    match = re.match(r"(\d+)", item_id)
+    return (0, int(match.group(1)), item_id) if match else (1, 0, item_id)
+
+
+def paginate(items: List, options: ListOptions,
+             key: Optional[Callable] = None) -> Tuple[Iterator[Tuple[int, object]], int, int]:
+    """
+    Elementos de la página pedida, numerados desde su posición global
+
+    Args:
+        items: todos los elementos
+        key: orden (None conserva el orden de items)
+
+    Returns:
+        (generador de (número, elemento), total de elementos, total de páginas)
+    """
+    total = len(items)
+    limit = options.limit or total or 1
+    pages = max(1, -(-total // limit))
+    start = (options.page - 1) * limit
+    end = start + limit
+    if key is None:
+        window = islice(items, start, end)
+    elif end < total:
+        # Solo se ordenan los primeros page * limit elementos
+        window = heapq.nsmallest(end, items, key=key)[start:]
+    else:
+        window = sorted(items, key=key)[start:end]
+    return enumerate(window, start + 1), total, pages
+
+
+def print_page(lines: Iterable[str], options: ListOptions, total: int, pages: int, command: str):
+    """Imprime las líneas de una página y cómo pasar a la siguiente"""
+    for line in lines:
+        print(line)
+    if options.page > pages:
+        print(f"La página {options.page} no existe (hay {pages})")
+    elif pages > 1:
+        hint = f" - siguiente: {command} --page {options.page + 1}" if options.page < pages else ""
+        print(f"\nPágina {options.page}/{pages} ({total} en total){hint}")
+
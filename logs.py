@@ -0,0 +1,197 @@
+"""
+Registro de eventos (logging) de PyMusic
+
+Los mensajes de estado y los errores (reproducción, descargas, integraciones,
+servidor, persistencia) pasan por loggers con niveles bajo "pymusic" en vez de
+print(). Las respuestas directas a un comando (listados, estadísticas, ayuda)
+siguen siendo print(): son la interfaz, no el registro.
+
+setup_logging() deja un QueueHandler en el logger raíz de PyMusic y un
+QueueListener escribe en la consola (y opcionalmente en un archivo) desde su
+propio hilo, así que un hilo de descarga nunca espera a la terminal. Con
+formato "json" cada evento es una línea JSON con los campos extra que se
+pasaron (event, song_id, percent...), lista para enviar y procesar.
+
+ProgressLimiter limita los eventos de progreso (yt-dlp avisa por cada bloque
+descargado) a uno cada pocas décimas de segundo.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+ROOT_LOGGER = "pymusic"
+FORMATS = ("text", "json")
+FILE_MAX_BYTES = 5 * 1024 * 1024
+FILE_BACKUPS = 3
+
+# Atributos propios de LogRecord: lo demás son los campos extra del evento
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "inline"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configured = False
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por evento: ts, level, logger, msg y los campos extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """
+    Salida por consola (sys.stdout del momento, para respetar redirecciones)
+
+    Los eventos con extra={"inline": True} (barras de progreso) se reescriben
+    en la misma línea con \\r; el siguiente evento normal empieza en una línea
+    nueva.
+    """
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+        self._inline = False
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.stream = sys.stdout
+            message = self.format(record)
+            inline = getattr(record, "inline", False) and not isinstance(self.formatter, JsonFormatter)
+            if inline:
+                self.stream.write("\r" + message)
+            else:
+                self.stream.write(("\n" if self._inline else "") + message + "\n")
+            self._inline = inline
+            self.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class ProgressLimiter:
+    """
+    Deja pasar como mucho un evento de progreso cada interval segundos por clave
+
+    El primero de cada clave pasa siempre; reset() la olvida (al terminar).
+    Las claves que nadie olvida (descargas que fallaron) se descartan solas
+    cuando hay más de max_keys: pasado el intervalo da igual tenerlas o no.
+    """
+
+    max_keys = 64
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def ready(self, key: str = "") -> bool:
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                return False
+            self._last[key] = now
+            if len(self._last) > self.max_keys:
+                self._last = {k: t for k, t in self._last.items() if now - t < self.interval}
+            return True
+
+    def reset(self, key: str = ""):
+        with self._lock:
+            self._last.pop(key, None)
+
+
+def _formatter(fmt: str, for_file: bool) -> logging.Formatter:
+    if fmt == "json":
+        return JsonFormatter()
+    if for_file:
+        return logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    return logging.Formatter("%(message)s")
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", log_file: Optional[str] = None):
+    """
+    Configura el registro de PyMusic
+
+    Args:
+        level: DEBUG, INFO, WARNING, ERROR
+        fmt: "text" (mensajes tal cual en consola) o "json" (una línea JSON por evento)
+        log_file: archivo adicional (rotado a los 5 MB); None o "" para solo consola
+    """
+    global _listener, _configured
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de registro no válido: {fmt} (usa {' o '.join(FORMATS)})")
+    numeric_level = logging.getLevelName(str(level).upper())
+    if not isinstance(numeric_level, int):
+        raise ValueError(f"Nivel de registro no válido: {level}")
+    with _setup_lock:
+        shutdown()
+        console = ConsoleHandler()
+        console.setFormatter(_formatter(fmt, for_file=False))
+        handlers = [console]
+        if log_file:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=FILE_MAX_BYTES, backupCount=FILE_BACKUPS, encoding="utf-8")
+            file_handler.setFormatter(_formatter(fmt, for_file=True))
+            handlers.append(file_handler)
+
+        log_queue = queue.SimpleQueue()
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+        logger.setLevel(numeric_level)
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _configured = True
+
+
+def shutdown():
+    """Vacía la cola y detiene el hilo de escritura (se llama también al salir)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    """
+    Logger de PyMusic ("pymusic" o "pymusic.<name>")
+
+    Si nadie ha llamado a setup_logging (PyMusic usado como biblioteca, los
+    benchmarks...), los mensajes salen por consola de forma síncrona, como
+    hacían los print() de antes.
+    """
+    global _configured
+    if not _configured:
+        with _setup_lock:
+            if not _configured:
+                console = ConsoleHandler()
+                console.setFormatter(_formatter("text", for_file=False))
+                root = logging.getLogger(ROOT_LOGGER)
+                root.addHandler(console)
+                root.setLevel(logging.INFO)
+                root.propagate = False
+                _configured = True
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}" if name else ROOT_LOGGER)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,108 @@
+"""
+Análisis de sonoridad para normalizar el volumen entre canciones
+
+Se mide cada canción una sola vez al incorporarla a la biblioteca y se guarda
+la ganancia necesaria para llevarla al nivel objetivo (estilo ReplayGain). La
+reproducción solo aplica ese número, sin analizar nada en tiempo real.
+
+Métodos, en orden de preferencia:
+- EBU R128 (sonoridad integrada en LUFS) con el filtro ebur128 de ffmpeg
+- RMS con NumPy sobre el PCM decodificado por pygame, si no hay ffmpeg
+"""
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Optional
+
+# Límites de la ganancia aplicada (dB)
+MAX_GAIN_DB = 12.0
+MIN_GAIN_DB = -24.0
+
+_EBUR128_INTEGRATED = re.compile(r"I:\s+(-?\d+(?:\.\d+)?)\s+LUFS")
+
+
+def analyze_ebur128(path: str) -> Optional[float]:
+    """Sonoridad integrada (LUFS) según EBU R128, o None si ffmpeg no está disponible"""
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-nostats', '-hide_banner', '-i', path,
+             '-filter_complex', 'ebur128', '-f', 'null', '-'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return None
+    # El resumen final es la última coincidencia
+    matches = _EBUR128_INTEGRATED.findall(result.stderr.decode('utf-8', errors='ignore'))
+    return float(matches[-1]) if matches else None
+
+
+def analyze_rms(path: str) -> Optional[float]:
+    """Nivel RMS (dBFS) del PCM decodificado; aproximación sin ponderación K"""
+    try:
+        import numpy as np
+        import pygame
+    except ImportError:
+        return None
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    sound = pygame.mixer.Sound(path)
+    raw = pygame.sndarray.array(sound)
+    if raw.size == 0:
+        return None
+    samples = raw.astype(np.float64)
+    if np.issubdtype(raw.dtype, np.integer):
+        samples /= float(np.iinfo(raw.dtype).max)
+    rms = float(np.sqrt(np.mean(np.square(samples))))
+    if rms <= 0:
+        return None
+    return 20 * np.log10(rms)
+
+
+def analyze(path: str) -> Optional[Dict[str, float]]:
+    """Mide una canción: {'loudness': valor, 'method': 'ebur128' | 'rms'} o None"""
+    loudness = analyze_ebur128(path)
+    if loudness is not None:
+        return {"loudness": loudness, "method": "ebur128"}
+    loudness = analyze_rms(path)
+    if loudness is not None:
+        return {"loudness": loudness, "method": "rms"}
+    return None
+
+
+def gain_for(loudness: float, target: float) -> float:
+    """Ganancia (dB) para llevar una canción al nivel objetivo"""
+    return round(max(MIN_GAIN_DB, min(MAX_GAIN_DB, target - loudness)), 2)
+
+
+def gain_to_factor(gain_db: float) -> float:
+    """Convierte dB a factor multiplicativo de volumen"""
+    return 10 ** (gain_db / 20)
+
+
+def analyze_many(paths: Dict[str, str], workers: Optional[int] = None,
+                 on_result: Optional[Callable[[str, Optional[Dict[str, float]]], None]] = None):
+    """
+    Analiza varias canciones en paralelo (cada análisis es un proceso ffmpeg)
+
+    Args:
+        paths: {song_id: ruta}
+        workers: número de análisis simultáneos (por defecto, núcleos disponibles)
+        on_result: se llama con (song_id, resultado) según van terminando
+    """
+    workers = workers or os.cpu_count() or 2
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyze, path): song_id for song_id, path in paths.items()}
+        for future in as_completed(futures):
+            song_id = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                result = None
+            results[song_id] = result
+            if on_result:
+                on_result(song_id, result)
+    return results
@@ -1,55 +1,120 @@
+import io
 import os
-import json
 import random
-import pygame
-import pyperclip
-import yt_dlp
 import time
 import threading
-from spotipy import Spotify
-from spotipy.oauth2 import SpotifyClientCredentials
+from collections import OrderedDict
 from password import ADMIN_PASSWORD
-from config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, DEFAULT_VOLUME
-from downloader import SmartDownloader
+from config import (SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, DEFAULT_VOLUME, AUDIO_CACHE_MB,
+                    NORMALIZE_LOUDNESS, TARGET_LOUDNESS, CROSSFADE_SECONDS, CROSSFADE_CHANNELS,
+                    FINGERPRINT_ON_IMPORT, LIST_PAGE_SIZE, LOG_LEVEL, LOG_FORMAT, LOG_FILE,
+                    LOG_PROGRESS_INTERVAL, AUDIO_OUTPUT, NORMALIZE_HEADROOM_DB)
+# pygame, yt_dlp, spotipy y pyperclip se importan en el primer uso para
+# que el arranque (y comandos como stats o lists) no pague su coste
 from user_stats import UserStats  # <-- Añade esta línea
+from audio_cache import AudioCache
+from mp3_index import Mp3FrameIndex
+from playback_clock import PlaybackClock
+from crossfade import CrossfadeEngine
+import loudness
+from fingerprint import FingerprintIndex
+from search_index import SearchIndex
+import listing
+import metrics
+import mix_export
+import playlist_format
+import profiling
+import playlist_sets
+from play_history import PlayHistory
+from smart_playlists import SmartPlaylists, SongFacts
+from library_index import LibraryIndex
+from id_allocator import IdSequence
+from storage import TEMP_SUFFIX, JsonStore, recover_json, remove_temp
+from records import Playlist, Song, songs_from_json, songs_to_json
+from audio_output import list_devices, open_output
+from zones import ZoneManager
+import logs
+
+log = logs.get_logger("player")
+download_log = logs.get_logger("download")
 
 # Obtener la ruta base del proyecto
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Volumen máximo del usuario (volume 300); equivale al volumen completo de pygame
+MAX_VOLUME = 3.0
 
 
 
 class MusicPlayer:
-    def __init__(self):
-        pygame.mixer.init()
+    def __init__(self, base_dir=BASE_DIR, output=None, shared=None):
+        """
+        base_dir: carpeta con Songs/ y Lists/
+        output: salida de audio propia (audio_output); None para pygame.mixer.music
+        shared: reproductor cuya biblioteca se comparte (zonas, ver zones.py)
+        """
         self.volume = DEFAULT_VOLUME
-        pygame.mixer.music.set_volume(self.volume)
+        # Subsistemas pesados: se crean bajo demanda (ver propiedades mixer, spotify y downloader)
+        self._mixer = output
+        self._spotify = None
+        self._spotify_loaded = False
+        self._downloader = None
+        self._analysis_pool = None  # Hilo de análisis (sonoridad, huellas) que se crea en la primera ingesta
         self.is_paused = False
-        self.paused_position = 0
+        # Posición real dentro de la canción (get_pos() de pygame no sobrevive a búsquedas)
+        # Con una salida acelerada (audio_output.NullOutput) el reloj corre a su velocidad
+        self.clock = PlaybackClock(getattr(output, "time_source", time.monotonic))
+        self._frame_indexes = OrderedDict()  # song_id -> (mtime, Mp3FrameIndex)
+        self._mutagen_missing = False
+        # Los cambios de canción (comando, fin de canción o fundido) no deben solaparse
+        self._transition_lock = threading.RLock()
+        # Fundido entre canciones; con él activo el fin de canción lo programa su planificador
+        # (las colas del fundido suenan por canales de pygame: otras salidas no lo admiten)
+        self.crossfade = CrossfadeEngine(self, CROSSFADE_SECONDS if self.supports_crossfade else 0,
+                                         CROSSFADE_CHANNELS)
         self.current_playlist = []
         self.current_song_index = 0
-        self.played_songs = set()
+        # Orden aleatorio de la vuelta actual a la lista: se saca una canción por cambio
+        self._play_queue = []
         self.check_thread = None
         self.is_playing = False
         self.downloading = False
         self.cancel_download = False
-        self.stats = UserStats()  # Inicializar estadísticas
+        # yt-dlp avisa del progreso por cada bloque: solo se muestra cada LOG_PROGRESS_INTERVAL segundos
+        self._download_progress = logs.ProgressLimiter(LOG_PROGRESS_INTERVAL)
+        # Las zonas usan las estadísticas y la caché de audio del reproductor principal
+        self.stats = shared.stats if shared is not None else UserStats()  # Inicializar estadísticas
+        # Tiempo, lecturas/escrituras y JSON interpretados por cada comando de esta sesión
+        self.profiler = profiling.CommandProfiler()
+        # Auditoría de memoria con tracemalloc (comando mem), apagada hasta "mem start"
+        self.memory = profiling.MemoryAudit()
+        # Caché de audio en memoria para las canciones más repetidas (opcional)
+        if shared is not None:
+            self.audio_cache = shared.audio_cache
+        else:
+            self.audio_cache = AudioCache(AUDIO_CACHE_MB * 1024 * 1024) if AUDIO_CACHE_MB > 0 else None
         
         # Información para Streamlabs e integraciones
         self.current_song_id = None
         self.current_song_title = None
         self.current_song_duration = 0
         self.current_playlist_name = None
+        self.current_playlist_id = None
+        self._now_playing = None  # (song_id, inicio) de la canción que suena, para el historial
         self.integration_manager = None  # Se inicializará en __main__
         
-        # Crear directorios necesarios
-        self.songs_dir = os.path.join(BASE_DIR, "Songs")
-        self.lists_dir = os.path.join(BASE_DIR, "Lists")
-        os.makedirs(self.songs_dir, exist_ok=True)
-        os.makedirs(self.lists_dir, exist_ok=True)
+        self._search_source = None  # Documento de metadatos del que se construyó el índice de búsqueda
+        self._facts_source = None  # Documento de metadatos del que se indexaron las reglas
+        self._new_durations = {}  # Duraciones calculadas al evaluar reglas, pendientes de guardar
         
-        # Cargar o crear el contador de IDs
-        self.song_counter_file = os.path.join(self.songs_dir, "counter.json")
-        self.song_counter = self.load_song_counter()
+        # Zonas de reproducción (otras salas con su propia salida); solo el reproductor principal las tiene
+        self.zone_name = None
+        self.zones = ZoneManager(self) if shared is None else None
+        # Reproductor dueño de la biblioteca (él mismo salvo en las zonas)
+        self.owner = shared or self
+        if shared is not None:
+            self._share_library(shared)
+        else:
+            self._open_library(base_dir)
         
         # Diccionario de comandos con sus atajos
         self.commands = {
@@ -74,10 +139,10 @@ class MusicPlayer:
             "paste": self.paste_url,
             "volume": self.set_volume,
             "v": self.set_volume,
-            "pass": self.play_next_song,
-            "next": self.play_next_song,
-            "p": self.play_next_song,
-            "n": self.play_next_song,
+            "pass": self.skip_song,
+            "next": self.skip_song,
+            "p": self.skip_song,
+            "n": self.skip_song,
             "check": self.check_playlist,
             "ch": self.check_playlist,
             "stop": self.stop_playback,
@@ -98,34 +163,134 @@ class MusicPlayer:
             "rs": self.rename_song,
             "rename_list": self.rename_playlist,
             "rl": self.rename_playlist,
+            "seek": self.seek,
+            "normalize": self.normalize_library,
+            "crossfade": self.set_crossfade,
+            "cf": self.set_crossfade,
+            "fingerprint": self.build_fingerprints,
+            "dupes": self.find_duplicates,
+            "identify": self.identify_file,
+            "find": self.find_songs,
+            "f": self.find_songs,
+            "convert_lists": self.convert_playlists,
+            "smart": self.smart_command,
+            "top": self.show_top,
+            "profile": self.profile_command,
+            "mem": self.memory_command,
+            "zone": self.zone_command,
+            "export_mix": self.export_mix,
+            "mix": self.export_mix,
         }
+
+    def _open_library(self, base_dir):
+        """Abre la biblioteca de base_dir: índices, metadatos, historial y secuencias de IDs"""
+        # Crear directorios necesarios (base_dir permite usar otra biblioteca, p. ej. en los benchmarks)
+        self.songs_dir = os.path.join(base_dir, "Songs")
+        self.lists_dir = os.path.join(base_dir, "Lists")
+        os.makedirs(self.songs_dir, exist_ok=True)
+        os.makedirs(self.lists_dir, exist_ok=True)
         
-        # Inicializar cliente de Spotify
-        try:
-            self.spotify = Spotify(auth_manager=SpotifyClientCredentials(
-                client_id=SPOTIFY_CLIENT_ID,
-                client_secret=SPOTIFY_CLIENT_SECRET
-            ))
-        except:
-            print("Advertencia: No se pudo inicializar Spotify. Asegúrate de tener las credenciales configuradas en config.py")
-            self.spotify = None
+        # Índice en memoria de Songs/ y Lists/ (se llena en segundo plano)
+        self.library = LibraryIndex(self.songs_dir, self.lists_dir)
+        self.library.start()
+        
+        # Comprobar que ninguna escritura anterior quedó a medias
+        self.song_counter_file = os.path.join(self.songs_dir, "counter.json")
+        # Metadatos como registros Song (records.py); en disco siguen siendo el mismo JSON
+        self.metadata = JsonStore(os.path.join(self.songs_dir, 'metadata.json'),
+                                  decode=songs_from_json, encode=songs_to_json, ensure_ascii=False, indent=2)
+        self.recover_storage()
+        # Huellas acústicas para detectar la misma grabación con otro nombre
+        self.fingerprints = FingerprintIndex(os.path.join(self.songs_dir, 'fingerprints.json'))
+        # Índice de búsqueda de títulos (se construye en la primera búsqueda)
+        self.search_index = SearchIndex()
+        # Historial de reproducciones y listas inteligentes (se evalúan al mostrarlas o reproducirlas)
+        self.history = PlayHistory(os.path.join(self.songs_dir, 'play_history.jsonl'))
+        self.song_facts = SongFacts()
+        self.smart_lists = SmartPlaylists(
+            os.path.join(self.songs_dir, 'smart_lists.json'), self.history, self.song_facts,
+            all_songs=lambda: [song_file[:-4] for song_file in self.library.song_files()],
+            duration_of=self._cached_duration,
+        )
         
+        # Secuencias de IDs (canciones y listas) sobre counter.json; nunca devuelven un ID existente
+        self.song_ids = IdSequence(
+            self.song_counter_file, "next_id",
+            is_taken=lambda song_id: self.library.has_song(song_id) or song_id in self.metadata.data,
+            start=lambda: self._rebuild_song_counter()["next_id"],
+        )
+        self.playlist_ids = IdSequence(
+            self.song_counter_file, "next_list_id", fmt="{}L",
+            is_taken=self.library.has_playlist,
+            start=lambda: int(self.library.next_playlist_id()[:-1]),
+        )
+
+    def _share_library(self, owner):
+        """Usa la biblioteca ya abierta de owner en vez de cargar otra copia"""
+        for name in ("songs_dir", "lists_dir", "library", "song_counter_file", "metadata", "fingerprints",
+                     "search_index", "history", "song_facts", "smart_lists", "song_ids", "playlist_ids"):
+            setattr(self, name, getattr(owner, name))
+
+    @property
+    def supports_crossfade(self):
+        """El fundido necesita pygame.mixer.music (las salidas de audio_output no lo admiten)"""
+        return self._mixer is None or getattr(self._mixer, "supports_crossfade", True)
+
+    @property
+    def mixer(self):
+        """Devuelve pygame.mixer.music, inicializando el mixer en el primer uso"""
+        if self._mixer is None:
+            import pygame
+            pygame.mixer.init()
+            self._mixer = pygame.mixer.music
+            self._mixer.set_volume(self._effective_volume(self.current_song_id))
+        return self._mixer
+
+    @property
+    def mixer_ready(self):
+        """Indica si el mixer ya fue inicializado (sin inicializarlo)"""
+        return self._mixer is not None
+
+    @property
+    def spotify(self):
+        """Cliente de Spotify, creado la primera vez que se necesita (None si no está configurado)"""
+        if not self._spotify_loaded:
+            self._spotify_loaded = True
+            try:
+                from spotipy import Spotify
+                from spotipy.oauth2 import SpotifyClientCredentials
+                self._spotify = Spotify(auth_manager=SpotifyClientCredentials(
+                    client_id=SPOTIFY_CLIENT_ID,
+                    client_secret=SPOTIFY_CLIENT_SECRET
+                ))
+            except:
+                download_log.warning("Advertencia: No se pudo inicializar Spotify. Asegúrate de tener las credenciales configuradas en config.py")
+                self._spotify = None
+        return self._spotify
+
+    @property
+    def downloader(self):
+        """SmartDownloader (y yt_dlp) cargado en el primer uso"""
+        if self._downloader is None:
+            from downloader import SmartDownloader
+            self._downloader = SmartDownloader(self.songs_dir)
+        return self._downloader
+
     def search_song(self, *args):
         """Busca y descarga una canción por nombre"""
         if not args:
             print("Uso: search <nombre_canción> [artista] [álbum]")
             return
 
-        # Inicializar el SmartDownloader si no existe
-        if not hasattr(self, 'downloader'):
-            self.downloader = SmartDownloader(self.songs_dir)
-
         # Procesar los argumentos
         song_name = args[0]
         artist_name = args[1] if len(args) > 1 else ""
         album_name = args[2] if len(args) > 2 else ""
 
-        print(f"Buscando: {song_name} {artist_name} {album_name}")
+        download_log.info(f"Buscando: {song_name} {artist_name} {album_name}")
+        
+        # Marcar el índice para saber después qué archivo produjo la descarga
+        download_mark = self.library.mark()
         
         # Usar el SmartDownloader para buscar y descargar
         video_id = self.downloader.download_by_name(
@@ -138,48 +303,20 @@ class MusicPlayer:
             # Obtener nuevo ID y renombrar el archivo
             new_id = self.get_next_song_id()
             
-            # Buscar el archivo descargado (puede tener diferentes nombres/formats)
+            # El índice de la biblioteca sabe exactamente qué archivos creó la descarga
             old_path = None
+            produced = self.library.added_since(download_mark)
             
             # Si es de fuente alternativa, el ID tiene prefijo "alt_"
-            if video_id.startswith("alt_"):
-                # Buscar archivos que empiecen con el ID sin el prefijo
-                base_id = video_id.replace("alt_", "")
-                for file in os.listdir(self.songs_dir):
-                    if file.startswith(base_id) or file.startswith(f"jamendo_{base_id}") or file.startswith(f"{base_id}_"):
-                        old_path = os.path.join(self.songs_dir, file)
-                        break
-            else:
-                # Buscar archivos normales de YouTube/yt-dlp
-                possible_paths = [
-                    os.path.join(self.songs_dir, f"{video_id}.mp3"),
-                    os.path.join(self.songs_dir, f"{video_id}.m4a"),
-                    os.path.join(self.songs_dir, f"{video_id}.webm"),
-                ]
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        old_path = path
-                        break
-                
-                # Buscar archivos que empiecen con el ID
-                if not old_path:
-                    for file in os.listdir(self.songs_dir):
-                        if file.startswith(str(video_id)) or file.startswith(f"jamendo_{video_id}") or file.startswith(f"{video_id}_"):
-                            old_path = os.path.join(self.songs_dir, file)
-                            break
-            
-            # Si no se encuentra, buscar cualquier archivo nuevo (último recurso)
-            if not old_path:
-                try:
-                    files = [(f, os.path.getmtime(os.path.join(self.songs_dir, f))) 
-                            for f in os.listdir(self.songs_dir) 
-                            if f.endswith(('.mp3', '.m4a', '.flac', '.ogg', '.webm')) and not f.startswith('counter')]
-                    if files:
-                        files.sort(key=lambda x: x[1], reverse=True)
-                        # Tomar el más reciente (probablemente el que acabamos de descargar)
-                        old_path = os.path.join(self.songs_dir, files[0][0])
-                except:
-                    pass
+            base_id = video_id.replace("alt_", "") if video_id.startswith("alt_") else str(video_id)
+            for file in produced:
+                if file.startswith(base_id) or file.startswith(f"jamendo_{base_id}") or file.startswith(f"{base_id}_"):
+                    old_path = os.path.join(self.songs_dir, file)
+                    break
+            
+            # Si ninguno coincide con el ID, usar el último archivo que apareció
+            if not old_path and produced:
+                old_path = os.path.join(self.songs_dir, produced[-1])
             
             if old_path and os.path.exists(old_path):
                 # Convertir a MP3 si es necesario
@@ -203,7 +340,7 @@ class MusicPlayer:
                         if artist_name:
                             title = f"{song_name} - {artist_name}"
                         self.save_song_metadata(new_id, title)
-                        print(f"✓ Canción descargada exitosamente con ID: {new_id}")
+                        download_log.info(f"✓ Canción descargada exitosamente con ID: {new_id}")
                         return new_id
                 
                 # Renombrar a MP3
@@ -214,13 +351,13 @@ class MusicPlayer:
                 if artist_name:
                     title = f"{song_name} - {artist_name}"
                 self.save_song_metadata(new_id, title)
-                print(f"✓ Canción descargada exitosamente con ID: {new_id}")
+                download_log.info(f"✓ Canción descargada exitosamente con ID: {new_id}")
                 return new_id
             else:
-                print("Error: Archivo descargado no encontrado")
+                download_log.error("Error: Archivo descargado no encontrado")
                 return None
         else:
-            print("No se pudo descargar la canción")
+            download_log.warning("No se pudo descargar la canción")
             return None
 
     def print_progress(self, current, total):
@@ -236,6 +373,7 @@ class MusicPlayer:
     def paste_url(self):
         """Pega la URL del portapapeles y la procesa automáticamente"""
         try:
+            import pyperclip
             url = pyperclip.paste()
             if "youtube.com" in url or "youtu.be" in url:
                 print(f"URL de YouTube detectada: {url}")
@@ -263,9 +401,15 @@ class MusicPlayer:
             parts = command.lower().split()
             cmd = parts[0]
             args = parts[1:] if len(parts) > 1 else []
+            # Las rutas de archivo distinguen mayúsculas: se pasan tal cual
+            if cmd in ("identify", "profile", "zone", "export_mix", "mix"):
+                args = command.split()[1:]
             
             if cmd in self.commands:
-                return self.commands[cmd](*args)
+                handler = self.commands[cmd]
+                # Los alias (sl/showlist) se agrupan bajo el nombre del método
+                with self.profiler.measure(handler.__name__):
+                    return handler(*args)
             else:
                 print(f"Comando no reconocido: {cmd}")
                 self.show_help()
@@ -284,16 +428,37 @@ available commands:
   examples: 
   - Edit 1L add 6 7 8
   - Edit 1L remove 3 4
+- Edit/E [list_id] union/intersect/diff [list_id1] [list_id2] ... - merge other lists into this one
+  examples:
+  - Edit 1L union 2L 3L (adds the songs of 2L and 3L that 1L doesnt have)
+  - Edit 1L intersect 2L (keeps only the songs that are also in 2L)
+  - Edit 1L diff 2L (removes the songs that are in 2L)
 - Delete/DEL [list_id // song_id] [password] - delete a song or list
 - Play/P [list_id] - plays a list
 - Play_Song/PS [song_id] - plays an specific song
-- Lists/L - shows all available lists
-- Songs/SH - shows all available songs
-- ShowList/SL [list_id] - shows a list's content
+- Lists/L [--page N] [--limit N] [--sort id|name|size] - shows all available lists
+- Songs/SH [--page N] [--limit N] [--sort id|name|date] - shows all available songs
+- Find/F [text] - search your songs by title (typos and partial words work too)
+- ShowList/SL [list_id] [--page N] [--limit N] [--sort order|id|name] - shows a list's content
 - Paste/PA - Paste whathever link you have copied and download the song
 - Volume/V [0-300] - adjust volume (max 300% (i think max is actually 100))
 - Pass/NEXT/N - Pasa a la siguiente canción
 - Check/CH [list_id] - verify list integrity
+- Convert_Lists [1 // 2] - convert every list to the v2 (append-friendly) or old v1 (JSON) file format
+- Smart create [name] [rule1] [rule2] ... - creates a smart list from rules (recomputed every time you play it)
+  rules: most_played:7d, played:7d, not_played:30d, never_played, added:7d, duration<4m, duration>90s, limit:50
+  examples:
+  - Smart create week most_played:7d limit:50
+  - Smart create new_short added:7d duration<4m
+- Smart lists // show [id] // play [id] // delete [id] - manage your smart lists
+- Top [today|week|month|year|all] [--page N] [--limit N] [--sort plays|time] - your most played songs
+- Profile [--save file.pstats] [--sort cumulative|tottime|calls] [--limit N] [command] - runs a command under cProfile
+  example: Profile sl 1
+- Mem [start // top N // diff N // stop] - memory audit: RSS, biggest allocations and what grew since the last diff
+- Zone add [name] [null // device:NAME] // remove [name] // list // devices - extra playback zones (rooms) with their own output
+  example: Zone add kitchen device:USB Audio, then Zone kitchen pl 2L
+- Export_Mix/Mix [list_id] [file] [--crossfade S] [--seed N] [--bitrate 192k] - render a list into one continuous audio file
+  example: Mix 1 party.mp3 --crossfade 5
 - Stop/S - stop current playing song
 - Cancel/C - stops current download
 - Help/H - shows this 
@@ -303,51 +468,128 @@ available commands:
 - stats - shows your app stats
 - Rename_Song/RS [song_id] [new_name] - rename a song
 - Rename_List/RL [list_id] [new_name] - rename a playlist
+- Seek [seconds // mm:ss // +seconds // -seconds] - jump to a position in the current song
+- Normalize [all] - measure loudness of songs without a stored gain (all: re-measure every song)
+- Crossfade/CF [seconds] - fade between songs of a list (0 disables it)
+- Fingerprint [all] - compute audio fingerprints of songs that don't have one (all: every song)
+- Dupes - list songs that are the same recording under different names
+- Identify [file_path] - check if an audio file is already in the library
         """)
 
-    def show_lists(self):
+    def _parse_list_options(self, args, sorts, usage):
+        """Interpreta --page/--limit/--sort; devuelve (opciones, resto) o (None, None) si no son válidas"""
+        try:
+            return listing.parse_options(args, sorts, sorts[0], LIST_PAGE_SIZE)
+        except ValueError as e:
+            print(f"Error: {e}")
+            print(f"Uso: {usage}")
+            return None, None
+
+    def _page_command(self, command, options, default_sort):
+        """Comando que muestra la siguiente página con las mismas opciones"""
+        if options.sort != default_sort:
+            command += f" --sort {options.sort}"
+        if options.limit != LIST_PAGE_SIZE:
+            command += f" --limit {options.limit}"
+        return command
+
+    def _read_playlist_summary(self, list_file):
+        playlist, _ = playlist_format.read(os.path.join(self.lists_dir, list_file))
+        return {"name": playlist["name"], "count": len(playlist["songs"])}
+
+    def show_lists(self, *args):
+        sorts = ("id", "name", "size")
+        options, _ = self._parse_list_options(args, sorts, "lists [--page N] [--limit N] [--sort id|name|size]")
+        if options is None:
+            return
         try:
-            lists = os.listdir(self.lists_dir)
+            lists = self.library.playlist_files()
             if not lists:
                 print("No hay listas de reproducción disponibles")
                 return
             
+            # Nombre y número de canciones desde el índice (solo se relee una lista si cambió)
+            summary = lambda list_file: self.library.playlist_summary(list_file, self._read_playlist_summary)
+            keys = {
+                "id": None,  # playlist_files() ya viene ordenado por ID
+                "name": lambda f: (summary(f)["name"].lower(), listing.numeric_key(f)),
+                "size": lambda f: (-summary(f)["count"], listing.numeric_key(f)),
+            }
+            page, total, pages = listing.paginate(lists, options, keys[options.sort])
+            
+            def lines():
+                for i, list_file in page:
+                    info = summary(list_file)
+                    yield f"{i}. {playlist_format.playlist_id_of(list_file)}: {info['name']} ({info['count']} canciones)"
+            
             print("\nListas de reproducción disponibles:")
-            for i, list_file in enumerate(lists, 1):
-                with open(os.path.join(self.lists_dir, list_file), "r") as f:
-                    playlist = json.load(f)
-                    print(f"{i}. {list_file[:-5]}: {playlist['name']} ({len(playlist['songs'])} canciones)")
+            listing.print_page(lines(), options, total, pages, self._page_command("lists", options, "id"))
         except Exception as e:
             print(f"Error al mostrar listas: {e}")
 
-    def show_songs(self):
+    def _ensure_search_index(self):
+        """Construye el índice de búsqueda (o lo rehace si metadata.json cambió en disco)"""
+        if self.owner is not self:
+            return self.owner._ensure_search_index()
+        metadata = self.metadata.data
+        if self._search_source is not metadata:
+            self.search_index.rebuild(
+                (song_id, song.display_title) for song_id, song in metadata.items()
+            )
+            self._search_source = metadata
+        return self.search_index
+
+    def search_library(self, query, limit=20):
+        """Busca canciones de la biblioteca por título: [(song_id, título)]"""
+        return self._ensure_search_index().search(query, limit)
+
+    def find_songs(self, *query_parts):
+        """Busca canciones por título en la biblioteca local"""
+        query = " ".join(query_parts)
+        if not query.strip():
+            print("Uso: find <texto>")
+            print("Ejemplo: find bad bunny")
+            return []
+        
+        results = self.search_library(query)
+        if not results:
+            print(f"No se encontraron canciones para: {query}")
+            return []
+        
+        print(f"\nResultados para '{query}':")
+        for song_id, title in results:
+            print(f"  [{song_id}] {title}")
+        return results
+
+    def show_songs(self, *args):
+        sorts = ("id", "name", "date")
+        options, _ = self._parse_list_options(args, sorts, "songs [--page N] [--limit N] [--sort id|name|date]")
+        if options is None:
+            return
         try:
-            songs = [f for f in os.listdir(self.songs_dir) if f.lower().endswith('.mp3')]
+            songs = self.library.song_files()
             if not songs:
                 print("No hay canciones disponibles")
                 return
             
             # Cargar metadatos si existen
-            metadata_file = os.path.join(self.songs_dir, 'metadata.json')
-            metadata = {}
-            if os.path.exists(metadata_file):
-                try:
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                except:
-                    metadata = {}
+            try:
+                metadata = self.metadata.data
+            except:
+                metadata = {}
+            
+            # Orden numérico por ID ('2' antes que '10'); con --sort, por título o fecha
+            field = lambda song, name: getattr(metadata.get(song[:-4]), name, None)
+            keys = {
+                "id": listing.numeric_key,
+                "name": lambda song: ((field(song, "title") or song).lower(), listing.numeric_key(song)),
+                "date": lambda song: (field(song, "added_date") or "", listing.numeric_key(song)),
+            }
+            page, total, pages = listing.paginate(songs, options, keys[options.sort])
             
             print("\nCanciones disponibles:")
-            for i, song in enumerate(sorted(songs), 1):
-                song_id = song[:-4]  # Quitar la extensión .mp3
-                if song_id in metadata:
-                    song_info = metadata[song_id]
-                    title = song_info.get("title", f"Canción {song_id}")
-                    added_date = song_info.get("added_date", "Fecha desconocida")
-                    print(f"{i}. {title} (ID: {song_id}) - Añadida: {added_date}")
-                else:
-                    print(f"{i}. {song} (ID: {song_id})")
-                    
+            listing.print_page(self._song_lines(page, metadata), options, total, pages,
+                               self._page_command("songs", options, "id"))
         except Exception as e:
             print(f"Error al mostrar canciones: {e}")
             # Mostrar las canciones directamente del directorio en caso de error
@@ -360,10 +602,21 @@ available commands:
             except:
                 print("No se pudieron listar los archivos MP3")
 
+    def _song_lines(self, page, metadata):
+        """Líneas de show_songs, generadas solo para la página que se muestra"""
+        for i, song in page:
+            song_id = song[:-4]  # Quitar la extensión .mp3
+            if song_id in metadata:
+                song_info = metadata[song_id]
+                added_date = song_info.added_date or "Fecha desconocida"
+                yield f"{i}. {song_info.display_title} (ID: {song_id}) - Añadida: {added_date}"
+            else:
+                yield f"{i}. {song} (ID: {song_id})"
+
     def download_spotify_track(self, track_url):
         """Descarga una canción individual de Spotify"""
         if not self.spotify:
-            print("Error: Spotify no está configurado correctamente")
+            download_log.error("Error: Spotify no está configurado correctamente")
             return
         
         try:
@@ -376,8 +629,10 @@ available commands:
             artist = track['artists'][0]['name']
             album = track['album']['name']
             
-            print(f"Buscando: {song_name} - {artist}")
+            download_log.info(f"Buscando: {song_name} - {artist}")
             
+            import yt_dlp
+
             # Buscar en YouTube con términos más específicos
             search_query = f"{song_name} {artist} {album} official audio"
             ydl_opts = {
@@ -412,41 +667,38 @@ available commands:
                         
                         if valid_videos:
                             video = valid_videos[0]
-                            print(f"Encontrado: {video['title']}")
+                            download_log.info(f"Encontrado: {video['title']}")
                             ydl.download([f"https://www.youtube.com/watch?v={video['id']}"])
                             # Guardar el título en un archivo de metadatos
                             self.save_song_metadata(video['id'], video['title'])
-                            print(f"✓ Descargada: {song_name}")
+                            download_log.info(f"✓ Descargada: {song_name}")
                             time.sleep(1)
                             return video['id']
                         else:
-                            print(f"No se encontró una versión adecuada para: {song_name}")
+                            download_log.warning(f"No se encontró una versión adecuada para: {song_name}")
                             return None
                     else:
-                        print(f"No se encontró el video para: {song_name}")
+                        download_log.warning(f"No se encontró el video para: {song_name}")
                         return None
                 except Exception as e:
-                    print(f"Error al descargar: {e}")
+                    download_log.error(f"Error al descargar: {e}")
                     return None
                 
         except Exception as e:
-            print(f"Error al descargar canción de Spotify: {e}")
+            download_log.error(f"Error al descargar canción de Spotify: {e}")
             return None
 
     def download_spotify_playlist(self, playlist_url):
         """Descarga una playlist de Spotify usando el sistema de confianza"""
         if not self.spotify:
-            print("Error: Spotify no está configurado correctamente")
+            download_log.error("Error: Spotify no está configurado correctamente")
             return
         
+        queued = 0  # canciones aún en cola (para la métrica de profundidad)
         try:
             self.downloading = True
             self.cancel_download = False
             
-            # Inicializar el SmartDownloader si no existe
-            if not hasattr(self, 'downloader'):
-                self.downloader = SmartDownloader(self.songs_dir)
-            
             # Extraer el ID de la playlist de la URL
             playlist_id = playlist_url.split("/playlist/")[1].split("?")[0]
             
@@ -454,16 +706,18 @@ available commands:
             results = self.spotify.playlist(playlist_id)
             playlist_name = results['name']
             
-            print(f"Descargando playlist: {playlist_name}")
+            download_log.info(f"Descargando playlist: {playlist_name}")
             
             # Obtener todas las canciones de la playlist
             tracks = results['tracks']['items']
             total_tracks = len(tracks)
             downloaded_songs = []
+            queued = total_tracks
+            metrics.DOWNLOAD_QUEUE_DEPTH.inc(queued)
             
             for i, track in enumerate(tracks, 1):
                 if self.cancel_download:
-                    print("\nDescarga cancelada")
+                    download_log.info("Descarga cancelada")
                     # Eliminar archivos parciales
                     for song_id in downloaded_songs:
                         try:
@@ -477,7 +731,9 @@ available commands:
                     artist = track['track']['artists'][0]['name']
                     album = track['track']['album']['name']
                     
-                    print(f"\n[{i}/{total_tracks}] Buscando: {song_name} - {artist}")
+                    download_log.info(f"[{i}/{total_tracks}] Buscando: {song_name} - {artist}")
+                    metrics.DOWNLOAD_QUEUE_DEPTH.dec()
+                    queued -= 1
                     
                     # Usar el SmartDownloader para buscar y descargar
                     video_id = self.downloader.download_by_name(
@@ -498,35 +754,37 @@ available commands:
                             title = f"{song_name} - {artist}"
                             self.save_song_metadata(new_id, title)
                             downloaded_songs.append(new_id)
-                            print(f"✓ Descargada: {title}")
+                            download_log.info(f"✓ Descargada: {title}")
                         else:
-                            print(f"Error: Archivo descargado no encontrado para: {song_name} - {artist}")
+                            download_log.error(f"Error: Archivo descargado no encontrado para: {song_name} - {artist}")
                     else:
-                        print(f"No se pudo descargar: {song_name} - {artist}")
+                        download_log.warning(f"No se pudo descargar: {song_name} - {artist}")
                         
                 except Exception as e:
-                    print(f"\nError al procesar canción: {e}")
+                    download_log.error(f"Error al procesar canción: {e}")
                     continue
             
             if downloaded_songs:
                 # Crear una lista de reproducción con las canciones descargadas
                 playlist_id = self.create_playlist(f"Spotify - {playlist_name}", *downloaded_songs)
-                print(f"\nPlaylist creada con ID: {playlist_id}")
+                download_log.info(f"Playlist creada con ID: {playlist_id}")
                 return playlist_id
             else:
-                print("\nNo se pudo descargar ninguna canción de la playlist")
+                download_log.warning("No se pudo descargar ninguna canción de la playlist")
                 return None
                 
         except Exception as e:
-            print(f"Error al descargar playlist de Spotify: {e}")
+            download_log.error(f"Error al descargar playlist de Spotify: {e}")
             return None
         finally:
+            # Las que quedaban en cola tras una cancelación o un error
+            metrics.DOWNLOAD_QUEUE_DEPTH.dec(queued)
             self.downloading = False
             self.cancel_download = False
             
     def download_spotify_album(self, album_url):
         if not self.spotify:
-            print("Error: Spotify no está configurado correctamente")
+            download_log.error("Error: Spotify no está configurado correctamente")
             return
         
         try:
@@ -535,31 +793,23 @@ available commands:
             album_name = album["name"]
             tracks = album["tracks"]["items"]
     
-            print(f"Descargando álbum: {album_name}")
+            download_log.info(f"Descargando álbum: {album_name}")
             
             downloaded_songs = []
             for track in tracks:
                 song_name = track["name"]
                 artist = track["artists"][0]["name"]
                 search_query = f"{song_name} {artist} official audio"
-                print(f"Buscando: {song_name} - {artist}")
+                download_log.info(f"Buscando: {song_name} - {artist}")
                 self.download_youtube_video(f"ytsearch:{search_query}")
             
-            print(f"Álbum descargado: {album_name}")
+            download_log.info(f"Álbum descargado: {album_name}")
         except Exception as e:
-            print(f"Error al descargar álbum: {e}")
+            download_log.error(f"Error al descargar álbum: {e}")
     
     def save_song_metadata(self, song_id, title):
         """Guarda los metadatos de la canción en un archivo JSON"""
         try:
-            metadata_file = os.path.join(self.songs_dir, 'metadata.json')
-            metadata = {}
-            
-            # Cargar metadatos existentes si el archivo existe
-            if os.path.exists(metadata_file):
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-            
             # Limpiar el título (eliminar caracteres especiales y extensiones)
             clean_title = title
             if clean_title.endswith('.mp3'):
@@ -567,27 +817,219 @@ available commands:
             if clean_title.endswith('.webm'):
                 clean_title = clean_title[:-5]
             
-            # Actualizar metadatos
-            metadata[song_id] = {
-                "title": clean_title,
-                "added_date": time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-            # Guardar metadatos
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            # Actualizar y guardar metadatos (escritura atómica), conservando
+            # los campos calculados (ganancia, etc.) si la canción ya existía
+            existing = self.metadata.data.get(song_id)
+            entry = existing.copy() if existing else Song(song_id)
+            entry.title = clean_title
+            # Renombrar no cambia la fecha de alta (las reglas added:Nd dependen de ella)
+            if existing is None:
+                entry.added_date = time.strftime("%Y-%m-%d %H:%M:%S")
+            self.metadata.set(entry.id, entry)
+            if self._search_source is not None:
+                self.search_index.add(song_id, clean_title)
+            if self._facts_source is not None:
+                self.song_facts.update(song_id, entry)
+            
+            # Toda ingesta termina aquí: reflejar el archivo en el índice sin esperar al vigilante
+            self.library.refresh_file("songs", f"{song_id}.mp3")
+            
+            # Etapa de ingesta: medir la sonoridad y la huella una sola vez, en segundo plano
+            if NORMALIZE_LOUDNESS and entry.gain_db is None:
+                self._submit_analysis(self._analyze_loudness, song_id)
+            # Un cambio de título (rename) no cambia el audio: la huella guardada sigue valiendo
+            if FINGERPRINT_ON_IMPORT and not self.fingerprints.has(song_id, self.library.song_mtime(song_id)):
+                self._submit_analysis(self._fingerprint_song, song_id)
         except Exception as e:
-            print(f"Error al guardar metadatos: {e}")
+            log.error(f"Error al guardar metadatos: {e}")
+
+    def _submit_analysis(self, task, song_id):
+        """Encola un análisis de ingesta en el hilo de análisis"""
+        if self._analysis_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._analysis_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+        self._analysis_pool.submit(task, song_id)
+
+    def update_song_metadata(self, song_id, **fields):
+        """Añade o actualiza campos de una canción sin tocar el resto"""
+        with self.metadata.batch():
+            entry = self.metadata.data.get(song_id)
+            if entry is None:
+                return False
+            entry.update(**fields)
+            self.metadata.save()
+        if self._facts_source is not None:
+            self.song_facts.update(song_id, entry)
+        return True
+
+    def _analyze_loudness(self, song_id):
+        """Mide la sonoridad de una canción y guarda su ganancia en los metadatos"""
+        song_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
+        if not os.path.exists(song_path):
+            return None
+        result = loudness.analyze(song_path)
+        if result:
+            self.update_song_metadata(
+                song_id,
+                loudness=round(result["loudness"], 2),
+                gain_db=loudness.gain_for(result["loudness"], TARGET_LOUDNESS),
+            )
+        return result
+
+    def normalize_library(self, *args):
+        """Calcula en paralelo la ganancia de las canciones que aún no la tienen (normalize all: todas)"""
+        reanalyze = bool(args) and args[0] == "all"
+        metadata = self.metadata.data
+        pending = {}
+        for song_file in self.library.song_files():
+            song_id = song_file[:-4]
+            if song_id in metadata and (reanalyze or metadata[song_id].gain_db is None):
+                pending[song_id] = os.path.join(self.songs_dir, song_file)
+        
+        if not pending:
+            print("✓ Todas las canciones tienen su ganancia calculada")
+            return 0
+        
+        print(f"Analizando la sonoridad de {len(pending)} canciones...")
+        done = [0]
+        failed = []
+        
+        results = {}
+        
+        def on_result(song_id, result):
+            done[0] += 1
+            if result:
+                results[song_id] = result
+            else:
+                failed.append(song_id)
+            self.print_progress(done[0], len(pending))
+        
+        # El análisis va fuera del cerrojo de metadatos (la reproducción sigue leyéndolos)
+        loudness.analyze_many(pending, on_result=on_result)
+        # Group commit: los resultados se escriben juntos al terminar
+        with self.metadata.batch():
+            for song_id, result in results.items():
+                self.update_song_metadata(
+                    song_id,
+                    loudness=round(result["loudness"], 2),
+                    gain_db=loudness.gain_for(result["loudness"], TARGET_LOUDNESS),
+                )
+        
+        print(f"✓ Ganancia calculada para {len(pending) - len(failed)} canciones")
+        if failed:
+            print(f"⚠ No se pudieron analizar {len(failed)} canciones (¿ffmpeg o numpy instalados?)")
+        return len(pending) - len(failed)
+
+    def _fingerprint_song(self, song_id):
+        """Calcula la huella de una canción recién añadida y avisa si ya estaba en la biblioteca"""
+        import fingerprint
+        song_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
+        if not os.path.exists(song_path):
+            return None
+        fp = fingerprint.fingerprint_file(song_path)
+        if fp is None:
+            return None
+        matches = self.fingerprints.match(fp, exclude=song_id)
+        self.fingerprints.add(song_id, fp, self.library.song_mtime(song_id))
+        if matches:
+            other = matches[0][0]
+            log.warning(f"⚠ La canción {song_id} parece la misma grabación que {other}: {self.get_song_title(other)}")
+        return matches
+
+    def build_fingerprints(self, *args):
+        """Calcula en paralelo las huellas que faltan (fingerprint all: todas)"""
+        recompute = bool(args) and args[0] == "all"
+        metadata = self.metadata.data
+        pending = {}
+        for song_file in self.library.song_files():
+            song_id = song_file[:-4]
+            if song_id not in metadata:
+                continue
+            mtime = self.library.song_mtime(song_id)
+            if recompute or not self.fingerprints.has(song_id, mtime):
+                pending[song_id] = (os.path.join(self.songs_dir, song_file), mtime)
+        
+        if not pending:
+            print("✓ Todas las canciones tienen su huella calculada")
+            return 0
+        
+        print(f"Calculando la huella de {len(pending)} canciones...")
+        done = [0]
+        
+        def on_result(song_id, ok):
+            done[0] += 1
+            self.print_progress(done[0], len(pending))
+        
+        computed = self.fingerprints.build_many(pending, on_result=on_result)
+        print(f"✓ Huella calculada para {computed} canciones")
+        if computed < len(pending):
+            print(f"⚠ No se pudieron analizar {len(pending) - computed} canciones (¿ffmpeg y numpy instalados?)")
+        return computed
+
+    def find_duplicates(self, *args):
+        """Muestra los grupos de canciones que son la misma grabación"""
+        try:
+            self.build_fingerprints()
+            groups = self.fingerprints.duplicates()
+        except ImportError:
+            print("Error: numpy no está instalado (pip install numpy)")
+            return []
+        
+        if not groups:
+            print("✓ No hay canciones duplicadas")
+            return []
+        
+        print(f"\nCanciones duplicadas ({len(groups)} grupos):")
+        for group in groups:
+            print("  " + " = ".join(f"[{song_id}] {self.get_song_title(song_id)}" for song_id in group))
+        return groups
+
+    def identify_file(self, *path_parts):
+        """Busca en la biblioteca la grabación de un archivo de audio externo"""
+        file_path = " ".join(path_parts).strip().strip('"').strip("'")
+        if not file_path:
+            file_path = input("Introduce la ruta del archivo: ").strip().strip('"').strip("'")
+        if not os.path.isfile(file_path):
+            print(f"Error: No se encontró el archivo: {file_path}")
+            return None
+        
+        try:
+            self.build_fingerprints()
+            matches = self.fingerprints.identify(file_path)
+        except ImportError:
+            print("Error: numpy no está instalado (pip install numpy)")
+            return None
+        
+        if matches is None:
+            print("Error: No se pudo decodificar el archivo (¿ffmpeg instalado?)")
+        elif not matches:
+            print("El archivo no está en la biblioteca")
+        else:
+            for song_id, similarity in matches:
+                print(f"[{song_id}] {self.get_song_title(song_id)} ({similarity:.0%} de similitud)")
+        return matches
+
+    def _effective_volume(self, song_id=None):
+        """Volumen del usuario combinado con la ganancia precalculada de la canción"""
+        volume = min(self.volume, MAX_VOLUME)
+        gain_db = 0.0
+        if NORMALIZE_LOUDNESS:
+            entry = self.metadata.data.get(song_id) if song_id else None
+            if entry and entry.gain_db is not None:
+                gain_db = entry.gain_db
+        if gain_db > 0:
+            # Las canciones flojas suben con el margen que deja un volumen por debajo del máximo
+            # de pygame (1.0), hasta NORMALIZE_HEADROOM_DB
+            return min(volume * loudness.gain_to_factor(min(gain_db, NORMALIZE_HEADROOM_DB)), 1.0)
+        # pygame admite 0.0 - 1.0: con el volumen por defecto una canción sin ganancia suena a 1.0
+        return min(volume, 1.0) * loudness.gain_to_factor(gain_db)
 
     def get_song_title(self, song_id):
         """Obtiene el título de una canción desde los metadatos"""
         try:
-            metadata_file = os.path.join(self.songs_dir, 'metadata.json')
-            if os.path.exists(metadata_file):
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                    if song_id in metadata:
-                        return metadata[song_id].get("title", f"Canción {song_id}")
+            metadata = self.metadata.data
+            if song_id in metadata:
+                return metadata[song_id].display_title
             return f"Canción {song_id}"
         except:
             return f"Canción {song_id}"
@@ -597,19 +1039,27 @@ available commands:
         try:
             song_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
             if os.path.exists(song_path):
-                try:
-                    import mutagen
-                    audio = mutagen.File(song_path, easy=True)
-                    if audio:
-                        return int(audio.info.length)
-                except:
-                    pass
+                if not self._mutagen_missing:
+                    try:
+                        import mutagen
+                        audio = mutagen.File(song_path, easy=True)
+                        if audio:
+                            return int(audio.info.length)
+                    except ImportError:
+                        # Un import fallido no se recuerda: sin esto se buscaría en sys.path en cada canción
+                        self._mutagen_missing = True
+                    except:
+                        pass
+                # Sin mutagen: la duración exacta sale del índice de tramas
+                return int(self._frame_index(song_id).duration)
             return 0
         except:
             return 0
 
     def download_youtube_video(self, video_url):
+        metrics.DOWNLOAD_QUEUE_DEPTH.inc()
         try:
+            import yt_dlp
             self.downloading = True
             self.cancel_download = False
             
@@ -720,13 +1170,13 @@ available commands:
             for i, strategy in enumerate(strategies, 1):
                 try:
                     if i > 1:
-                        print(f"Intentando estrategia alternativa {i}: {strategy['name']}...")
+                        download_log.info(f"Intentando estrategia alternativa {i}: {strategy['name']}...")
                     
                     with yt_dlp.YoutubeDL(strategy['opts']) as ydl:
                         info = ydl.extract_info(video_url, download=True)
                         
                         if self.cancel_download:
-                            print("Descarga cancelada")
+                            download_log.info("Descarga cancelada")
                             try:
                                 os.remove(os.path.join(self.songs_dir, f"{info['id']}.mp3"))
                             except:
@@ -755,8 +1205,9 @@ available commands:
                                         # Guardar metadatos
                                         title = info.get('title', f'Video {info["id"]}')
                                         self.save_song_metadata(new_id, title)
-                                        print(f"Canción descargada con ID: {new_id}")
-                                        print(f"Título: {title}")
+                                        download_log.info(f"Canción descargada con ID: {new_id}", extra={"event": "downloaded", "song_id": new_id})
+                                        download_log.info(f"Título: {title}")
+                                        metrics.DOWNLOAD_ATTEMPTS.labels(strategy['name'], "success").inc()
                                         time.sleep(1)
                                         return new_id
                                     except:
@@ -767,23 +1218,26 @@ available commands:
                             # Guardar metadatos con el título del video
                             title = info.get('title', f'Video {info["id"]}')
                             self.save_song_metadata(new_id, title)
-                            print(f"Canción descargada con ID: {new_id}")
-                            print(f"Título: {title}")
+                            download_log.info(f"Canción descargada con ID: {new_id}", extra={"event": "downloaded", "song_id": new_id})
+                            download_log.info(f"Título: {title}")
+                            metrics.DOWNLOAD_ATTEMPTS.labels(strategy['name'], "success").inc()
                             time.sleep(1)
                             return new_id
                         else:
                             raise Exception("Archivo descargado no encontrado")
                             
                 except Exception as e:
+                    metrics.DOWNLOAD_ATTEMPTS.labels(strategy['name'], "failure").inc()
                     if i < len(strategies):
                         continue  # Intentar siguiente estrategia
                     else:
-                        print(f"Error: Todas las estrategias fallaron. Último error: {e}")
+                        download_log.error(f"Error: Todas las estrategias fallaron. Último error: {e}")
                         return None
         except Exception as e:
-            print(f"Error al descargar video: {e}")
+            download_log.error(f"Error al descargar video: {e}")
             return None
         finally:
+            metrics.DOWNLOAD_QUEUE_DEPTH.dec()
             self.downloading = False
             self.cancel_download = False
 
@@ -794,30 +1248,33 @@ available commands:
             return
 
         if self.is_paused:
-            # Reanudar la reproducción desde la posición guardada
-            pygame.mixer.music.rewind()  # Rebobinar al inicio
-            pygame.mixer.music.set_pos(self.paused_position)  # Ir a la posición guardada
-            pygame.mixer.music.unpause()
+            # unpause() continúa justo donde se pausó; no hace falta rebobinar ni redecodificar
+            self.mixer.unpause()
+            self.clock.resume()
             self.is_paused = False
-            print(f"▶️  Reproducción reanudada en {int(self.paused_position)}s")
+            self.crossfade.reschedule()
+            print(f"▶️  Reproducción reanudada en {int(self.clock.position)}s")
             # Disparar evento
             if self.integration_manager:
                 self.integration_manager.trigger_event('playback_resumed')
         else:
-            # Pausar la reproducción guardando la posición actual
-            self.paused_position = pygame.mixer.music.get_pos() / 1000.0  # Guardar en segundos
-            pygame.mixer.music.pause()
+            # Pausar la reproducción; el reloj conserva la posición real
+            self.mixer.pause()
+            self.clock.pause()
             self.is_paused = True
-            print(f"⏸️  Reproducción pausada en {int(self.paused_position)}s")
+            self.crossfade.cancel()
+            print(f"⏸️  Reproducción pausada en {int(self.clock.position)}s")
             # Disparar evento
             if self.integration_manager:
                 self.integration_manager.trigger_event('playback_paused')
 
     def resume_playback(self, *args):
         """Reanuda la reproducción si está pausada"""
-        if not pygame.mixer.music.get_busy() and self.is_playing:
-            self.is_paused = True
-            pygame.mixer.music.unpause()
+        if self.is_playing and not self.mixer.get_busy():
+            self.is_paused = False
+            self.mixer.unpause()
+            self.clock.resume()
+            self.crossfade.reschedule()
             print("Reproducción reanudada")
         elif not self.is_playing:
             print("No hay ninguna reproducción en curso")
@@ -825,20 +1282,17 @@ available commands:
             print("La reproducción ya está en curso")
 
     def download_progress_hook(self, d):
-        """Hook para mostrar el progreso de la descarga"""
+        """Hook para mostrar el progreso de la descarga (como mucho un aviso cada LOG_PROGRESS_INTERVAL)"""
+        key = d.get('filename', '')
         if d['status'] == 'downloading':
-            if 'total_bytes' in d:
-                total = d['total_bytes']
-                downloaded = d['downloaded_bytes']
-                percentage = (downloaded / total) * 100
-                print(f"\rDescargando: {percentage:.1f}%", end='', flush=True)
-            elif 'total_bytes_estimate' in d:
-                total = d['total_bytes_estimate']
-                downloaded = d['downloaded_bytes']
-                percentage = (downloaded / total) * 100
-                print(f"\rDescargando: {percentage:.1f}%", end='', flush=True)
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if total and self._download_progress.ready(key):
+                percentage = (d['downloaded_bytes'] / total) * 100
+                download_log.info(f"Descargando: {percentage:.1f}%",
+                                  extra={"event": "download_progress", "percent": round(percentage, 1), "inline": True})
         elif d['status'] == 'finished':
-            print("\nDescarga completada, procesando...")
+            self._download_progress.reset(key)
+            download_log.info("Descarga completada, procesando...", extra={"event": "download_finished"})
 
     def add_song_from_file(self, file_path=None):
         """Añade canciones desde un archivo, carpeta o ZIP a la biblioteca"""
@@ -874,8 +1328,14 @@ available commands:
             print(f"Error inesperado: {e}")
             return None
     
-    def _import_single_file(self, file_path):
-        """Importa un archivo individual de audio"""
+    def _import_single_file(self, file_path, song_id=None, imported=None):
+        """
+        Importa un archivo individual de audio
+
+        song_id: ID ya reservado (opcional)
+        imported: en una importación por lotes, lista donde se anota (song_id, título)
+            en vez de guardar los metadatos; se guardan todos juntos con _save_imported
+        """
         import shutil
         import subprocess
         
@@ -897,7 +1357,8 @@ available commands:
         song_title = os.path.splitext(filename)[0]
         
         # Obtener el ID para la nueva canción
-        song_id = self.get_next_song_id()
+        if song_id is None:
+            song_id = self.get_next_song_id()
         
         # Ruta de destino en la carpeta de canciones (siempre MP3)
         mp3_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
@@ -925,7 +1386,10 @@ available commands:
                     return None
             
             # Guardar metadatos usando el nombre del archivo como título
-            self.save_song_metadata(song_id, song_title)
+            if imported is None:
+                self.save_song_metadata(song_id, song_title)
+            else:
+                imported.append((song_id, song_title))
             print(f"✓ Canción añadida: {song_title} (ID: {song_id})")
             self.stats.increment("songs_imported")
             
@@ -936,6 +1400,12 @@ available commands:
             
             return None
                 
+    def _save_imported(self, imported):
+        """Group commit: guarda en una sola escritura los metadatos de [(song_id, título)] ya importados"""
+        with self.metadata.batch():
+            for song_id, title in imported:
+                self.save_song_metadata(song_id, title)
+
     def _import_from_folder(self, folder_path):
         """Importa todos los archivos de audio de una carpeta"""
         import shutil
@@ -960,15 +1430,21 @@ available commands:
         imported_songs = []
         failed_songs = []
         
+        # Reservar todos los IDs con una sola escritura del contador
+        reserved_ids = self.reserve_song_ids(len(audio_files))
+        
+        # Las conversiones van fuera del cerrojo de metadatos; luego se guardan todas de una vez
+        titles = []
         for i, file_path in enumerate(audio_files, 1):
             filename = os.path.basename(file_path)
             print(f"[{i}/{len(audio_files)}] Procesando: {filename}")
             
-            song_id = self._import_single_file(file_path)
+            song_id = self._import_single_file(file_path, reserved_ids[i - 1], titles)
             if song_id:
                 imported_songs.append(song_id)
             else:
                 failed_songs.append(filename)
+        self._save_imported(titles)
         
         print(f"\n✓ Importación completada:")
         print(f"  - {len(imported_songs)} canciones importadas exitosamente")
@@ -1020,15 +1496,21 @@ available commands:
             imported_songs = []
             failed_songs = []
             
+            # Reservar todos los IDs con una sola escritura del contador
+            reserved_ids = self.reserve_song_ids(len(audio_files))
+            
+            # Las conversiones van fuera del cerrojo de metadatos; luego se guardan todas de una vez
+            titles = []
             for i, file_path in enumerate(audio_files, 1):
                 filename = os.path.basename(file_path)
                 print(f"[{i}/{len(audio_files)}] Procesando: {filename}")
                 
-                song_id = self._import_single_file(file_path)
+                song_id = self._import_single_file(file_path, reserved_ids[i - 1], titles)
                 if song_id:
                     imported_songs.append(song_id)
                 else:
                     failed_songs.append(filename)
+            self._save_imported(titles)
             
             print(f"\n✓ Importación desde ZIP completada:")
             print(f"  - {len(imported_songs)} canciones importadas exitosamente")
@@ -1060,13 +1542,8 @@ available commands:
 
 
     def create_playlist(self, playlist_name, *songs):
-        playlist_id = f"{len(os.listdir(self.lists_dir)) + 1}L"
-        playlist_data = {
-            "name": playlist_name,
-            "songs": list(songs)
-        }
-        with open(os.path.join(self.lists_dir, f"{playlist_id}.json"), "w") as f:
-            json.dump(playlist_data, f)
+        playlist_id = self.playlist_ids.next()
+        self._save_playlist(playlist_id, Playlist(playlist_name, songs))
         print(f"Lista creada con ID: {playlist_id}")
         self.stats.increment("playlists_created")
         return playlist_id
@@ -1078,14 +1555,19 @@ available commands:
         try:
             # Verificar si es una lista o una canción
             if item_id.endswith('L'):  # Es una lista
-                os.remove(os.path.join(self.lists_dir, f"{item_id}.json"))
+                if not self._delete_playlist_files(item_id):
+                    print(f"Error: La lista {item_id} no existe")
+                    return False
                 print(f"Lista {item_id} eliminada")
                 self.stats.increment("playlists_deleted")
             else:  # Es una canción
                 # Eliminar el archivo MP3
                 mp3_path = os.path.join(self.songs_dir, f"{item_id}.mp3")
-                if os.path.exists(mp3_path):
+                if self.library.has_song(item_id):
                     os.remove(mp3_path)
+                    self.library.refresh_file("songs", f"{item_id}.mp3")
+                    if self.audio_cache:
+                        self.audio_cache.invalidate(item_id)
                     # Eliminar de los metadatos
                     self.remove_song_metadata(item_id)
                     # Eliminar de todas las listas
@@ -1102,59 +1584,60 @@ available commands:
     def remove_song_metadata(self, song_id):
         """Elimina una canción de los metadatos"""
         try:
-            metadata_file = os.path.join(self.songs_dir, 'metadata.json')
-            if os.path.exists(metadata_file):
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                if song_id in metadata:
-                    del metadata[song_id]
-                    
-                    with open(metadata_file, 'w', encoding='utf-8') as f:
-                        json.dump(metadata, f, ensure_ascii=False, indent=2)
+            self.metadata.delete(song_id)
+            self.search_index.remove(song_id)
+            self.song_facts.remove(song_id)
+            self.history.forget(song_id)
+            self.fingerprints.remove(song_id)
         except Exception as e:
-            print(f"Error al eliminar metadatos: {e}")
+            log.error(f"Error al eliminar metadatos: {e}")
 
     def remove_song_from_playlists(self, song_id):
         """Elimina una canción de todas las listas de reproducción"""
         try:
-            for playlist_file in os.listdir(self.lists_dir):
-                playlist_path = os.path.join(self.lists_dir, playlist_file)
-                with open(playlist_path, "r") as f:
-                    playlist = json.load(f)
+            for playlist_file in self.library.playlist_files():
+                playlist_id = playlist_format.playlist_id_of(playlist_file)
+                playlist, ops = self._load_playlist_log(playlist_id)
                 
-                if song_id in playlist['songs']:
-                    playlist['songs'].remove(song_id)
-                    with open(playlist_path, "w") as f:
-                        json.dump(playlist, f, indent=2)
+                if song_id in playlist:
+                    playlist.discard(song_id)
+                    self._append_playlist_ops(playlist_id, playlist, ops, removed=[song_id])
         except Exception as e:
-            print(f"Error al eliminar canción de las listas: {e}")
+            log.error(f"Error al eliminar canción de las listas: {e}")
 
     def play_playlist(self, playlist_id):
         try:
-            with open(os.path.join(self.lists_dir, f"{playlist_id}.json"), "r") as f:
-                playlist = json.load(f)
-            
+            self._start_playlist(playlist_id, self._load_playlist(playlist_id))
+        except Exception as e:
+            log.error(f"Error al reproducir playlist: {e}")
+
+    def _start_playlist(self, playlist_id, playlist):
+        """Reproduce en aleatorio las canciones de una lista ya cargada (Playlist)"""
+        try:
+            # La canción que sonaba se registra con la lista anterior
+            self._finish_play()
             old_playlist_name = self.current_playlist_name
-            self.current_playlist = playlist["songs"]
-            self.current_playlist_name = playlist["name"]
-            self.played_songs = set()
-            print(f"Reproduciendo lista: {playlist['name']}")
+            self.current_playlist = playlist
+            self.current_playlist_name = playlist.name
+            self.current_playlist_id = playlist_id
+            self._play_queue = []
+            log.info(f"Reproduciendo lista: {playlist.name}")
             
             # Disparar evento de cambio de playlist
-            if self.integration_manager and old_playlist_name != playlist["name"]:
+            if self.integration_manager and old_playlist_name != playlist.name:
                 self.integration_manager.trigger_event('playlist_changed', {
                     'playlist_id': playlist_id,
-                    'playlist_name': playlist["name"]
+                    'playlist_name': playlist.name
                 })
             
             # Detener el hilo anterior si existe
             self.is_playing = False
+            self.crossfade.stop()
             if self.check_thread and self.check_thread.is_alive():
                 self.check_thread.join()
             
             # Detener cualquier reproducción actual
-            pygame.mixer.music.stop()
+            self.mixer.stop()
             
             # Iniciar reproducción
             self.is_playing = True
@@ -1164,41 +1647,116 @@ available commands:
             time.sleep(0.5)
             
             # Iniciar el hilo de verificación
-            self.check_thread = threading.Thread(target=self.check_song_end)
-            self.check_thread.daemon = True  # El hilo se cerrará cuando el programa principal termine
-            self.check_thread.start()
+            self._start_end_watcher()
             
         except Exception as e:
-            print(f"Error al reproducir playlist: {e}")
+            log.error(f"Error al reproducir playlist: {e}")
 
     def check_song_end(self):
         """Verifica si la canción actual ha terminado y reproduce la siguiente"""
+        # Cada segundo, o lo que indique la salida de audio (las aceleradas comprueban más a menudo)
+        interval = getattr(self.mixer, "poll_interval", 1)
         # Esperar un momento antes de empezar a verificar para evitar llamadas duplicadas
-        time.sleep(2)
-        while self.is_playing:
+        time.sleep(2 * interval)
+        # Con el fundido activo, el fin de canción lo programa su planificador
+        while self.is_playing and not self.crossfade.enabled:
             if self.is_paused == False:
-                if not pygame.mixer.music.get_busy() and self.current_playlist:
-                    self.play_next_song()
-            time.sleep(1)  # Verificar cada segundo
+                with self._transition_lock:
+                    if self.is_playing and not self.mixer.get_busy() and self.current_playlist:
+                        self.play_next_song()
+            time.sleep(interval)
+
+    def _start_end_watcher(self):
+        """Vigila el fin de la canción: planificador del fundido o hilo de sondeo"""
+        if self.crossfade.enabled:
+            self.crossfade.reschedule()
+            return
+        if self.check_thread and self.check_thread.is_alive():
+            return
+        self.check_thread = threading.Thread(target=self.check_song_end)
+        self.check_thread.daemon = True  # El hilo se cerrará cuando el programa principal termine
+        self.check_thread.start()
+
+    def set_crossfade(self, seconds=None):
+        """Activa el fundido entre canciones: crossfade <segundos> (0 lo desactiva)"""
+        if seconds is None:
+            if self.crossfade.enabled:
+                print(f"Fundido entre canciones: {self.crossfade.seconds:g}s")
+            else:
+                print("Fundido entre canciones desactivado")
+            print("Uso: crossfade <segundos> (0 para desactivarlo)")
+            return False
+        if not self.supports_crossfade:
+            print("Esta salida de audio no admite fundido entre canciones")
+            return False
+        try:
+            value = float(seconds)
+            if value < 0 or value > 30:
+                raise ValueError
+        except ValueError:
+            print("Los segundos de fundido deben estar entre 0 y 30")
+            return False
 
-    def play_next_song(self):
+        self.crossfade.set_seconds(value)
+        if self.is_playing:
+            self._start_end_watcher()
+        if value:
+            print(f"Fundido entre canciones: {value:g}s")
+        else:
+            print("Fundido entre canciones desactivado")
+        return True
+
+    def play_next_song(self, fade_ms=0, skipped=False):
+        with self._transition_lock:
+            self._play_next_song(fade_ms, skipped)
+
+    def skip_song(self):
+        """Pasa a la siguiente canción (en el historial cuenta como saltada)"""
+        self.play_next_song(skipped=True)
+
+    def _begin_play(self, song_id):
+        """Anota la canción que empieza a sonar; se registra en el historial al terminar"""
+        self._now_playing = (song_id, time.time())
+
+    def _finish_play(self, skipped=False):
+        """Registra en el historial la canción que estaba sonando (antes de parar el reloj)"""
+        if self._now_playing is None:
+            return
+        song_id, started = self._now_playing
+        self._now_playing = None
+        seconds = self.clock.listened
+        self.history.record(song_id, seconds, skipped, self.current_playlist_id,
+                            self.current_playlist_name, when=started)
+        self.stats.increment("total_play_time", int(seconds))
+        if skipped:
+            self.stats.increment("songs_skipped")
+
+    def save_history(self):
+        """Registra la canción actual y escribe los eventos pendientes del historial"""
+        self._finish_play()
+        self.history.flush()
+
+    def _play_next_song(self, fade_ms=0, skipped=False):
+        transition_started = time.perf_counter()
+        self._finish_play(skipped)
         if not self.current_playlist:
             self.is_playing = False
             return
 
-        available_songs = [s for s in self.current_playlist if s not in self.played_songs]
-        if not available_songs:
-            self.played_songs.clear()
-            available_songs = self.current_playlist
-
-        next_song = random.choice(available_songs)
-        self.played_songs.add(next_song)
+        # Cada vuelta baraja la lista una vez: O(1) por cambio y sin conjuntos que crezcan
+        if not self._play_queue:
+            self._play_queue = self._shuffled_queue(self.current_playlist)
+        next_song = self._play_queue.pop()
         
         try:
             # Detener cualquier reproducción actual antes de cargar una nueva canción
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load(os.path.join(self.songs_dir, f"{next_song}.mp3"))
-            pygame.mixer.music.play()
+            # (en un fundido, la cola de la anterior ya suena por su propio canal)
+            self.mixer.stop()
+            self._load_song(next_song)
+            self.mixer.play(fade_ms=int(fade_ms))
+            self.mixer.set_volume(self._effective_volume(next_song))
+            self.clock.start()
+            metrics.TRACK_TRANSITION_SECONDS.observe(time.perf_counter() - transition_started)
             title = self.get_song_title(next_song)
             duration = self.get_song_duration(next_song)
             
@@ -1207,9 +1765,11 @@ available commands:
             self.current_song_id = next_song
             self.current_song_title = title
             self.current_song_duration = duration
+            self.crossfade.reschedule()
             
             self.stats.increment("songs_played")
-            print(f"Reproduciendo: {title}")
+            self._begin_play(next_song)
+            log.info(f"Reproduciendo: {title}", extra={"event": "song_started", "song_id": next_song})
             
             # Disparar evento de cambio de canción
             if self.integration_manager and old_song_id != next_song:
@@ -1221,23 +1781,113 @@ available commands:
                 if not old_song_id:  # Primera canción
                     self.integration_manager.trigger_event('playback_started')
         except Exception as e:
-            print(f"Error al reproducir canción: {e}")
+            log.error(f"Error al reproducir canción: {e}")
             self.is_playing = False
 
+    @staticmethod
+    def _shuffled_queue(songs, rng=random):
+        """Una vuelta de la lista en aleatorio; las canciones salen con pop() (del final al principio)"""
+        queue = list(songs)
+        rng.shuffle(queue)
+        return queue
+
+    def _load_song(self, song_id):
+        """Carga una canción en el mixer, desde la caché de audio si está activa"""
+        song_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
+        if self.audio_cache:
+            audio = self.audio_cache.open(song_id, song_path, self.library.song_mtime(song_id))
+            self.mixer.load(audio, "mp3")
+        else:
+            self.mixer.load(song_path)
+
+    def _read_song_bytes(self, song_id):
+        """Contenido del MP3 de una canción (desde la caché de audio si está activa)"""
+        song_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
+        if self.audio_cache:
+            return self.audio_cache.open(song_id, song_path, self.library.song_mtime(song_id)).getvalue()
+        with open(song_path, "rb") as f:
+            return f.read()
+
+    def _frame_index(self, song_id):
+        """Índice de tramas MP3 de una canción (se guardan los últimos 16)"""
+        mtime = self.library.song_mtime(song_id)
+        cached = self._frame_indexes.get(song_id)
+        if cached and cached[0] == mtime:
+            self._frame_indexes.move_to_end(song_id)
+            return cached[1]
+        index = Mp3FrameIndex.from_bytes(self._read_song_bytes(song_id))
+        self._frame_indexes[song_id] = (mtime, index)
+        while len(self._frame_indexes) > 16:
+            self._frame_indexes.popitem(last=False)
+        return index
+
+    def seek(self, position=None):
+        """Salta a una posición de la canción actual: seek 90 | seek 1:30 | seek +10 | seek -10"""
+        if not self.is_playing or not self.current_song_id:
+            print("No hay ninguna reproducción en curso")
+            return False
+        if position is None:
+            print("Uso: seek <segundos | mm:ss | +segundos | -segundos>")
+            return False
+        try:
+            if position[0] in "+-":
+                target = self.clock.position + float(position)
+            elif ":" in position:
+                minutes, seconds = position.split(":", 1)
+                target = int(minutes) * 60 + float(seconds)
+            else:
+                target = float(position)
+        except ValueError:
+            print(f"Posición no válida: {position}")
+            return False
+        return self.seek_to(target)
+
+    def seek_to(self, seconds):
+        """Posiciona la canción actual en seconds leyendo desde la trama MP3 correspondiente"""
+        try:
+            song_id = self.current_song_id
+            index = self._frame_index(song_id)
+            if index.duration:
+                seconds = min(seconds, max(0.0, index.duration - 1))
+            offset, actual = index.locate(seconds)
+            
+            # Se entrega al decodificador el archivo a partir de esa trama, sin decodificar lo anterior
+            if self.audio_cache:
+                audio = io.BytesIO(self._read_song_bytes(song_id)[offset:])
+            else:
+                with open(os.path.join(self.songs_dir, f"{song_id}.mp3"), "rb") as f:
+                    f.seek(offset)
+                    audio = io.BytesIO(f.read())
+            self.mixer.load(audio, "mp3")
+            self.mixer.play()
+            if self.is_paused:
+                self.mixer.pause()
+            self.clock.seek(actual)
+            self.crossfade.reschedule()
+            print(f"⏩ Posición: {int(actual) // 60}:{int(actual) % 60:02d}")
+            return True
+        except Exception as e:
+            print(f"Error al cambiar de posición: {e}")
+            return False
+
     def play_song(self, song_id):
         try:
+            self._finish_play()
             # Detener el hilo anterior si existe
             self.is_playing = False
+            self.crossfade.stop()
             if self.check_thread and self.check_thread.is_alive():
                 self.check_thread.join()
             
             # Detener cualquier reproducción actual
-            pygame.mixer.music.stop()
+            self.mixer.stop()
             
             # Iniciar reproducción
             self.is_playing = True
-            pygame.mixer.music.load(os.path.join(self.songs_dir, f"{song_id}.mp3"))
-            pygame.mixer.music.play()
+            self._load_song(song_id)
+            self.mixer.play()
+            self.mixer.set_volume(self._effective_volume(song_id))
+            self.clock.start()
             title = self.get_song_title(song_id)
             duration = self.get_song_duration(song_id)
             
@@ -1247,8 +1897,11 @@ available commands:
             self.current_song_title = title
             self.current_song_duration = duration
             self.current_playlist_name = None  # No hay playlist cuando se reproduce una canción individual
+            self.current_playlist_id = None
+            self.crossfade.reschedule()
+            self._begin_play(song_id)
             
-            print(f"Reproduciendo: {title}")
+            log.info(f"Reproduciendo: {title}", extra={"event": "song_started", "song_id": song_id})
             
             # Disparar evento de cambio de canción
             if self.integration_manager and old_song_id != song_id:
@@ -1260,22 +1913,22 @@ available commands:
                 self.integration_manager.trigger_event('playback_started')
             
             # Iniciar el hilo de verificación
-            self.check_thread = threading.Thread(target=self.check_song_end)
-            self.check_thread.daemon = True
-            self.check_thread.start()
+            self._start_end_watcher()
             
         except Exception as e:
-            print(f"Error al reproducir canción: {e}")
+            log.error(f"Error al reproducir canción: {e}")
 
     def set_volume(self, volume_str):
         """Ajusta el volumen del reproductor (0-100)"""
         try:
             volume = float(volume_str) / 100
             # Limitar el volumen máximo al 50% del sistema
-            volume = min(volume, 3.0)
-            if 0 <= volume <= 3.0:
+            volume = min(volume, MAX_VOLUME)
+            if 0 <= volume <= MAX_VOLUME:
                 self.volume = volume
-                pygame.mixer.music.set_volume(volume)
+                # Si el mixer aún no existe, el volumen se aplicará al inicializarlo
+                if self.mixer_ready:
+                    self.mixer.set_volume(self._effective_volume(self.current_song_id))
                 print(f"Volumen ajustado a {int(volume * 100)}%")
             else:
                 print("El volumen debe estar entre 0 y 50")
@@ -1289,23 +1942,20 @@ available commands:
             if not playlist_id.endswith('L'):
                 playlist_id = f"{playlist_id}L"
             
-            playlist_path = os.path.join(self.lists_dir, f"{playlist_id}.json")
-            if not os.path.exists(playlist_path):
+            if not self.library.has_playlist(playlist_id):
                 print(f"Error: La lista {playlist_id} no existe")
                 return False
 
             # Cargar la lista
-            with open(playlist_path, "r") as f:
-                playlist = json.load(f)
+            playlist = self._load_playlist(playlist_id)
             
-            print(f"\nVerificando lista: {playlist['name']}")
-            print(f"Total de canciones: {len(playlist['songs'])}")
+            print(f"\nVerificando lista: {playlist.name}")
+            print(f"Total de canciones: {len(playlist)}")
             
             # Verificar cada canción
             missing_songs = []
-            for song_id in playlist['songs']:
-                song_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
-                if not os.path.exists(song_path):
+            for song_id in playlist:
+                if not self.library.has_song(song_id):
                     missing_songs.append(song_id)
                     print(f"❌ Canción no encontrada: {self.get_song_title(song_id)} (ID: {song_id})")
                 else:
@@ -1320,10 +1970,9 @@ available commands:
                 # Preguntar si quiere eliminar las canciones faltantes
                 response = input("\n¿Deseas eliminar las canciones faltantes de la lista? (s/n): ")
                 if response.lower() == 's':
-                    playlist['songs'] = [s for s in playlist['songs'] if s not in missing_songs]
-                    with open(playlist_path, "w") as f:
-                        json.dump(playlist, f, indent=2)
-                    print(f"✅ Lista actualizada. Canciones restantes: {len(playlist['songs'])}")
+                    playlist.discard(*missing_songs)
+                    self._save_playlist(playlist_id, playlist)
+                    print(f"✅ Lista actualizada. Canciones restantes: {len(playlist)}")
             else:
                 print("\n✅ Todas las canciones están presentes en la lista")
             
@@ -1336,17 +1985,21 @@ available commands:
         """Detiene la reproducción actual"""
         try:
             self.is_playing = False
+            self.crossfade.stop()
             if self.check_thread and self.check_thread.is_alive():
                 self.check_thread.join()
-            pygame.mixer.music.stop()
+            if self.mixer_ready:
+                self.mixer.stop()
+            self.save_history()
+            self.clock.stop()
             self.current_playlist = []
-            self.played_songs.clear()
+            self._play_queue = []
             print("Reproducción detenida")
             # Disparar evento
             if self.integration_manager:
                 self.integration_manager.trigger_event('playback_stopped')
         except Exception as e:
-            print(f"Error al detener la reproducción: {e}")
+            log.error(f"Error al detener la reproducción: {e}")
 
     def cancel_current_download(self):
         """Cancela la descarga actual"""
@@ -1356,144 +2009,600 @@ available commands:
         else:
             print("No hay ninguna descarga en progreso")
 
-    def load_song_counter(self):
-        """Carga o crea el contador de IDs de canciones"""
+    def _rebuild_song_counter(self):
+        """Calcula el contador a partir del mayor ID conocido (metadatos y archivos)"""
+        highest = 0
         try:
-            if os.path.exists(self.song_counter_file):
-                with open(self.song_counter_file, 'r') as f:
-                    return json.load(f)
-            else:
-                # Crear el directorio Songs si no existe
-                os.makedirs(self.songs_dir, exist_ok=True)
-                # Inicializar el contador
-                counter = {"next_id": 1}
-                with open(self.song_counter_file, 'w') as f:
-                    json.dump(counter, f)
-                return counter
-        except Exception as e:
-            print(f"Error al cargar el contador: {e}")
-            return {"next_id": 1}
+            known_ids = list(self.metadata.data.keys())
+        except Exception:
+            known_ids = []
+        known_ids += [name[:-4] for name in self.library.song_files()]
+        for song_id in known_ids:
+            if song_id.isdigit():
+                highest = max(highest, int(song_id))
+        return {"next_id": highest + 1}
 
-    def save_song_counter(self):
-        """Guarda el contador de IDs de canciones"""
-        try:
-            with open(self.song_counter_file, 'w') as f:
-                json.dump(self.song_counter, f)
-        except Exception as e:
-            print(f"Error al guardar el contador: {e}")
+    def recover_storage(self):
+        """Comprobación de arranque: limpia escrituras interrumpidas y repara el contador"""
+        recover_json(self.metadata.path)
+        status = recover_json(self.song_counter_file, rebuild=self._rebuild_song_counter)
+        if status == "rebuilt" and self.library.song_files():
+            log.info(f"✓ Contador de IDs reconstruido desde la biblioteca")
+        # Los temporales de listas se limpian en segundo plano para no retrasar el arranque
+        threading.Thread(target=self._cleanup_playlist_temps, daemon=True).start()
+
+    def _cleanup_playlist_temps(self):
+        """Elimina los temporales que dejó una escritura de lista interrumpida"""
+        for name in self.library.playlist_files(include_temp=True):
+            if name.endswith(TEMP_SUFFIX):
+                # Con el cerrojo de la lista: si se está guardando ahora, espera a que termine
+                try:
+                    remove_temp(os.path.join(self.lists_dir, name[:-len(TEMP_SUFFIX)]))
+                except OSError:
+                    pass
+
+    def _playlist_path(self, playlist_id):
+        """Archivo actual de una lista (v2 .list o v1 .json); si no existe, el de v2"""
+        name = self.library.playlist_file(playlist_id) or f"{playlist_id}{playlist_format.V2_EXTENSION}"
+        return os.path.join(self.lists_dir, name)
+
+    def _load_playlist(self, playlist_id):
+        """Carga una lista de reproducción (Playlist) en cualquier formato"""
+        return self._load_playlist_log(playlist_id)[0]
+
+    def _load_playlist_log(self, playlist_id):
+        """Carga una lista junto con el número de operaciones de su registro (v2)"""
+        document, ops = playlist_format.read(self._playlist_path(playlist_id))
+        return Playlist.from_json(document), ops
+
+    def _save_playlist(self, playlist_id, playlist):
+        """Guarda una lista completa (formato v2, compactada) con escritura atómica"""
+        name = f"{playlist_id}{playlist_format.V2_EXTENSION}"
+        playlist_format.write_v2(os.path.join(self.lists_dir, name), playlist.to_json())
+        self.library.store_playlist_summary(name, {"name": playlist.name, "count": len(playlist)})
+        # Migración: al reescribir una lista v1 se elimina el archivo antiguo
+        old_path = os.path.join(self.lists_dir, f"{playlist_id}{playlist_format.V1_EXTENSION}")
+        if os.path.exists(old_path):
+            os.remove(old_path)
+            self.library.refresh_file("lists", os.path.basename(old_path))
+
+    def _append_playlist_ops(self, playlist_id, playlist, ops, added=(), removed=()):
+        """
+        Registra cambios de una lista sin reescribirla
+
+        playlist es el estado ya modificado y ops las operaciones que tenía el
+        registro. Las listas v1 se convierten, y si el registro crece demasiado
+        respecto al número de canciones se compacta.
+        """
+        if not added and not removed:
+            return
+        path = self._playlist_path(playlist_id)
+        pending = ops + len(added) + len(removed)
+        if not path.endswith(playlist_format.V2_EXTENSION) or \
+                playlist_format.needs_compaction(pending, len(playlist)):
+            self._save_playlist(playlist_id, playlist)
+            return
+        playlist_format.append_ops(path, added, removed)
+        self.library.store_playlist_summary(os.path.basename(path),
+                                            {"name": playlist.name, "count": len(playlist)})
+
+    def _delete_playlist_files(self, playlist_id):
+        """Elimina una lista en todos sus formatos; devuelve False si no existía"""
+        deleted = False
+        for ext in playlist_format.EXTENSIONS:
+            name = f"{playlist_id}{ext}"
+            path = os.path.join(self.lists_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+                self.library.refresh_file("lists", name)
+                deleted = True
+        return deleted
+
+    def convert_playlists(self, version="2"):
+        """Convierte todas las listas al formato indicado: convert_lists 2 | convert_lists 1"""
+        if version not in ("1", "2"):
+            print("Uso: convert_lists <1 | 2>")
+            return []
+        converted = playlist_format.convert_directory(self.lists_dir, int(version))
+        self.library.rescan("lists")
+        print(f"✓ {len(converted)} listas convertidas al formato v{version}")
+        if version == "1":
+            print("  (las listas se volverán a guardar en v2 la próxima vez que se editen)")
+        return converted
 
     def get_next_song_id(self):
-        """Obtiene el siguiente ID de canción disponible"""
-        song_id = str(self.song_counter["next_id"])
-        self.song_counter["next_id"] += 1
-        self.save_song_counter()
-        return song_id
-
-    def edit_playlist(self, playlist_id, action, *song_ids):
-        """Edita una lista de reproducción existente"""
+        """Obtiene el siguiente ID de canción disponible (seguro entre hilos y procesos)"""
+        return self.song_ids.next()
+
+    def reserve_song_ids(self, count):
+        """Reserva count IDs de canción con una sola escritura del contador"""
+        return self.song_ids.reserve(count)
+
+    @staticmethod
+    def _list_id(item_id):
+        """'3', '3l' o '3L' -> '3L' (los comandos llegan en minúsculas)"""
+        if item_id[-1:] in ('l', 'L'):
+            item_id = item_id[:-1]
+        return f"{item_id}L"
+
+    def edit_playlist(self, playlist_id, action, *item_ids):
+        """
+        Edita una lista de reproducción existente
+
+        add/remove reciben IDs de canciones; union/intersect/diff reciben IDs
+        de otras listas y combinan sus canciones con las de esta.
+        """
         try:
             # Verificar que la lista existe
-            if not playlist_id.endswith('L'):
-                playlist_id = f"{playlist_id}L"
+            playlist_id = self._list_id(playlist_id)
             
-            playlist_path = os.path.join(self.lists_dir, f"{playlist_id}.json")
-            if not os.path.exists(playlist_path):
+            if not self.library.has_playlist(playlist_id):
                 print(f"Error: La lista {playlist_id} no existe")
                 return False
 
             # Cargar la lista
-            with open(playlist_path, "r") as f:
-                playlist = json.load(f)
+            playlist, ops = self._load_playlist_log(playlist_id)
             
             # Verificar la acción
             action = action.lower()
-            if action not in ['add', 'remove']:
-                print("Error: La acción debe ser 'add' o 'remove'")
+            if action not in playlist_sets.ACTIONS:
+                print(f"Error: La acción debe ser una de: {', '.join(playlist_sets.ACTIONS)}")
                 return False
 
-            # Verificar que las canciones existen
-            valid_songs = []
-            for song_id in song_ids:
-                song_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
-                if not os.path.exists(song_path):
-                    print(f"Advertencia: La canción {song_id} no existe")
-                else:
-                    valid_songs.append(song_id)
+            if action in playlist_sets.SONG_ACTIONS:
+                # Verificar que las canciones existen (una sola consulta al índice en memoria)
+                items = list(dict.fromkeys(item_ids))
+                missing = set(self.library.missing_songs(items))
+                for song_id in items:
+                    if song_id in missing:
+                        print(f"Advertencia: La canción {song_id} no existe")
+                items = [song_id for song_id in items if song_id not in missing]
+            else:
+                # Cargar las otras listas
+                items = []
+                for other_id in dict.fromkeys(map(self._list_id, item_ids)):
+                    if not self.library.has_playlist(other_id):
+                        print(f"Advertencia: La lista {other_id} no existe")
+                        continue
+                    items.append(self._load_playlist(other_id).songs)
+                if not items:
+                    print("Error: Indica al menos una lista existente")
+                    return False
+                if action == "union":
+                    missing = set(self.library.missing_songs({s for songs in items for s in songs}))
+                    if missing:
+                        print(f"Advertencia: {len(missing)} canciones de esas listas no existen y no se añadirán")
+                        items = [[s for s in songs if s not in missing] for songs in items]
 
             # Realizar la acción
-            if action == 'add':
-                # Añadir canciones (evitando duplicados)
-                for song_id in valid_songs:
-                    if song_id not in playlist['songs']:
-                        playlist['songs'].append(song_id)
-                print(f"✓ Añadidas {len(valid_songs)} canciones a la lista")
-            else:  # remove
-                # Eliminar canciones
-                original_count = len(playlist['songs'])
-                playlist['songs'] = [s for s in playlist['songs'] if s not in valid_songs]
-                removed_count = original_count - len(playlist['songs'])
+            original_count = len(playlist)
+            playlist.songs, added, removed = playlist_sets.apply(action, playlist.songs, items)
+            if action in ("add", "union"):
+                print(f"✓ Añadidas {len(added)} canciones a la lista")
+            else:
+                removed_count = original_count - len(playlist)
                 print(f"✓ Eliminadas {removed_count} canciones de la lista")
 
-            # Guardar la lista actualizada
-            with open(playlist_path, "w") as f:
-                json.dump(playlist, f, indent=2)
+            # Guardar solo los cambios (se añaden al final del registro de la lista)
+            self._append_playlist_ops(playlist_id, playlist, ops, added, removed)
             
             # Mostrar resumen
-            print(f"\nLista actualizada: {playlist['name']}")
-            print(f"Total de canciones: {len(playlist['songs'])}")
+            print(f"\nLista actualizada: {playlist.name}")
+            print(f"Total de canciones: {len(playlist)}")
             return True
 
         except Exception as e:
             print(f"Error al editar la lista: {e}")
             return False
 
-    def show_list_content(self, playlist_id):
+    def show_list_content(self, playlist_id, *args):
         """Muestra el contenido detallado de una lista de reproducción"""
+        sorts = ("order", "id", "name")
+        options, _ = self._parse_list_options(
+            args, sorts, "showlist <list_id> [--page N] [--limit N] [--sort order|id|name]")
+        if options is None:
+            return False
         try:
             # Verificar que la lista existe
             if not playlist_id.endswith('L'):
                 playlist_id = f"{playlist_id}L"
             
-            playlist_path = os.path.join(self.lists_dir, f"{playlist_id}.json")
-            if not os.path.exists(playlist_path):
+            if not self.library.has_playlist(playlist_id):
                 print(f"Error: La lista {playlist_id} no existe")
                 return False
 
             # Cargar la lista
-            with open(playlist_path, "r") as f:
-                playlist = json.load(f)
+            playlist = self._load_playlist(playlist_id)
             
             # Cargar metadatos
-            metadata_file = os.path.join(self.songs_dir, 'metadata.json')
-            metadata = {}
-            if os.path.exists(metadata_file):
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
+            metadata = self.metadata.data
             
-            print(f"\nLista: {playlist['name']}")
+            print(f"\nLista: {playlist.name}")
             print(f"ID: {playlist_id}")
-            print(f"Total de canciones: {len(playlist['songs'])}")
+            print(f"Total de canciones: {len(playlist)}")
             print("\nCanciones:")
             
-            for i, song_id in enumerate(playlist['songs'], 1):
-                if song_id in metadata:
-                    song_info = metadata[song_id]
-                    title = song_info.get("title", f"Canción {song_id}")
-                    added_date = song_info.get("added_date", "Fecha desconocida")
-                    print(f"{i}. {title}")
-                    print(f"   ID: {song_id} - Añadida: {added_date}")
-                else:
-                    print(f"{i}. Canción {song_id}")
-                    print(f"   ID: {song_id}")
-            
+            keys = {
+                "order": None,
+                "id": listing.numeric_key,
+                "name": lambda song_id: ((getattr(metadata.get(song_id), "title", None) or "").lower(),
+                                         listing.numeric_key(song_id)),
+            }
+            page, total, pages = listing.paginate(playlist.songs, options, keys[options.sort])
+            listing.print_page(self._list_content_lines(page, metadata), options, total, pages,
+                               self._page_command(f"showlist {playlist_id[:-1]}", options, "order"))
             return True
         except Exception as e:
             print(f"Error al mostrar la lista: {e}")
             return False
             
+    def _list_content_lines(self, page, metadata):
+        """Líneas de show_list_content, generadas solo para la página que se muestra"""
+        for i, song_id in page:
+            if song_id in metadata:
+                song_info = metadata[song_id]
+                added_date = song_info.added_date or "Fecha desconocida"
+                yield f"{i}. {song_info.display_title}\n   ID: {song_id} - Añadida: {added_date}"
+            else:
+                yield f"{i}. Canción {song_id}\n   ID: {song_id}"
+
+    # ========== Listas inteligentes ==========
+
+    def _ensure_song_facts(self):
+        """Indexa los metadatos que usan las reglas (o los reindexa si metadata.json cambió en disco)"""
+        if self.owner is not self:
+            return self.owner._ensure_song_facts()
+        metadata = self.metadata.data
+        if self._facts_source is not metadata:
+            self.song_facts.rebuild(metadata)
+            self._facts_source = metadata
+        return self.song_facts
+
+    def _cached_duration(self, song_id):
+        """Duración de una canción que aún no la tenía en los metadatos; smart_songs la guarda para la próxima vez"""
+        duration = self.get_song_duration(song_id)
+        if duration:
+            self._new_durations[song_id] = duration
+        return duration
+
+    def smart_songs(self, smart_id):
+        """Canciones actuales de una lista inteligente (None si no existe)"""
+        if self.owner is not self:
+            return self.owner.smart_songs(smart_id)
+        self._ensure_song_facts()
+        # Las duraciones que falten se miden sin el cerrojo de metadatos y después se guardan juntas
+        songs = self.smart_lists.songs(smart_id)
+        durations, self._new_durations = self._new_durations, {}
+        if durations:
+            with self.metadata.batch():
+                for song_id, duration in durations.items():
+                    self.update_song_metadata(song_id, duration=duration)
+        return songs
+
+    def smart_command(self, action=None, *args):
+        """Listas inteligentes: smart create|lists|show|play|delete"""
+        usage = """Uso:
+  smart create <nombre> <regla> [regla] ...
+  smart lists
+  smart show <id> [--page N] [--limit N]
+  smart play <id>
+  smart delete <id>
+Reglas: most_played:7d, played:7d, not_played:30d, never_played, added:7d, duration<4m, duration>90s, limit:50
+Ejemplo: smart create semana most_played:7d limit:50"""
+        if action == "create" and len(args) >= 2:
+            try:
+                smart_id = self.smart_lists.create(args[0], args[1:])
+            except ValueError as e:
+                print(f"Error: {e}")
+                return None
+            print(f"Lista inteligente creada con ID: {smart_id}")
+            return smart_id
+        if action in ("lists", "list", "l"):
+            definitions = self.smart_lists.all()
+            if not definitions:
+                print("No hay listas inteligentes")
+            for smart_id in sorted(definitions, key=listing.numeric_key):
+                definition = definitions[smart_id]
+                print(f"{smart_id}: {definition['name']} ({' '.join(definition['rules'])})")
+            return definitions
+        if action == "show" and args:
+            return self.show_smart_list(*args)
+        if action == "play" and args:
+            return self.play_smart_list(args[0])
+        if action == "delete" and args:
+            if not self.smart_lists.delete(args[0]):
+                print(f"Error: La lista inteligente {self.smart_lists.normalize_id(args[0])} no existe")
+                return False
+            print(f"Lista inteligente {self.smart_lists.normalize_id(args[0])} eliminada")
+            return True
+        print(usage)
+        return None
+
+    def show_smart_list(self, smart_id, *args):
+        """Muestra las canciones que tiene ahora una lista inteligente"""
+        options, _ = self._parse_list_options(args, ("order",), "smart show <id> [--page N] [--limit N]")
+        if options is None:
+            return False
+        definition = self.smart_lists.get(smart_id)
+        if definition is None:
+            print(f"Error: La lista inteligente {self.smart_lists.normalize_id(smart_id)} no existe")
+            return False
+        songs = self.smart_songs(smart_id)
+        print(f"\nLista inteligente: {definition['name']}")
+        print(f"Reglas: {' '.join(definition['rules'])}")
+        print(f"Total de canciones: {len(songs)}")
+        print("\nCanciones:")
+        page, total, pages = listing.paginate(songs, options)
+        listing.print_page(self._list_content_lines(page, self.metadata.data), options, total, pages,
+                           self._page_command(f"smart show {smart_id}", options, "order"))
+        return True
+
+    def play_smart_list(self, smart_id):
+        """Calcula las canciones de una lista inteligente y las reproduce"""
+        definition = self.smart_lists.get(smart_id)
+        if definition is None:
+            print(f"Error: La lista inteligente {self.smart_lists.normalize_id(smart_id)} no existe")
+            return False
+        songs = self.smart_songs(smart_id)
+        if not songs:
+            print(f"La lista inteligente {definition['name']} no tiene canciones ahora mismo")
+            return False
+        self._start_playlist(self.smart_lists.normalize_id(smart_id), Playlist(definition["name"], songs))
+        return True
+
     def show_stats(self, *args):
         """Muestra las estadísticas del usuario."""
         print(self.stats.get_formatted_stats())
+        # Del historial solo se leen los resúmenes ya agregados, no los eventos
+        month = self.history.totals(self._period_start("month"))
+        print("Listening history (this month)")
+        print("───────────────────────────")
+        print(f"Plays: {month['plays']}")
+        print(f"Play time: {UserStats._format_seconds(int(month['seconds']))}")
+        top = self.history.top_songs(self._period_start("month"), 5)
+        if top:
+            print("Top songs:")
+            for i, (song_id, plays, _) in enumerate(top, 1):
+                print(f"  {i}. {self.get_song_title(song_id)} ({plays})")
+        print("───────────────────────────")
+        if self.audio_cache:
+            print(self.audio_cache.get_formatted_stats())
+        print(self.profiler.get_formatted_stats())
+
+    def profile_command(self, *args):
+        """Ejecuta un comando bajo cProfile y muestra (o guarda) dónde se va el tiempo"""
+        usage = "profile [--save file.pstats] [--sort cumulative|tottime|calls] [--limit N] <comando> [args]"
+        args = list(args)
+        output, sort, limit = None, "cumulative", 25
+        try:
+            while args and args[0].startswith("--"):
+                option = args.pop(0).lower()
+                if option == "--save":
+                    output = args.pop(0)
+                elif option == "--sort":
+                    sort = args.pop(0).lower()
+                    if sort not in profiling.SORT_KEYS:
+                        raise ValueError
+                elif option == "--limit":
+                    limit = int(args.pop(0))
+                else:
+                    raise ValueError
+        except (IndexError, ValueError):
+            args = []
+        if not args or args[0].lower() == "profile":
+            print(f"Uso: {usage}")
+            print("Ejemplo: profile sl 1")
+            return
+        
+        command = " ".join(args)
+        result, report = profiling.run_profiled(lambda: self.process_command(command), sort, limit, output)
+        if report:
+            print(report)
+        else:
+            print(f"Perfil guardado en {output} (ábrelo con: python -m pstats {output})")
+        return result
+
+    def memory_command(self, *args):
+        """Auditoría de memoria: mem [start [frames] | top [N] | diff [N] | stop]"""
+        usage = "mem [start [frames] | top [N] | diff [N] | stop]"
+        action = args[0] if args else ""
+        try:
+            number = int(args[1]) if len(args) > 1 else None
+        except ValueError:
+            print(f"Uso: {usage}")
+            return
+        
+        if action == "start":
+            self.memory.start(number or 1)
+            print("Trazando memoria (mem diff para ver qué crece, mem stop para terminar)")
+        elif action == "stop":
+            if self.memory.tracing:
+                self.memory.stop()
+            print("Trazado de memoria detenido")
+        elif action in ("top", "diff"):
+            if not self.memory.tracing:
+                print("El trazado de memoria está apagado: usa mem start")
+                return
+            if action == "top":
+                print(self.memory.get_formatted_top(number or 10))
+            else:
+                print(self.memory.get_formatted_diff(number or 10))
+        elif action:
+            print(f"Uso: {usage}")
+            return
+        print(self.memory.get_formatted_summary())
+
+    def zone_command(self, *args):
+        """Zonas de reproducción: zone [add <nombre> <salida> | remove <nombre> | list | devices | <nombre> <comando>]"""
+        usage = "zone [add <nombre> <null|device:NOMBRE> | remove <nombre> | list | devices | <nombre> <comando>]"
+        if self.zones is None:
+            print("Las zonas se gestionan desde el reproductor principal")
+            return
+        action = args[0].lower() if args else "list"
+        
+        if action == "add":
+            if len(args) < 3:
+                print(f"Uso: {usage}")
+                return
+            try:
+                zone = self.zones.add(args[1], " ".join(args[2:]))
+            except ValueError as e:
+                print(e)
+                return
+            print(f"✓ Zona {zone.zone_name} creada ({zone.mixer.describe()})")
+        elif action == "remove":
+            if len(args) < 2:
+                print(f"Uso: {usage}")
+            elif self.zones.remove(args[1]):
+                print(f"Zona {args[1].lower()} eliminada")
+            else:
+                print(f"No existe la zona {args[1].lower()}")
+        elif action in ("list", "status"):
+            rows = self.zones.status()
+            if not rows:
+                print("No hay zonas (zone add <nombre> <salida> para crear una)")
+                return
+            for row in rows:
+                if row["playing"]:
+                    state = "en pausa" if row["paused"] else "sonando"
+                    detail = f"{state}: {row['song']} ({row['playlist']}, {row['position']:g}s)"
+                else:
+                    detail = "detenida"
+                print(f"- {row['name']} [{row['output']}] vol {row['volume']:g} - {detail}")
+        elif action == "devices":
+            devices = list_devices()
+            if not devices:
+                print("No se encontraron dispositivos de audio (requiere pygame 2)")
+            for device in devices:
+                print(f"- device:{device}")
+        elif self.zones.get(action) is not None and len(args) > 1:
+            self.zones.run(action, " ".join(args[1:]))
+        else:
+            print(f"Uso: {usage}")
+
+    def export_mix(self, *args):
+        """Renderiza una lista como una sola mezcla continua: export_mix <list_id> [archivo] [opciones]"""
+        usage = ("export_mix <list_id> [archivo] [--crossfade S] [--seed N] [--bitrate 192k] "
+                 "[--format F] [--workers N]")
+        args = list(args)
+        positional = []
+        crossfade, seed, bitrate, fmt, workers = CROSSFADE_SECONDS, None, None, None, None
+        try:
+            while args:
+                arg = args.pop(0)
+                option = arg.lower()
+                if option == "--crossfade":
+                    crossfade = float(args.pop(0))
+                    if crossfade < 0 or crossfade > 30:
+                        raise ValueError
+                elif option == "--seed":
+                    seed = int(args.pop(0))
+                elif option == "--bitrate":
+                    bitrate = args.pop(0)
+                elif option == "--format":
+                    fmt = args.pop(0)
+                elif option == "--workers":
+                    workers = int(args.pop(0))
+                elif option.startswith("--"):
+                    raise ValueError
+                else:
+                    positional.append(arg)
+        except (IndexError, ValueError):
+            positional = []
+        if not positional or len(positional) > 2:
+            print(f"Uso: {usage}")
+            print("Ejemplo: export_mix 1 fiesta.mp3 --crossfade 5")
+            return None
+        
+        playlist_id = positional[0].upper()
+        if not playlist_id.endswith('L'):
+            playlist_id = f"{playlist_id}L"
+        if not self.library.has_playlist(playlist_id):
+            print(f"Error: La lista {playlist_id} no existe")
+            return None
+        playlist = self._load_playlist(playlist_id)
+        target = positional[1] if len(positional) > 1 else f"mix_{playlist_id}.mp3"
+        
+        # El mismo orden que daría play_next_song: una vuelta barajada, sacando con pop()
+        order = self._shuffled_queue(playlist, random.Random(seed))[::-1]
+        tracks = []
+        missing = 0
+        for song_id in order:
+            if not self.library.has_song(song_id):
+                missing += 1
+                continue
+            gain_db = None
+            if NORMALIZE_LOUDNESS:
+                # Como el reproductor con el volumen NORMALIZE_HEADROOM_DB por debajo del máximo: las
+                # canciones flojas suben hasta ese margen y ninguna pasa de 0 dB (el PCM s16 no satura)
+                entry = self.metadata.data.get(song_id)
+                track_gain = entry.gain_db if entry and entry.gain_db is not None else 0.0
+                gain_db = min(track_gain, NORMALIZE_HEADROOM_DB) - NORMALIZE_HEADROOM_DB
+            tracks.append((song_id, os.path.join(self.songs_dir, f"{song_id}.mp3"), gain_db))
+        if missing:
+            log.warning(f"{missing} canciones de la lista no están descargadas: se omiten en la mezcla")
+        if not tracks:
+            print("La lista no tiene canciones descargadas")
+            return None
+        
+        def on_track(position, song_id, decoded):
+            if decoded:
+                log.info(f"Mezcla {position + 1}/{len(tracks)}: {self.get_song_title(song_id)}",
+                         extra={"event": "mix_track", "song_id": song_id})
+        
+        print(f"Exportando {playlist.name} ({len(tracks)} canciones) a {target}...")
+        try:
+            result = mix_export.export_mix(tracks, target, crossfade=crossfade, workers=workers,
+                                           bitrate=bitrate, fmt=fmt, on_track=on_track)
+        except RuntimeError as e:
+            print(f"Error al exportar la mezcla: {e}")
+            return None
+        minutes, seconds = divmod(int(result["seconds"]), 60)
+        print(f"✓ Mezcla guardada en {target}: {result['tracks']} canciones, {minutes}:{seconds:02d} "
+              f"(en {result['elapsed_s']}s)")
+        if result["skipped"]:
+            print(f"No se pudieron decodificar: {', '.join(result['skipped'])}")
+        return result
+
+    @staticmethod
+    def _period_start(period):
+        """Instante en que empieza un periodo (today, week, month, year); None para all"""
+        now = time.localtime()
+        if period == "today":
+            return time.time()
+        if period == "week":
+            return time.time() - 6 * 24 * 3600
+        if period == "month":
+            return time.mktime((now.tm_year, now.tm_mon, 1, 0, 0, 0, 0, 0, -1))
+        if period == "year":
+            return time.mktime((now.tm_year, 1, 1, 0, 0, 0, 0, 0, -1))
+        return None
+
+    def show_top(self, *args):
+        """Canciones más escuchadas de un periodo, desde los resúmenes del historial"""
+        usage = "top [today|week|month|year|all] [--page N] [--limit N] [--sort plays|time]"
+        options, rest = self._parse_list_options(args, ("plays", "time"), usage)
+        if options is None:
+            return
+        period = rest[0] if rest else "month"
+        if period not in ("today", "week", "month", "year", "all"):
+            print(f"Uso: {usage}")
+            return
+        totals = [item for item in self.history.song_totals(self._period_start(period)).items() if item[1][0]]
+        if not totals:
+            print("Aún no hay escuchas en ese periodo")
+            return
+        
+        if options.sort == "plays":
+            key = lambda item: (-item[1][0], -item[1][1], listing.numeric_key(item[0]))
+        else:
+            key = lambda item: (-item[1][1], -item[1][0], listing.numeric_key(item[0]))
+        page, total, pages = listing.paginate(totals, options, key)
+        lines = (f"{i}. {self.get_song_title(song_id)} (ID: {song_id}) - {plays} escuchas, "
+                 f"{UserStats._format_seconds(int(seconds))}"
+                 for i, (song_id, (plays, seconds)) in page)
+        print(f"\nMás escuchadas ({period}):")
+        listing.print_page(lines, options, total, pages, self._page_command(f"top {period}", options, "plays"))
     
     def rename_song(self, song_id, *new_name_parts):
         """Renombra una canción cambiando su título en los metadatos"""
@@ -1512,8 +2621,7 @@ available commands:
                 return False
             
             # Verificar que la canción existe
-            song_path = os.path.join(self.songs_dir, f"{song_id}.mp3")
-            if not os.path.exists(song_path):
+            if not self.library.has_song(song_id):
                 print(f"Error: La canción con ID {song_id} no existe")
                 return False
             
@@ -1554,24 +2662,21 @@ available commands:
                 return False
             
             # Verificar que la lista existe
-            playlist_path = os.path.join(self.lists_dir, f"{playlist_id}.json")
-            if not os.path.exists(playlist_path):
+            if not self.library.has_playlist(playlist_id):
                 print(f"Error: La lista con ID {playlist_id} no existe")
                 return False
             
             # Cargar la lista
-            with open(playlist_path, 'r', encoding='utf-8') as f:
-                playlist = json.load(f)
+            playlist = self._load_playlist(playlist_id)
             
             # Obtener el nombre anterior
-            old_name = playlist.get('name', 'Sin nombre')
+            old_name = playlist.name or 'Sin nombre'
             
             # Actualizar el nombre
-            playlist['name'] = new_name
+            playlist.name = new_name
             
             # Guardar la lista actualizada
-            with open(playlist_path, 'w', encoding='utf-8') as f:
-                json.dump(playlist, f, ensure_ascii=False, indent=2)
+            self._save_playlist(playlist_id, playlist)
             
             print(f"✓ Lista renombrada exitosamente:")
             print(f"  Antes: {old_name}")
@@ -1588,7 +2693,16 @@ available commands:
             return False
 
 if __name__ == "__main__":
-    player = MusicPlayer()
+    try:
+        logs.setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_FILE or None)
+    except (ValueError, OSError) as e:
+        print(f"⚠ Advertencia: configuración de registro no válida ({e}); se usa la consola")
+    try:
+        output = open_output(AUDIO_OUTPUT) if AUDIO_OUTPUT else None
+    except ValueError as e:
+        print(f"⚠ Advertencia: AUDIO_OUTPUT no válido ({e}); se usan los altavoces")
+        output = None
+    player = MusicPlayer(output=output)
     print("PyMusic - A local music reproducer, for free")
     print("Write 'Help' too see ALL available commands")
     print("Tip: copy any URL (youtube or spotify) and write Paste to process it and download that song automatically")
@@ -1625,3 +2739,12 @@ if __name__ == "__main__":
             break
         except Exception as e:
             print(f"Error: {e}")
+    
+    # Detener las zonas y guardar lo que quede pendiente del historial de reproducciones
+    player.zones.stop_all()
+    if output is not None:
+        if player.is_playing:
+            player.stop_playback()
+        output.close()
+    player.save_history()
+    player.history.close()
@@ -0,0 +1,254 @@
+"""
+Métricas de PyMusic en formato de exposición de Prometheus
+
+Contadores, medidores e histogramas mínimos (sin dependencias) que se
+actualizan desde los caminos calientes: cada actualización es una suma bajo un
+cerrojo propio de la serie, sin formatear nada. El texto solo se genera cuando
+alguien pide /metrics al servidor de Streamlabs. El estado de la reproducción
+(¿suena?, posición, volumen...) y los tiempos por comando no se copian a
+ninguna métrica: se leen del reproductor en el momento de la petición.
+"""
+import bisect
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Cambios de canción (carga del archivo + arranque del mixer): de milisegundos a segundos
+TRANSITION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Manejadores de eventos de las integraciones: deberían ser casi instantáneos
+HANDLER_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+Sample = Tuple[str, Dict[str, str], float]  # (nombre, etiquetas, valor)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f"{name}{{{label_text}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+def render_family(name: str, kind: str, help_text: str, samples: Iterable[Sample]) -> str:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(_format_sample(*sample) for sample in samples)
+    return "\n".join(lines) + "\n"
+
+
+class _Value:
+    """Serie de un contador o medidor"""
+
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def get(self) -> float:
+        return self._value
+
+
+class _HistogramValue:
+    """Serie de un histograma: cuentas por intervalo (no acumuladas), suma y total"""
+
+    __slots__ = ("_buckets", "_counts", "_sum", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._children_lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values):
+        """Serie de unas etiquetas concretas (se crea en el primer uso y después se reutiliza)"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+            with self._children_lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self):
+        with self._children_lock:
+            return sorted(self._children.items())
+
+    def samples(self) -> List[Sample]:
+        return [(self.name, dict(zip(self.labelnames, key)), child.get()) for key, child in self._items()]
+
+    def render(self) -> str:
+        return render_family(self.name, self.kind, self.help, self.samples())
+
+
+class Counter(_Metric):
+    """Contador que solo crece (los nombres acaban en _total)"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    """Valor que sube y baja"""
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._children[()].dec(amount)
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+
+class Histogram(_Metric):
+    """Distribución de duraciones (en segundos) por intervalos"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = TRANSITION_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        for key, child in self._items():
+            labels = dict(zip(self.labelnames, key))
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"La métrica {metric.name} ya está registrada")
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
+
+TRACK_TRANSITION_SECONDS = Histogram(
+    "pymusic_track_transition_seconds", "Time from leaving a song to the next one playing")
+DOWNLOAD_QUEUE_DEPTH = Gauge(
+    "pymusic_download_queue_depth", "Tracks waiting to be downloaded")
+DOWNLOAD_ATTEMPTS = Counter(
+    "pymusic_download_attempts_total", "Download attempts by yt-dlp strategy and result", ("strategy", "result"))
+EVENT_HANDLER_SECONDS = Histogram(
+    "pymusic_event_handler_seconds", "Integration event handler latency", ("event",), buckets=HANDLER_BUCKETS)
+EVENT_HANDLER_ERRORS = Counter(
+    "pymusic_event_handler_errors_total", "Integration event handlers that raised", ("event",))
+HTTP_REQUESTS = Counter(
+    "pymusic_http_requests_total", "HTTP requests served by the Streamlabs server", ("path", "code"))
+
+
+def player_families(player) -> str:
+    """Estado del reproductor y tiempos por comando, leídos en el momento de la petición"""
+    playing = bool(player.is_playing)
+    text = [
+        render_family("pymusic_playing", "gauge", "1 while a song is playing (even if paused)",
+                      [("pymusic_playing", {}, int(playing))]),
+        render_family("pymusic_paused", "gauge", "1 while playback is paused",
+                      [("pymusic_paused", {}, int(bool(player.is_paused)))]),
+        render_family("pymusic_volume", "gauge", "Player volume (0.0 to 3.0)",
+                      [("pymusic_volume", {}, float(player.volume))]),
+        render_family("pymusic_song_position_seconds", "gauge", "Position in the current song",
+                      [("pymusic_song_position_seconds", {}, round(player.clock.position, 3) if playing else 0)]),
+        render_family("pymusic_song_duration_seconds", "gauge", "Duration of the current song",
+                      [("pymusic_song_duration_seconds", {}, player.current_song_duration or 0)]),
+        render_family("pymusic_playlist_length", "gauge", "Songs in the playlist being played",
+                      [("pymusic_playlist_length", {}, len(player.current_playlist or ()))]),
+        render_family("pymusic_downloading", "gauge", "1 while a download is running",
+                      [("pymusic_downloading", {}, int(bool(player.downloading)))]),
+    ]
+    profiler = getattr(player, "profiler", None)
+    if profiler is not None:
+        timings = sorted(profiler.get_stats().items())
+        text.append(render_family("pymusic_command_calls_total", "counter", "Commands run this session",
+                                  [("pymusic_command_calls_total", {"command": name}, entry["calls"])
+                                   for name, entry in timings]))
+        text.append(render_family("pymusic_command_seconds_total", "counter", "Wall time spent in each command",
+                                  [("pymusic_command_seconds_total", {"command": name}, entry["total_ms"] / 1000)
+                                   for name, entry in timings]))
+    return "".join(text)
+
+
+def exposition(player=None, registry: Optional[Registry] = None) -> str:
+    """Texto completo para /metrics"""
+    text = (registry or REGISTRY).render()
+    if player is not None:
+        text += player_families(player)
+    return text
@@ -0,0 +1,298 @@
+"""
+Exportación de una lista como una mezcla continua (un solo archivo o flujo)
+
+Las canciones se decodifican en paralelo (un proceso ffmpeg por canción, con
+la ganancia de normalización aplicada por el filtro volume) y su PCM se
+escribe en orden por la entrada estándar de un único ffmpeg que codifica la
+mezcla. No se escribe ningún archivo intermedio ni se guarda ninguna canción
+entera: el PCM se lee a trozos de CHUNK_BYTES y cada canción que se decodifica
+por adelantado retiene como mucho PREFETCH_CHUNKS trozos (unos 8 MB, 47 s de
+audio); cuando se llenan, su ffmpeg se queda esperando. La memoria queda
+acotada por workers * PREFETCH_CHUNKS * CHUNK_BYTES más el doble del fundido,
+sea cual sea la duración de las canciones.
+
+Con fundido, los últimos N segundos de cada canción se guardan hasta que
+llega la siguiente y se mezclan con sus primeros N segundos (rampa lineal),
+igual que el fundido en vivo de crossfade.py.
+"""
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from logs import get_logger
+
+log = get_logger("mix")
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+SAMPLE_BYTES = 2  # s16le
+CHUNK_BYTES = 256 * 1024
+PREFETCH_CHUNKS = 32  # por canción adelantada: 8 MB, unos 47 s de PCM
+DEFAULT_WORKERS = 4  # decodificaciones simultáneas si no se indica --workers
+
+# (song_id, ruta del MP3, ganancia en dB o None); con ganancias positivas el PCM s16 puede saturar
+MixTrack = Tuple[str, str, Optional[float]]
+
+
+def _decoder_command(path: str, gain_db: Optional[float], frequency: int, channels: int) -> List[str]:
+    """ffmpeg que decodifica path a PCM s16le por la salida estándar, aplicando gain_db"""
+    command = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-i', path]
+    if gain_db:
+        command += ['-af', f"volume={gain_db:.2f}dB"]
+    command += ['-f', 's16le', '-acodec', 'pcm_s16le', '-ar', str(frequency), '-ac', str(channels), '-']
+    return command
+
+
+def decode_track(path: str, gain_db: Optional[float] = None, frequency: int = SAMPLE_RATE,
+                 channels: int = CHANNELS) -> Optional[bytes]:
+    """Decodifica una canción entera a PCM s16le con ffmpeg, aplicando gain_db; None si falla"""
+    try:
+        result = subprocess.run(_decoder_command(path, gain_db, frequency, channels),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return None
+    return result.stdout or None
+
+
+class _TrackStream:
+    """
+    PCM de una canción leído a trozos en un hilo propio
+
+    El hilo deja como mucho PREFETCH_CHUNKS trozos en la cola; con la cola
+    llena deja de leer y ffmpeg se bloquea al escribir en la tubería.
+    """
+
+    _END = object()
+
+    def __init__(self, path: str, gain_db: Optional[float], frequency: int, channels: int):
+        self.failed = False
+        self._command = _decoder_command(path, gain_db, frequency, channels)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=PREFETCH_CHUNKS)
+        self._closed = threading.Event()
+        self._process: Optional[subprocess.Popen] = None
+        self._thread = threading.Thread(target=self._run, name="mix-decoder", daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        ok = False
+        try:
+            self._process = subprocess.Popen(self._command, stdin=subprocess.DEVNULL,
+                                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            if self._closed.is_set():
+                self._process.kill()
+            with self._process.stdout:
+                while True:
+                    chunk = self._process.stdout.read(CHUNK_BYTES)
+                    if not chunk or not self._put(chunk):
+                        break
+            ok = self._process.wait() == 0
+        except OSError:
+            pass
+        finally:
+            # Siempre se avisa del final: chunks() no puede quedarse esperando
+            self._put(self._END if ok else None)
+
+    def chunks(self) -> Iterator[bytes]:
+        """Trozos de PCM en orden; al terminar, failed indica si ffmpeg falló"""
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            if item is None:
+                self.failed = True
+                return
+            yield item
+
+    def close(self):
+        """Para el decodificador (si sigue vivo) y su hilo"""
+        self._closed.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+        self._thread.join()
+
+
+def crossfade_pcm(tail: bytes, head: bytes, channels: int = CHANNELS) -> bytes:
+    """Mezcla tail (se apaga) con head (entra) en rampas lineales; mismo tamaño, PCM s16le"""
+    frames = min(len(tail), len(head)) // (channels * SAMPLE_BYTES)
+    size = frames * channels * SAMPLE_BYTES
+    if frames == 0:
+        return b""
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        out = np.frombuffer(tail[:size], dtype="<i2").reshape(frames, channels).astype(np.float32)
+        incoming = np.frombuffer(head[:size], dtype="<i2").reshape(frames, channels).astype(np.float32)
+        ramp = (np.arange(frames, dtype=np.float32) / frames)[:, None]
+        out = out * (1.0 - ramp) + incoming * ramp
+        return np.clip(out, -32768, 32767).astype("<i2").tobytes()
+
+    outgoing, incoming = array("h"), array("h")
+    outgoing.frombytes(tail[:size])
+    incoming.frombytes(head[:size])
+    if sys.byteorder != "little":
+        outgoing.byteswap()
+        incoming.byteswap()
+    mixed = array("h", bytes(size))
+    for i in range(len(mixed)):
+        t = (i // channels) / frames
+        mixed[i] = max(-32768, min(32767, int(outgoing[i] * (1.0 - t) + incoming[i] * t)))
+    if sys.byteorder != "little":
+        mixed.byteswap()
+    return mixed.tobytes()
+
+
+def _open_encoder(target: str, frequency: int, channels: int, bitrate: Optional[str],
+                  fmt: Optional[str]) -> subprocess.Popen:
+    """ffmpeg que lee PCM por la entrada estándar y codifica en target (archivo o URL)"""
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+               '-f', 's16le', '-ar', str(frequency), '-ac', str(channels), '-i', 'pipe:0']
+    if bitrate:
+        command += ['-b:a', bitrate]
+    if fmt:
+        command += ['-f', fmt]
+    command.append(target)
+    return subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def export_mix(tracks: List[MixTrack], target: str, crossfade: float = 0.0, workers: Optional[int] = None,
+               bitrate: Optional[str] = None, fmt: Optional[str] = None,
+               on_track: Optional[Callable[[int, str, bool], None]] = None,
+               frequency: int = SAMPLE_RATE, channels: int = CHANNELS) -> Dict[str, object]:
+    """
+    Codifica tracks, en ese orden, como una sola mezcla en target
+
+    Args:
+        tracks: canciones en orden de reproducción
+        target: archivo de salida (el formato sale de la extensión) o URL que entienda ffmpeg
+        crossfade: segundos de fundido entre canciones (0 para pegarlas sin fundido)
+        workers: decodificaciones simultáneas (por defecto, los núcleos disponibles hasta
+            DEFAULT_WORKERS); cada una retiene como mucho PREFETCH_CHUNKS * CHUNK_BYTES
+        bitrate: tasa de bits del codificador ("192k"); None para la de ffmpeg
+        fmt: formato de salida forzado (-f), p. ej. para un flujo
+        on_track: se llama con (posición, song_id, decodificada) según se escribe cada canción
+
+    Returns:
+        {"tracks", "skipped", "seconds", "elapsed_s"}
+
+    Raises:
+        RuntimeError: si ffmpeg no está disponible o el codificador falla
+    """
+    workers = max(1, workers or min(os.cpu_count() or 2, DEFAULT_WORKERS))
+    frame_bytes = channels * SAMPLE_BYTES
+    window = int(max(0.0, crossfade) * frequency) * frame_bytes
+    started = time.perf_counter()
+    try:
+        encoder = _open_encoder(target, frequency, channels, bitrate, fmt)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg no está disponible")
+
+    written = 0
+    skipped = []
+    tail = None  # cola de la canción anterior pendiente de fundir con la siguiente
+
+    def write(pcm):
+        nonlocal written
+        if pcm:
+            encoder.stdin.write(pcm)
+            written += len(pcm)
+
+    # Como mucho `workers` canciones decodificándose por adelantado, cada una con su cola acotada
+    pending = deque()
+    upcoming = iter(enumerate(tracks))
+
+    def submit():
+        item = next(upcoming, None)
+        if item is not None:
+            _song_id, path, gain_db = item[1]
+            pending.append((item, _TrackStream(path, gain_db, frequency, channels)))
+
+    try:
+        for _ in range(workers):
+            submit()
+
+        while pending:
+            (position, (song_id, _path, _gain)), stream = pending.popleft()
+            submit()
+            try:
+                chunks = stream.chunks()
+                # Basta con 2 * fundido + 1 trama para saber si la canción se funde
+                buffer = bytearray()
+                for chunk in chunks:
+                    buffer += chunk
+                    if len(buffer) > 2 * window:
+                        break
+                if stream.failed or not buffer:
+                    skipped.append(song_id)
+                    log.warning(f"No se pudo decodificar la canción {song_id}: se omite en la mezcla")
+                    if on_track:
+                        on_track(position, song_id, False)
+                    continue
+
+                # Como en vivo: solo hay fundido si la canción dura más del doble del fundido
+                fades = window and len(buffer) > 2 * window
+                if tail is not None:
+                    if fades:
+                        write(crossfade_pcm(tail, bytes(buffer[:window]), channels))
+                        del buffer[:window]
+                    else:
+                        write(tail)
+                    tail = None
+                keep = window if fades else 0
+                for chunk in chunks:
+                    buffer += chunk
+                    # Se escribe todo menos la cola del fundido, en tramas completas
+                    size = len(buffer) - keep
+                    size -= size % frame_bytes
+                    if size > 0:
+                        write(bytes(buffer[:size]))
+                        del buffer[:size]
+                if stream.failed:
+                    log.warning(f"La decodificación de la canción {song_id} falló a medias: se corta ahí")
+                del buffer[len(buffer) - len(buffer) % frame_bytes:]
+                if fades:
+                    tail = bytes(buffer[-window:])
+                    del buffer[-window:]
+                write(bytes(buffer))
+            finally:
+                stream.close()
+            if on_track:
+                on_track(position, song_id, True)
+        write(tail)
+        encoder.stdin.close()
+    except BrokenPipeError:
+        pass
+    except BaseException:
+        encoder.kill()
+        encoder.wait()
+        raise
+    finally:
+        for _item, stream in pending:
+            stream.close()
+    errors = encoder.stderr.read().decode("utf-8", errors="ignore").strip()
+    encoder.stderr.close()
+    if encoder.wait() != 0:
+        raise RuntimeError(f"El codificador falló: {errors or encoder.returncode}")
+
+    return {
+        "tracks": len(tracks) - len(skipped),
+        "skipped": skipped,
+        "seconds": round(written / (frame_bytes * frequency), 1),
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
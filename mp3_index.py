@@ -0,0 +1,136 @@
+"""
+Índice de tramas MP3 para posicionamiento exacto
+
+Recorre las cabeceras de las tramas MPEG de un archivo y guarda el byte en el
+que empieza cada una. Como todas las tramas de un archivo tienen el mismo
+número de muestras, la trama k empieza en k * segundos_por_trama: buscar una
+posición es una división y una lectura desde ese byte, sin decodificar desde
+el principio del archivo. Sirve igual para MP3 CBR y VBR.
+"""
+from array import array
+from typing import Optional, Tuple
+
+# Bitrates en kbps por (versión MPEG 1 o 2/2.5, capa)
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Frecuencias de muestreo por bits de versión (0: MPEG2.5, 2: MPEG2, 3: MPEG1)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def parse_frame_header(data, pos: int) -> Optional[Tuple[int, int, int]]:
+    """
+    Interpreta la cabecera de trama en data[pos:pos + 4]
+
+    Returns:
+        (longitud de la trama en bytes, muestras por trama, frecuencia) o None
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2 = data[pos + 1], data[pos + 2]
+    version_bits = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_idx = (b2 >> 4) & 0x0F
+    rate_idx = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+
+    layer = 4 - layer_bits
+    version = 1 if version_bits == 3 else 2
+    bitrate = _BITRATES[(version, layer)][bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][rate_idx]
+    padding = (b2 >> 1) & 0x01
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and version == 2:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+
+def _skip_id3v2(data) -> int:
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+class Mp3FrameIndex:
+    """Posiciones en bytes de cada trama de audio de un MP3"""
+
+    def __init__(self, offsets: array, seconds_per_frame: float, end_offset: int):
+        self.offsets = offsets
+        self.seconds_per_frame = seconds_per_frame
+        self.end_offset = end_offset
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def duration(self) -> float:
+        return len(self.offsets) * self.seconds_per_frame
+
+    def locate(self, seconds: float) -> Tuple[int, float]:
+        """
+        Busca la trama que contiene el instante indicado
+
+        Returns:
+            (byte donde empieza la trama, instante exacto de esa trama)
+        """
+        if not self.offsets:
+            return 0, 0.0
+        frame = int(max(0.0, seconds) / self.seconds_per_frame)
+        frame = min(frame, len(self.offsets) - 1)
+        return self.offsets[frame], frame * self.seconds_per_frame
+
+    @classmethod
+    def from_bytes(cls, data) -> "Mp3FrameIndex":
+        """Construye el índice recorriendo las cabeceras de trama"""
+        data = memoryview(data)
+        pos = _skip_id3v2(data)
+        end = len(data)
+        # ID3v1 al final del archivo
+        if end >= 128 and data[end - 128:end - 125] == b"TAG":
+            end -= 128
+
+        offsets = array("I")
+        samples = rate = None
+        first = True
+        while pos + 4 <= end:
+            header = parse_frame_header(data, pos)
+            if header is None or header[0] <= 4:
+                # Basura entre tramas: avanzar hasta la siguiente sincronización
+                pos += 1
+                continue
+            length, frame_samples, frame_rate = header
+            if samples is None:
+                samples, rate = frame_samples, frame_rate
+            elif (frame_samples, frame_rate) != (samples, rate):
+                # Falsa sincronización dentro de los datos de audio
+                pos += 1
+                continue
+            # La primera trama puede ser una cabecera Xing/Info/VBRI sin audio
+            if not (first and _is_vbr_header(data, pos, length)):
+                offsets.append(pos)
+            first = False
+            pos += length
+
+        seconds_per_frame = samples / rate if samples else 0.026
+        return cls(offsets, seconds_per_frame, end)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Mp3FrameIndex":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def _is_vbr_header(data, pos: int, length: int) -> bool:
+    frame = bytes(data[pos:pos + min(length, 64)])
+    return b"Xing" in frame or b"Info" in frame or b"VBRI" in frame
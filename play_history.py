@@ -0,0 +1,272 @@
+"""
+Historial de reproducciones
+
+Cada canción que suena se guarda como un evento en un registro de solo-añadir
+(JSON Lines): canción, instante de inicio, segundos escuchados, si se saltó y
+desde qué lista. Los eventos se escriben por lotes (cada FLUSH_EVENTS eventos
+o, con un temporizador, FLUSH_SECONDS después del primero pendiente, y al
+cerrar) para no hacer un fsync por canción.
+
+Junto al registro se mantienen resúmenes ya agregados por canción, por día y
+por lista. Las consultas ("top 50 de este mes", "¿se ha escuchado alguna
+vez?") leen los resúmenes y nunca recorren los eventos. Los resúmenes se
+guardan con el desplazamiento del registro hasta el que llegan; al arrancar
+solo se reprocesan los eventos posteriores (por ejemplo, tras un cierre
+inesperado). Como se pueden rehacer desde el registro, los resúmenes solo se
+reescriben cada ROLLUPS_SECONDS y al cerrar (close()).
+"""
+import heapq
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+import profiling
+from storage import append_text, atomic_write_json, read_json
+
+FLUSH_EVENTS = 20
+FLUSH_SECONDS = 60.0
+ROLLUPS_SECONDS = 3600.0
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def day_of(when: float) -> str:
+    """Día local de un instante ('2024-06-10')"""
+    return time.strftime(DAY_FORMAT, time.localtime(when))
+
+
+def _empty_rollups() -> dict:
+    return {
+        "offset": 0,  # bytes del registro ya incluidos en los resúmenes
+        "songs": {},  # song_id -> {"plays", "seconds", "skips", "last"}
+        "days": {},  # día -> {"plays", "seconds", "songs": {song_id: [plays, seconds]}}
+        "playlists": {},  # playlist_id -> {"name", "plays", "seconds"}
+    }
+
+
+class PlayHistory:
+    """
+    Registro de reproducciones con resúmenes agregados
+
+    Una reproducción saltada suma segundos y un salto, pero no cuenta como
+    escucha en "plays".
+
+    Args:
+        path: archivo JSON Lines del registro (se crea al primer uso)
+        rollups_path: archivo JSON de los resúmenes (por defecto, junto al registro)
+    """
+
+    def __init__(self, path: str, rollups_path: Optional[str] = None,
+                 flush_events: int = FLUSH_EVENTS, flush_seconds: float = FLUSH_SECONDS,
+                 rollups_seconds: float = ROLLUPS_SECONDS):
+        self.path = path
+        self.rollups_path = rollups_path or os.path.splitext(path)[0] + "_rollups.json"
+        self.flush_events = flush_events
+        self.flush_seconds = flush_seconds
+        self.rollups_seconds = rollups_seconds
+        self._lock = threading.RLock()
+        self._rollups = None
+        self._pending: List[str] = []  # líneas aún sin escribir
+        self._timer: Optional[threading.Timer] = None  # escribe lo pendiente aunque no llegue otro evento
+        self._rollups_dirty = False  # hay eventos en el registro que los resúmenes guardados no incluyen
+        self._rollups_saved = time.monotonic()
+        self.version = 0  # cambia con cada evento registrado
+
+    # ========== Carga ==========
+
+    def _ensure_loaded(self):
+        if self._rollups is not None:
+            return
+        rollups = read_json(self.rollups_path, None) or _empty_rollups()
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if rollups.get("offset", 0) > size:
+            # El registro se ha sustituido o recortado: se rehacen los resúmenes
+            rollups = _empty_rollups()
+        self._rollups = rollups
+        if rollups["offset"] < size:
+            self._replay(rollups["offset"])
+
+    def _replay(self, offset: int):
+        """Aplica a los resúmenes los eventos del registro a partir de offset"""
+        profiling.count("file_reads")
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                # Una línea sin salto final es una escritura interrumpida
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    profiling.count("json_loads")
+                    event = json.loads(line)
+                    self._apply(str(event["song"]), float(event["t"]), float(event.get("secs", 0)),
+                                bool(event.get("skip", False)), event.get("list"), event.get("list_name"))
+                except (ValueError, KeyError, TypeError):
+                    continue
+        self._rollups["offset"] = offset
+        self._save_rollups()
+
+    def _save_rollups(self):
+        atomic_write_json(self.rollups_path, self._rollups, ensure_ascii=False)
+        self._rollups_dirty = False
+        self._rollups_saved = time.monotonic()
+
+    def _apply(self, song_id: str, when: float, seconds: float, skipped: bool,
+               playlist_id: Optional[str], playlist_name: Optional[str]):
+        play = 0 if skipped else 1
+        rollups = self._rollups
+        song = rollups["songs"].setdefault(song_id, {"plays": 0, "seconds": 0.0, "skips": 0, "last": 0.0})
+        song["plays"] += play
+        song["seconds"] = round(song["seconds"] + seconds, 1)
+        song["skips"] += 1 - play
+        song["last"] = max(song["last"], when)
+
+        day = rollups["days"].setdefault(day_of(when), {"plays": 0, "seconds": 0.0, "songs": {}})
+        day["plays"] += play
+        day["seconds"] = round(day["seconds"] + seconds, 1)
+        day_song = day["songs"].setdefault(song_id, [0, 0.0])
+        day_song[0] += play
+        day_song[1] = round(day_song[1] + seconds, 1)
+
+        if playlist_id:
+            playlist = rollups["playlists"].setdefault(playlist_id, {"name": playlist_name, "plays": 0, "seconds": 0.0})
+            playlist["name"] = playlist_name or playlist["name"]
+            playlist["plays"] += play
+            playlist["seconds"] = round(playlist["seconds"] + seconds, 1)
+
+    # ========== Escritura ==========
+
+    def record(self, song_id: str, seconds: float = 0.0, skipped: bool = False,
+               playlist_id: Optional[str] = None, playlist_name: Optional[str] = None,
+               when: Optional[float] = None):
+        """
+        Registra una reproducción terminada
+
+        Args:
+            seconds: tiempo escuchado de verdad
+            when: instante en que empezó a sonar (por defecto, ahora)
+        """
+        when = time.time() if when is None else when
+        event = {"song": song_id, "t": round(when, 3), "secs": round(seconds, 1)}
+        if skipped:
+            event["skip"] = True
+        if playlist_id:
+            event["list"] = playlist_id
+            event["list_name"] = playlist_name
+        with self._lock:
+            self._ensure_loaded()
+            self._apply(song_id, when, seconds, skipped, playlist_id, playlist_name)
+            if not self._pending:
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            self._pending.append(json.dumps(event, ensure_ascii=False) + "\n")
+            self.version += 1
+            if len(self._pending) >= self.flush_events:
+                self.flush()
+
+    def flush(self, save_rollups: bool = False):
+        """
+        Escribe los eventos pendientes (una sola escritura)
+
+        Los resúmenes se guardan si pasaron rollups_seconds desde la última
+        vez o si save_rollups es verdadero.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending:
+                append_text(self.path, "".join(self._pending))
+                self._pending = []
+                self._rollups["offset"] = os.path.getsize(self.path)
+                self._rollups_dirty = True
+            if self._rollups_dirty and \
+                    (save_rollups or time.monotonic() - self._rollups_saved >= self.rollups_seconds):
+                self._save_rollups()
+
+    def close(self):
+        """Escribe lo pendiente y los resúmenes (al salir)"""
+        self.flush(save_rollups=True)
+
+    def forget(self, song_id: str):
+        """Olvida una canción borrada (el registro en disco no se toca)"""
+        with self._lock:
+            self._ensure_loaded()
+            self._rollups["songs"].pop(song_id, None)
+            for day in self._rollups["days"].values():
+                day["songs"].pop(song_id, None)
+            # Se guardan ya (un reprocesado del registro la volvería a sumar), pero sin
+            # incluir eventos que aún no están en el registro
+            self._rollups_dirty = True
+            self.flush(save_rollups=True)
+            self.version += 1
+
+    # ========== Consultas ==========
+
+    def plays(self, song_id: str) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self._rollups["songs"].get(song_id, {}).get("plays", 0)
+
+    def last_played(self, song_id: str) -> Optional[float]:
+        with self._lock:
+            self._ensure_loaded()
+            return self._rollups["songs"].get(song_id, {}).get("last")
+
+    def played_ids(self) -> Set[str]:
+        """Canciones que han sonado alguna vez (aunque se saltaran)"""
+        with self._lock:
+            self._ensure_loaded()
+            return set(self._rollups["songs"])
+
+    def song_totals(self, since: Optional[float] = None) -> Dict[str, Tuple[int, float]]:
+        """
+        Escuchas y segundos por canción
+
+        Args:
+            since: desde el día de este instante (incluido); None para todo el historial
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if since is None:
+                return {song_id: (song["plays"], song["seconds"]) for song_id, song in self._rollups["songs"].items()}
+            first_day = day_of(since)
+            totals: Dict[str, List] = {}
+            for day, summary in self._rollups["days"].items():
+                if day < first_day:
+                    continue
+                for song_id, (plays, seconds) in summary["songs"].items():
+                    total = totals.setdefault(song_id, [0, 0.0])
+                    total[0] += plays
+                    total[1] += seconds
+            return {song_id: (plays, round(seconds, 1)) for song_id, (plays, seconds) in totals.items()}
+
+    def counts_since(self, since: float) -> Counter:
+        """Escuchas por canción desde el día de since (solo canciones con alguna escucha)"""
+        return Counter({song_id: plays for song_id, (plays, _) in self.song_totals(since).items() if plays})
+
+    def top_songs(self, since: Optional[float] = None, limit: int = 50) -> List[Tuple[str, int, float]]:
+        """[(song_id, escuchas, segundos)] de las canciones más escuchadas (las solo saltadas no cuentan)"""
+        totals = [item for item in self.song_totals(since).items() if item[1][0]]
+        ranked = heapq.nlargest(limit, totals, key=lambda item: (item[1][0], item[1][1]))
+        return [(song_id, plays, seconds) for song_id, (plays, seconds) in ranked]
+
+    def totals(self, since: Optional[float] = None) -> Dict[str, float]:
+        """{"plays", "seconds"} en total o desde el día de since"""
+        with self._lock:
+            self._ensure_loaded()
+            first_day = day_of(since) if since is not None else ""
+            days = [summary for day, summary in self._rollups["days"].items() if day >= first_day]
+            return {"plays": sum(d["plays"] for d in days), "seconds": round(sum(d["seconds"] for d in days), 1)}
+
+    def top_playlists(self, limit: int = 10) -> List[Tuple[str, dict]]:
+        """[(playlist_id, {"name", "plays", "seconds"})] de las listas más escuchadas"""
+        with self._lock:
+            self._ensure_loaded()
+            return heapq.nlargest(limit, self._rollups["playlists"].items(), key=lambda item: item[1]["plays"])
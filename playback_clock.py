@@ -0,0 +1,99 @@
+"""
+Reloj de reproducción
+
+pygame.mixer.music.get_pos() cuenta el tiempo desde el último play(), no la
+posición dentro de la canción, así que deja de ser válido tras una búsqueda o
+un reinicio. Este reloj lleva la posición real a partir de un reloj monótono y
+se actualiza en cada play, pausa, reanudación y búsqueda. Lleva además el
+tiempo realmente escuchado desde el último play, que no cambia con las
+búsquedas (es el que se guarda en el historial).
+"""
+import threading
+import time
+from typing import Callable
+
+
+class PlaybackClock:
+    """Posición de reproducción en segundos, consistente entre pausas y búsquedas"""
+
+    def __init__(self, time_source: Callable[[], float] = time.monotonic):
+        self._now = time_source
+        self._lock = threading.Lock()
+        self._base = 0.0
+        self._started_at = None  # None si está parado o en pausa
+        self._listened = 0.0  # tiempo sonado antes del tramo actual
+        self.running = False
+
+    def start(self, position: float = 0.0):
+        """La canción empieza a sonar desde position"""
+        with self._lock:
+            self._base = position
+            self._started_at = self._now()
+            self._listened = 0.0
+            self.running = True
+
+    def pause(self):
+        with self._lock:
+            if self._started_at is not None:
+                elapsed = self._now() - self._started_at
+                self._base += elapsed
+                self._listened += elapsed
+                self._started_at = None
+
+    def resume(self):
+        with self._lock:
+            if self.running and self._started_at is None:
+                self._started_at = self._now()
+
+    def seek(self, position: float):
+        """Salta a position manteniendo el estado de pausa"""
+        with self._lock:
+            self._base = max(0.0, position)
+            if self._started_at is not None:
+                now = self._now()
+                self._listened += now - self._started_at
+                self._started_at = now
+
+    def stop(self):
+        with self._lock:
+            self._base = 0.0
+            self._started_at = None
+            self._listened = 0.0
+            self.running = False
+
+    @property
+    def paused(self) -> bool:
+        return self.running and self._started_at is None
+
+    @property
+    def position(self) -> float:
+        """Posición actual en segundos"""
+        with self._lock:
+            if self._started_at is None:
+                return self._base
+            return self._base + (self._now() - self._started_at)
+
+    @property
+    def listened(self) -> float:
+        """Segundos que ha sonado la canción desde el último start() (sin contar pausas ni saltos)"""
+        with self._lock:
+            if self._started_at is None:
+                return self._listened
+            return self._listened + (self._now() - self._started_at)
+
+
+def scaled_time(speed: float, time_source: Callable[[], float] = time.monotonic) -> Callable[[], float]:
+    """
+    Reloj que avanza speed veces más rápido que time_source
+
+    Con una salida sin sonido (audio_output.NullOutput) permite "reproducir"
+    una lista entera en segundos: el reloj de la canción llega al final antes.
+    """
+    if speed <= 0:
+        raise ValueError(f"La velocidad debe ser positiva: {speed}")
+    origin = time_source()
+
+    def now() -> float:
+        return origin + (time_source() - origin) * speed
+
+    return now
@@ -0,0 +1,160 @@
+"""
+Formatos de archivo de las listas de reproducción
+
+v1 (<id>.json): documento JSON completo {"name": ..., "songs": [...]}. Cada
+cambio reescribe el archivo entero.
+
+v2 (<id>.list): una línea de cabecera JSON y después un registro de
+operaciones, una por línea:
+
+    {"format": "pymusic-playlist", "version": 2, "name": "chill"}
+    +12
+    +7
+    -12
+
+"+id" añade la canción al final y "-id" quita todas sus apariciones
+anteriores. Añadir o quitar canciones solo escribe las líneas nuevas al final
+del archivo; cuando el registro acumula muchas más operaciones que canciones,
+se compacta reescribiéndolo con una línea "+id" por canción. Una última línea
+sin salto de línea (escritura interrumpida) se ignora.
+
+Los lectores aceptan las dos versiones; las escrituras completas siempre
+generan v2. convert_directory() pasa todas las listas de una carpeta a la
+versión indicada (también desde la línea de comandos:
+python playlist_format.py Lists --to 2).
+"""
+import argparse
+import json
+import os
+from typing import Dict, Iterable, List, Tuple
+
+import profiling
+from storage import append_text, atomic_write_json, atomic_write_text, read_json
+
+V1_EXTENSION = ".json"
+V2_EXTENSION = ".list"
+EXTENSIONS = (V2_EXTENSION, V1_EXTENSION)  # En orden de preferencia
+FORMAT_NAME = "pymusic-playlist"
+
+# Se compacta cuando hay más de max(COMPACT_MIN_OPS, 2 * canciones) operaciones
+COMPACT_MIN_OPS = 256
+
+
+def playlist_id_of(file_name: str) -> str:
+    """'12L.list' -> '12L'"""
+    return os.path.splitext(file_name)[0]
+
+
+def parse_v2(text: str) -> Tuple[Dict, int]:
+    """
+    Interpreta un archivo v2
+
+    Returns:
+        ({'name': ..., 'songs': [...]}, número de operaciones del registro)
+    """
+    lines = text.split("\n")
+    # La última "línea" es lo que va detrás del último salto: vacía o incompleta
+    lines.pop()
+    if not lines:
+        raise ValueError("lista v2 sin cabecera")
+    header = json.loads(lines[0])
+    if header.get("format") != FORMAT_NAME or header.get("version") != 2:
+        raise ValueError("cabecera de lista v2 no válida")
+
+    entries: List[str] = []
+    cut: Dict[str, int] = {}  # song_id -> nº de entradas cuando se quitó por última vez
+    ops = 0
+    for line in lines[1:]:
+        if not line:
+            continue
+        op, song_id = line[0], line[1:]
+        if op == "+":
+            entries.append(song_id)
+        elif op == "-":
+            cut[song_id] = len(entries)
+        else:
+            continue
+        ops += 1
+    songs = [song_id for i, song_id in enumerate(entries) if i >= cut.get(song_id, 0)]
+    return {"name": header.get("name", ""), "songs": songs}, ops
+
+
+def render_v2(playlist: Dict) -> str:
+    header = json.dumps({"format": FORMAT_NAME, "version": 2, "name": playlist["name"]}, ensure_ascii=False)
+    return header + "\n" + "".join(f"+{song_id}\n" for song_id in playlist["songs"])
+
+
+def read(path: str) -> Tuple[Dict, int]:
+    """
+    Lee una lista en cualquier versión (según la extensión)
+
+    Returns:
+        (lista, operaciones pendientes de compactar; 0 en v1)
+    """
+    if path.endswith(V2_EXTENSION):
+        with open(path, "r", encoding="utf-8") as f:
+            profiling.count("file_reads")
+            profiling.count("json_loads")  # la cabecera
+            return parse_v2(f.read())
+    playlist = read_json(path)
+    if playlist is None:
+        raise FileNotFoundError(path)
+    return playlist, 0
+
+
+def write_v2(path: str, playlist: Dict):
+    atomic_write_text(path, render_v2(playlist))
+
+
+def write_v1(path: str, playlist: Dict):
+    atomic_write_json(path, playlist, ensure_ascii=False, indent=2)
+
+
+def append_ops(path: str, added: Iterable[str] = (), removed: Iterable[str] = ()) -> int:
+    """Añade operaciones al registro de una lista v2; devuelve cuántas se escribieron"""
+    lines = [f"-{song_id}\n" for song_id in removed] + [f"+{song_id}\n" for song_id in added]
+    if lines:
+        append_text(path, "".join(lines))
+    return len(lines)
+
+
+def needs_compaction(ops: int, song_count: int) -> bool:
+    return ops > max(COMPACT_MIN_OPS, 2 * song_count)
+
+
+def convert_directory(lists_dir: str, version: int = 2) -> List[str]:
+    """
+    Convierte todas las listas de una carpeta a la versión indicada (1 o 2)
+
+    Returns:
+        IDs de las listas convertidas
+    """
+    target = V2_EXTENSION if version == 2 else V1_EXTENSION
+    converted = []
+    names = sorted(n for n in os.listdir(lists_dir) if n.endswith(EXTENSIONS))
+    for playlist_id in dict.fromkeys(playlist_id_of(n) for n in names):
+        sources = [os.path.join(lists_dir, playlist_id + ext) for ext in EXTENSIONS]
+        sources = [p for p in sources if os.path.exists(p)]
+        if sources == [os.path.join(lists_dir, playlist_id + target)]:
+            continue
+        playlist, _ = read(sources[0])
+        destination = os.path.join(lists_dir, playlist_id + target)
+        (write_v2 if version == 2 else write_v1)(destination, playlist)
+        for source in sources:
+            if source != destination:
+                os.remove(source)
+        converted.append(playlist_id)
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte las listas de PyMusic entre los formatos v1 y v2")
+    parser.add_argument("lists_dir", nargs="?", default="Lists", help="carpeta de listas (por defecto Lists)")
+    parser.add_argument("--to", type=int, choices=(1, 2), default=2, help="versión de destino")
+    args = parser.parse_args()
+    converted = convert_directory(args.lists_dir, args.to)
+    print(f"{len(converted)} listas convertidas a v{args.to}")
+
+
+if __name__ == "__main__":
+    main()
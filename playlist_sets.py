@@ -0,0 +1,80 @@
+"""
+Operaciones de conjunto sobre listas de reproducción
+
+Una lista es una secuencia ordenada de IDs de canción. Las operaciones la
+tratan como un conjunto ordenado: la pertenencia se comprueba con conjuntos
+(hash) en lugar de recorrer la lista, así que unir o cruzar listas de decenas
+de miles de canciones es lineal en el tamaño total. El orden de la lista
+original se conserva y las canciones nuevas se añaden al final en el orden en
+que aparecen.
+
+Cada operación devuelve la lista resultante y los cambios como canciones
+añadidas y quitadas, que es justo lo que necesita el registro de las listas v2
+(ver playlist_format).
+"""
+from typing import Iterable, List, Sequence, Tuple
+
+# Acciones que reciben IDs de canciones y acciones que reciben IDs de otras listas
+SONG_ACTIONS = ("add", "remove")
+LIST_ACTIONS = ("union", "intersect", "diff")
+ACTIONS = SONG_ACTIONS + LIST_ACTIONS
+
+Change = Tuple[List[str], List[str], List[str]]  # (canciones, añadidas, quitadas)
+
+
+def add(songs: Sequence[str], new: Iterable[str]) -> Change:
+    """Añade al final las canciones que no estén ya en la lista"""
+    seen = set(songs)
+    added = []
+    for song_id in new:
+        if song_id not in seen:
+            seen.add(song_id)
+            added.append(song_id)
+    return list(songs) + added, added, []
+
+
+def remove(songs: Sequence[str], gone: Iterable[str]) -> Change:
+    """Quita todas las apariciones de las canciones indicadas"""
+    gone = set(gone)
+    kept = [song_id for song_id in songs if song_id not in gone]
+    removed = list(dict.fromkeys(song_id for song_id in songs if song_id in gone))
+    return kept, [], removed
+
+
+def union(songs: Sequence[str], *others: Sequence[str]) -> Change:
+    """Añade las canciones de las otras listas que falten"""
+    return add(songs, (song_id for other in others for song_id in other))
+
+
+def intersect(songs: Sequence[str], *others: Sequence[str]) -> Change:
+    """Deja solo las canciones que están también en todas las otras listas"""
+    common = set(songs)
+    for other in others:
+        common.intersection_update(other)
+    return remove(songs, (song_id for song_id in songs if song_id not in common))
+
+
+def diff(songs: Sequence[str], *others: Sequence[str]) -> Change:
+    """Quita las canciones que aparecen en alguna de las otras listas"""
+    return remove(songs, (song_id for other in others for song_id in other))
+
+
+def apply(action: str, songs: Sequence[str], items: Sequence) -> Change:
+    """
+    Aplica una acción por nombre
+
+    Args:
+        action: una de ACTIONS
+        items: IDs de canciones (add/remove) o listas de canciones (union/intersect/diff)
+    """
+    if action == "add":
+        return add(songs, items)
+    if action == "remove":
+        return remove(songs, items)
+    if action == "union":
+        return union(songs, *items)
+    if action == "intersect":
+        return intersect(songs, *items)
+    if action == "diff":
+        return diff(songs, *items)
+    raise ValueError(f"Acción desconocida: {action}")
@@ -0,0 +1,249 @@
+"""
+Medición de los comandos
+
+Cada comando que pasa por process_command se mide con CommandProfiler: tiempo
+real, lecturas y escrituras de archivos, bytes escritos y número de JSON
+interpretados. Las lecturas y escrituras se cuentan en la capa de persistencia
+(storage, playlist_format, play_history...) llamando a count(); si el sistema
+expone /proc/self/io también se anotan los bytes que llegaron de verdad al
+disco. Los contadores son globales, así que lo que hagan a la vez los hilos de
+fondo (análisis de audio, vigilante de la biblioteca) se suma al comando en
+curso.
+
+El comando `profile <comando>` ejecuta un comando bajo cProfile y muestra el
+informe ordenado o lo guarda como .pstats (para snakeviz, pstats...).
+
+El comando `mem` audita la memoria con tracemalloc (MemoryAudit): qué líneas
+tienen más memoria reservada y cuánto ha crecido cada una desde la última
+instantánea, junto a la memoria residente (RSS) del proceso.
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+COUNTERS = ("json_loads", "file_reads", "file_writes", "bytes_written")
+PROC_IO_PATH = "/proc/self/io"
+PROC_STATUS_PATH = "/proc/self/status"
+SORT_KEYS = ("cumulative", "tottime", "calls")
+
+_counts = dict.fromkeys(COUNTERS, 0)
+_counts_lock = threading.Lock()
+
+
+def count(name: str, amount: int = 1):
+    """Suma amount al contador name (json_loads, file_reads, file_writes, bytes_written)"""
+    with _counts_lock:
+        _counts[name] += amount
+
+
+def snapshot() -> Dict[str, int]:
+    with _counts_lock:
+        return dict(_counts)
+
+
+def _disk_io() -> Optional[Dict[str, int]]:
+    """Bytes leídos y escritos en disco por el proceso (solo Linux); None si no se puede saber"""
+    try:
+        with open(PROC_IO_PATH, "r") as f:
+            fields = dict(line.split(": ", 1) for line in f.read().splitlines() if ": " in line)
+        return {"disk_read_bytes": int(fields["read_bytes"]), "disk_write_bytes": int(fields["write_bytes"])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def rss_bytes() -> Optional[int]:
+    """Memoria residente actual del proceso (solo Linux); None si no se puede saber"""
+    try:
+        with open(PROC_STATUS_PATH, "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+def _size(size: float) -> str:
+    if abs(size) < 1048576:
+        return f"{size / 1024:.1f} KiB"
+    return f"{size / 1048576:.1f} MB"
+
+
+class CommandProfiler:
+    """
+    Tiempos acumulados por comando
+
+    Los alias de un mismo comando (sl/showlist) se agrupan bajo el nombre del
+    método que lo atiende.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, dict] = {}
+        self._has_disk_io = _disk_io() is not None
+
+    @contextmanager
+    def measure(self, name: str):
+        """Mide lo que ocurre dentro del bloque y lo suma a las cifras de name"""
+        counts_before = snapshot()
+        disk_before = _disk_io() if self._has_disk_io else None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            counts_after = snapshot()
+            disk_after = _disk_io() if disk_before else None
+            with self._lock:
+                entry = self._totals.get(name)
+                if entry is None:
+                    entry = self._totals[name] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                                  **dict.fromkeys(COUNTERS, 0)}
+                    if disk_before:
+                        entry.update(disk_read_bytes=0, disk_write_bytes=0)
+                entry["calls"] += 1
+                entry["total_ms"] += elapsed_ms
+                entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+                for key in COUNTERS:
+                    entry[key] += counts_after[key] - counts_before[key]
+                if disk_before and disk_after:
+                    for key in disk_after:
+                        entry[key] += disk_after[key] - disk_before[key]
+
+    def get_stats(self) -> Dict[str, dict]:
+        """{comando: {"calls", "total_ms", "avg_ms", "max_ms", "json_loads", ...}}"""
+        with self._lock:
+            stats = {}
+            for name, entry in self._totals.items():
+                stats[name] = dict(entry, total_ms=round(entry["total_ms"], 2), max_ms=round(entry["max_ms"], 2),
+                                   avg_ms=round(entry["total_ms"] / entry["calls"], 2))
+            return stats
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+    def get_formatted_stats(self, limit: int = 10) -> str:
+        stats = self.get_stats()
+        if not stats:
+            return "Command timings: no commands yet"
+        ranked = sorted(stats.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:limit]
+        lines = ["Command timings (this session)"]
+        for name, entry in ranked:
+            lines.append(f"  {name:24} {entry['calls']:>5}x  avg {entry['avg_ms']:>8.1f} ms  "
+                         f"max {entry['max_ms']:>8.1f} ms  {entry['json_loads']} JSON loads, "
+                         f"{entry['file_reads']} reads, {entry['file_writes']} writes")
+        return "\n".join(lines)
+
+
+def run_profiled(func, sort: str = "cumulative", limit: int = 25, output: Optional[str] = None):
+    """
+    Ejecuta func() bajo cProfile
+
+    Returns:
+        (resultado de func, informe en texto o None si se guardó en output)
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = func()
+    finally:
+        profiler.disable()
+    if output:
+        profiler.dump_stats(output)
+        return result, None
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).strip_dirs().sort_stats(sort).print_stats(limit)
+    return result, report.getvalue()
+
+
+class MemoryAudit:
+    """
+    Instantáneas de tracemalloc para buscar lo que crece en sesiones largas
+
+    start() empieza a trazar y toma la instantánea de referencia; diff()
+    compara con ella y la sustituye, así que llamadas sucesivas muestran el
+    crecimiento de cada intervalo. Trazar tiene coste (memoria y CPU), por eso
+    solo está activo entre start() y stop().
+    """
+
+    # Lo que reserva la propia maquinaria de importación y de tracemalloc no interesa
+    _IGNORED = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self._IGNORED)
+
+    def start(self, frames: int = 1):
+        """Empieza a trazar (frames: profundidad de pila guardada por reserva)"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._previous = self._take()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+    def top(self, limit: int = 10) -> List[Tuple[str, int, int]]:
+        """[(archivo:línea, bytes, reservas)] de las líneas con más memoria reservada ahora"""
+        stats = self._take().statistics("lineno")[:limit]
+        return [(self._where(stat.traceback), stat.size, stat.count) for stat in stats]
+
+    def diff(self, limit: int = 10) -> List[Tuple[str, int, int]]:
+        """[(archivo:línea, bytes, diferencia de bytes)] desde la instantánea anterior, que pasa a ser esta"""
+        with self._lock:
+            snapshot = self._take()
+            previous, self._previous = self._previous, snapshot
+        if previous is None:
+            return []
+        stats = snapshot.compare_to(previous, "lineno")[:limit]
+        return [(self._where(stat.traceback), stat.size, stat.size_diff) for stat in stats]
+
+    @staticmethod
+    def _where(traceback: tracemalloc.Traceback) -> str:
+        frame = traceback[0]
+        return f"{frame.filename}:{frame.lineno}"
+
+    def get_formatted_summary(self) -> str:
+        rss = rss_bytes()
+        lines = [f"Memory: RSS {_size(rss) if rss is not None else 'unknown'}"]
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"Traced by Python: {_size(current)} (peak {_size(peak)})")
+        else:
+            lines.append("Tracing: off (mem start to begin)")
+        return "\n".join(lines)
+
+    def get_formatted_top(self, limit: int = 10) -> str:
+        lines = [f"Top {limit} lines by memory"]
+        for where, size, count in self.top(limit):
+            lines.append(f"  {_size(size):>10}  {count:>7} blocks  {where}")
+        return "\n".join(lines)
+
+    def get_formatted_diff(self, limit: int = 10) -> str:
+        entries = self.diff(limit)
+        if not entries:
+            return "Memory growth: no previous snapshot"
+        lines = ["Memory growth since the last snapshot"]
+        for where, size, size_diff in entries:
+            lines.append(f"  {size_diff / 1024:>+10.1f} KiB  (now {_size(size)})  {where}")
+        return "\n".join(lines)
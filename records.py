@@ -0,0 +1,178 @@
+"""
+Registros compactos de canciones y listas
+
+Con 100k canciones, metadata.json cargado como dict de dicts gasta más en la
+estructura de cada dict que en los datos. Song guarda los campos conocidos en
+__slots__ (sin __dict__ por instancia) y Playlist guarda sus canciones como
+array('I') de índices en vez de una lista de cadenas.
+
+Los IDs de canción siguen siendo cadenas (hay IDs numéricos, "12", y de
+YouTube, "dQw4w9WgXcQ"), pero se internan con sys.intern: una sola copia de
+cada cadena, compartida por los metadatos, las listas y la lista en
+reproducción. Para las listas, SongIds asigna además a cada ID un entero
+estable durante la sesión (solo a los IDs que aparecen en alguna lista).
+
+Los formatos en disco no cambian: from_json()/to_json() convierten desde y
+hacia las entradas de metadata.json y los documentos {'name', 'songs'} de
+playlist_format.
+"""
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+class SongIds:
+    """Interna IDs de canción: cadena <-> entero (solo crece, una entrada por ID visto)"""
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._lock = threading.Lock()
+
+    def index(self, song_id: str) -> int:
+        index = self._index.get(song_id)
+        if index is None:
+            with self._lock:
+                index = self._index.get(song_id)
+                if index is None:
+                    song_id = sys.intern(str(song_id))
+                    index = self._index[song_id] = len(self._ids)
+                    self._ids.append(song_id)
+        return index
+
+    def find(self, song_id: str) -> Optional[int]:
+        """Entero de song_id, o None si nunca se ha visto (sin añadirlo)"""
+        return self._index.get(song_id)
+
+    def intern(self, song_id: str) -> str:
+        """La copia compartida de song_id"""
+        return self._ids[self.index(song_id)]
+
+    def song_id(self, index: int) -> str:
+        return self._ids[index]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+SONG_IDS = SongIds()
+
+
+class Song:
+    """Entrada de metadata.json: título, fecha de alta y lo que calculan los análisis"""
+
+    FIELDS = ("title", "added_date", "loudness", "gain_db", "duration")
+    __slots__ = ("id",) + FIELDS + ("extra",)
+
+    def __init__(self, song_id: str, title: Optional[str] = None, added_date: Optional[str] = None,
+                 loudness: Optional[float] = None, gain_db: Optional[float] = None,
+                 duration: Optional[float] = None, extra: Optional[Dict[str, Any]] = None):
+        self.id = sys.intern(str(song_id))
+        self.title = title
+        self.added_date = added_date
+        self.loudness = loudness
+        self.gain_db = gain_db
+        self.duration = duration
+        # Campos que esta versión no conoce (se conservan tal cual); None si no hay
+        self.extra = extra or None
+
+    @property
+    def display_title(self) -> str:
+        return self.title or f"Canción {self.id}"
+
+    def update(self, **fields):
+        """Cambia campos por nombre (los desconocidos van a extra)"""
+        for key, value in fields.items():
+            if key in self.FIELDS:
+                setattr(self, key, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def copy(self) -> "Song":
+        return Song(self.id, self.title, self.added_date, self.loudness, self.gain_db, self.duration,
+                    dict(self.extra) if self.extra else None)
+
+    @classmethod
+    def from_json(cls, song_id: str, entry: Dict[str, Any]) -> "Song":
+        known = {key: entry[key] for key in cls.FIELDS if key in entry}
+        extra = {key: value for key, value in entry.items() if key not in cls.FIELDS}
+        return cls(song_id, extra=extra, **known)
+
+    def to_json(self) -> Dict[str, Any]:
+        entry = {key: getattr(self, key) for key in self.FIELDS if getattr(self, key) is not None}
+        if self.extra:
+            entry.update(self.extra)
+        return entry
+
+    def __repr__(self):
+        return f"Song({self.id!r}, {self.title!r})"
+
+
+def songs_from_json(document: Any) -> Dict[str, Song]:
+    """metadata.json -> {song_id: Song}"""
+    if not isinstance(document, dict):
+        return {}
+    songs = (Song.from_json(song_id, entry or {}) for song_id, entry in document.items())
+    return {song.id: song for song in songs}
+
+
+def songs_to_json(songs: Dict[str, Song]) -> Dict[str, Dict[str, Any]]:
+    """{song_id: Song} -> metadata.json"""
+    return {song_id: song.to_json() for song_id, song in songs.items()}
+
+
+class Playlist:
+    """
+    Lista de reproducción: nombre y canciones como índices de SONG_IDS
+
+    Se recorre como la lista de IDs de siempre (len, in, for, índices);
+    songs devuelve una lista nueva y asignarle una lista la sustituye entera.
+    """
+
+    __slots__ = ("name", "_members")
+
+    def __init__(self, name: str = "", songs: Iterable[str] = ()):
+        self.name = name
+        self._members = array("I", (SONG_IDS.index(song_id) for song_id in songs))
+
+    @property
+    def songs(self) -> List[str]:
+        song_id = SONG_IDS.song_id
+        return [song_id(index) for index in self._members]
+
+    @songs.setter
+    def songs(self, songs: Iterable[str]):
+        self._members = array("I", (SONG_IDS.index(song_id) for song_id in songs))
+
+    def discard(self, *song_ids: str):
+        """Quita todas las apariciones de esas canciones"""
+        gone = {SONG_IDS.find(song_id) for song_id in song_ids} - {None}
+        if gone:
+            self._members = array("I", (index for index in self._members if index not in gone))
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __iter__(self) -> Iterator[str]:
+        song_id = SONG_IDS.song_id
+        return (song_id(index) for index in self._members)
+
+    def __getitem__(self, position: int) -> str:
+        return SONG_IDS.song_id(self._members[position])
+
+    def __contains__(self, song_id) -> bool:
+        index = SONG_IDS.find(song_id)
+        return index is not None and index in self._members
+
+    @classmethod
+    def from_json(cls, document: Dict[str, Any]) -> "Playlist":
+        return cls(document.get("name", ""), document.get("songs") or ())
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"name": self.name, "songs": self.songs}
+
+    def __repr__(self):
+        return f"Playlist({self.name!r}, {len(self)} songs)"
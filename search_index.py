@@ -0,0 +1,193 @@
+"""
+Búsqueda de texto sobre los títulos de la biblioteca
+
+Índice invertido en memoria: cada título se divide en palabras normalizadas
+(minúsculas, sin tildes) y cada palabra apunta a las canciones que la
+contienen. Las palabras del vocabulario se guardan además ordenadas, así que
+buscar por prefijo es una búsqueda binaria más un recorrido del rango que
+coincide. Si una palabra de la consulta no aparece ni como prefijo, se prueba
+con las palabras del vocabulario que comparten trigramas con ella y están a
+distancia de edición 1 o 2 (errores de tecleo).
+
+El índice se actualiza canción a canción al guardar o borrar metadatos; no
+se reconstruye en cada consulta.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+
+# Puntuación de cada forma de coincidir una palabra de la consulta
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+
+
+def normalize(text: str) -> str:
+    """Minúsculas y sin tildes ("Canción" -> "cancion")"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(normalize(text))
+
+
+def _trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Distancia de Levenshtein, cortando en cuanto supera limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _sort_key(song_id: str):
+    return (0, int(song_id), "") if song_id.isdigit() else (1, 0, song_id)
+
+
+class SearchIndex:
+    """Índice invertido de títulos con búsqueda por prefijo y aproximada"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._titles: Dict[str, str] = {}  # song_id -> título
+        self._doc_tokens: Dict[str, Set[str]] = {}  # song_id -> palabras del título
+        self._postings: Dict[str, Set[str]] = defaultdict(set)  # palabra -> song_ids
+        self._vocabulary: List[str] = []  # palabras ordenadas (búsqueda por prefijo)
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)  # trigrama -> palabras
+
+    def __len__(self):
+        return len(self._titles)
+
+    # ========== Mantenimiento ==========
+
+    def rebuild(self, titles: Iterable[Tuple[str, str]]):
+        """Reconstruye el índice completo a partir de pares (song_id, título)"""
+        with self._lock:
+            self._titles.clear()
+            self._doc_tokens.clear()
+            self._postings = defaultdict(set)
+            self._trigram_index = defaultdict(set)
+            for song_id, title in titles:
+                tokens = set(tokenize(title))
+                self._titles[song_id] = title
+                self._doc_tokens[song_id] = tokens
+                for token in tokens:
+                    self._postings[token].add(song_id)
+            self._vocabulary = sorted(self._postings)
+            for token in self._vocabulary:
+                for gram in _trigrams(token):
+                    self._trigram_index[gram].add(token)
+
+    def add(self, song_id: str, title: str):
+        """Añade una canción o actualiza su título"""
+        with self._lock:
+            self.remove(song_id)
+            tokens = set(tokenize(title))
+            self._titles[song_id] = title
+            self._doc_tokens[song_id] = tokens
+            for token in tokens:
+                postings = self._postings[token]
+                if not postings:
+                    insort(self._vocabulary, token)
+                    for gram in _trigrams(token):
+                        self._trigram_index[gram].add(token)
+                postings.add(song_id)
+
+    def remove(self, song_id: str):
+        with self._lock:
+            tokens = self._doc_tokens.pop(song_id, None)
+            self._titles.pop(song_id, None)
+            for token in tokens or ():
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                postings.discard(song_id)
+                if not postings:
+                    del self._postings[token]
+                    pos = bisect_left(self._vocabulary, token)
+                    if pos < len(self._vocabulary) and self._vocabulary[pos] == token:
+                        del self._vocabulary[pos]
+                    for gram in _trigrams(token):
+                        self._trigram_index[gram].discard(token)
+
+    # ========== Búsqueda ==========
+
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + "\uffff", start)
+        return self._vocabulary[start:end]
+
+    def _fuzzy_tokens(self, word: str) -> List[str]:
+        limit = 1 if len(word) <= 4 else 2
+        grams = _trigrams(word)
+        counts = defaultdict(int)
+        for gram in grams:
+            for token in self._trigram_index.get(gram, ()):
+                counts[token] += 1
+        # Con distancia d se pierden como mucho 3*d trigramas
+        needed = max(1, len(grams) - 3 * limit)
+        return [token for token, shared in counts.items()
+                if shared >= needed and _edit_distance(word, token, limit) <= limit]
+
+    def _match_word(self, word: str) -> Dict[str, float]:
+        """song_id -> puntuación para una palabra de la consulta"""
+        tokens = self._prefix_tokens(word)
+        if tokens:
+            scores = dict.fromkeys(set().union(*(self._postings[token] for token in tokens)), PREFIX_SCORE)
+            # La palabra exacta, si existe, es la primera del rango
+            if tokens[0] == word:
+                scores.update(dict.fromkeys(self._postings[word], EXACT_SCORE))
+            return scores
+        if len(word) < 3:
+            return {}
+        fuzzy = self._fuzzy_tokens(word)
+        return dict.fromkeys(set().union(*(self._postings[token] for token in fuzzy)), FUZZY_SCORE)
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Tuple[str, str]]:
+        """
+        Busca canciones cuyo título contenga todas las palabras de la consulta
+
+        Cada palabra puede coincidir entera, como prefijo o con un pequeño error.
+
+        Returns:
+            [(song_id, título)] de más a menos relevante
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        with self._lock:
+            total = None
+            # Primero las palabras más largas (suelen ser las más selectivas)
+            for word in sorted(words, key=len, reverse=True):
+                scores = self._match_word(word)
+                if total is None:
+                    total = scores
+                else:
+                    total = {song_id: score + scores[song_id]
+                             for song_id, score in total.items() if song_id in scores}
+                if not total:
+                    return []
+            key = lambda item: (-item[1], len(self._titles[item[0]]), _sort_key(item[0]))
+            if limit is None:
+                ranked = sorted(total.items(), key=key)
+            else:
+                ranked = heapq.nsmallest(limit, total.items(), key=key)
+            return [(song_id, self._titles[song_id]) for song_id, _ in ranked]
@@ -0,0 +1,266 @@
+"""
+Listas inteligentes: listas definidas por reglas en lugar de por IDs
+
+Una lista inteligente solo guarda su nombre y sus reglas; las canciones se
+calculan cuando se van a mostrar o reproducir, y nunca se escriben en Lists/.
+Las reglas se evalúan contra índices en memoria (resúmenes diarios del
+historial de reproducciones, fechas de alta ordenadas y duraciones guardadas
+en los metadatos), sin recorrer los archivos de la biblioteca. El resultado se
+guarda en caché hasta que cambia el historial, los metadatos o la lista.
+
+Reglas (se cumplen todas a la vez):
+    most_played:7d   las más escuchadas en los últimos 7 días (de más a menos)
+    played:7d        escuchadas en los últimos 7 días
+    not_played:30d   no escuchadas en los últimos 30 días
+    never_played     nunca escuchadas
+    added:7d         añadidas en los últimos 7 días (las más nuevas primero)
+    duration<4m      duración menor que 4 minutos (también >, y segundos: 240 o 240s)
+    limit:50         como mucho 50 canciones
+
+Los periodos aceptan días (7 o 7d) y semanas (2w). Las reglas de escuchas
+cuentan días completos (7d incluye todo el día de hace 7 días) y las canciones
+saltadas no cuentan como escuchadas.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from listing import numeric_key
+from records import Song
+from storage import JsonStore
+
+DAY = 24 * 3600
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"  # formato de added_date en los metadatos
+
+RULES = ("most_played", "played", "not_played", "never_played", "added", "duration", "limit")
+# Cuánto tiempo se reutiliza un resultado si no cambia nada (las ventanas se mueven con el reloj)
+CACHE_SECONDS = 60
+
+Rule = Tuple[str, str, float]  # (regla, operador, valor)
+
+_RULE = re.compile(r"^(?P<name>[a-z_]+)(?:(?P<op>[:<>])(?P<value>.+))?$")
+
+
+def _parse_period(value: str) -> float:
+    """'7', '7d' o '2w' -> segundos"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([dw]?)", value)
+    if not match:
+        raise ValueError(f"Periodo no válido: {value} (usa por ejemplo 7d o 2w)")
+    return float(match.group(1)) * DAY * (7 if match.group(2) == "w" else 1)
+
+
+def _parse_duration(value: str) -> float:
+    """'240', '240s', '4m' o '3m30s' -> segundos"""
+    match = re.fullmatch(r"(?:(\d+)m)?(?:(\d+)s?)?", value)
+    if not value or not match:
+        raise ValueError(f"Duración no válida: {value} (usa por ejemplo 240, 240s o 4m)")
+    return int(match.group(1) or 0) * 60 + int(match.group(2) or 0)
+
+
+def parse_rules(tokens: Iterable[str]) -> List[Rule]:
+    """
+    Interpreta las reglas de una lista inteligente
+
+    Raises:
+        ValueError: con un mensaje para el usuario si alguna regla no es válida
+    """
+    rules = []
+    for token in tokens:
+        match = _RULE.match(token.lower())
+        name = match.group("name") if match else token
+        if name not in RULES:
+            raise ValueError(f"Regla desconocida: {token} (reglas: {', '.join(RULES)})")
+        op, value = (match.group("op"), match.group("value")) if match else (None, None)
+        if name == "never_played":
+            if op:
+                raise ValueError("never_played no lleva valor")
+            rules.append((name, "", 0.0))
+        elif name == "duration":
+            if op not in ("<", ">"):
+                raise ValueError("Usa duration<valor o duration>valor")
+            rules.append((name, op, float(_parse_duration(value))))
+        elif op != ":":
+            raise ValueError(f"Usa {name}:valor")
+        elif name == "limit":
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError("limit debe ser un número mayor que 0")
+            rules.append((name, op, float(value)))
+        else:
+            rules.append((name, op, _parse_period(value)))
+    if not rules:
+        raise ValueError("Indica al menos una regla")
+    return rules
+
+
+class SongFacts:
+    """
+    Datos de los metadatos que usan las reglas, ya indexados
+
+    Las fechas de alta se guardan ordenadas ("añadidas en los últimos N días"
+    es una búsqueda binaria) y las duraciones en un diccionario. Se actualiza
+    canción a canción al guardar o borrar metadatos.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._added: List[Tuple[str, str]] = []  # (added_date, song_id) ordenado
+        self._added_of: Dict[str, str] = {}
+        self.durations: Dict[str, float] = {}
+        self.version = 0
+
+    def rebuild(self, metadata: Dict[str, Song]):
+        with self._lock:
+            self._added_of = {song_id: song.added_date for song_id, song in metadata.items() if song.added_date}
+            self._added = sorted((date, song_id) for song_id, date in self._added_of.items())
+            self.durations = {song_id: song.duration for song_id, song in metadata.items() if song.duration}
+            self.version += 1
+
+    def update(self, song_id: str, song: Song):
+        with self._lock:
+            self.remove(song_id)
+            if song.added_date:
+                self._added_of[song_id] = song.added_date
+                insort(self._added, (song.added_date, song_id))
+            if song.duration:
+                self.durations[song_id] = song.duration
+            self.version += 1
+
+    def remove(self, song_id: str):
+        with self._lock:
+            date = self._added_of.pop(song_id, None)
+            if date is not None:
+                pos = bisect_left(self._added, (date, song_id))
+                if pos < len(self._added) and self._added[pos] == (date, song_id):
+                    del self._added[pos]
+            self.durations.pop(song_id, None)
+            self.version += 1
+
+    def added_since(self, since: float) -> List[str]:
+        """Canciones añadidas desde el instante since, las más nuevas primero"""
+        bound = time.strftime(DATE_FORMAT, time.localtime(since))
+        with self._lock:
+            start = bisect_left(self._added, (bound, ""))
+            return [song_id for _, song_id in reversed(self._added[start:])]
+
+
+def evaluate(rules: List[Rule], history, facts: SongFacts, all_songs: Callable[[], List[str]],
+             duration_of: Callable[[str], Optional[float]], now: Optional[float] = None) -> List[str]:
+    """
+    Canciones que cumplen las reglas, en el orden que marcan
+
+    Args:
+        history: PlayHistory
+        all_songs: IDs de la biblioteca (del índice en memoria, sin tocar el disco)
+        duration_of: duración de una canción que aún no la tiene en los metadatos
+    """
+    now = time.time() if now is None else now
+    counts = None
+    candidates = None  # conjunto acotado por las reglas que generan candidatos
+    for name, _, value in rules:
+        if name in ("most_played", "played"):
+            window = history.counts_since(now - value)
+            if name == "most_played":
+                counts = window
+            found = set(window)
+        elif name == "added":
+            found = set(facts.added_since(now - value))
+        else:
+            continue
+        candidates = found if candidates is None else candidates & found
+
+    library = set(all_songs())
+    songs = library if candidates is None else candidates & library
+    for name, op, value in rules:
+        if name == "never_played":
+            songs -= history.played_ids()
+        elif name == "not_played":
+            songs -= set(history.counts_since(now - value))
+        elif name == "duration":
+            durations = facts.durations
+            kept = set()
+            for song_id in songs:
+                duration = durations.get(song_id) or duration_of(song_id)
+                if duration and (duration < value if op == "<" else duration > value):
+                    kept.add(song_id)
+            songs = kept
+
+    if counts is not None:
+        ordered = sorted(songs, key=lambda song_id: (-counts[song_id], numeric_key(song_id)))
+    elif any(name == "added" for name, _, _ in rules):
+        ordered = [song_id for song_id in facts.added_since(0) if song_id in songs]
+    else:
+        ordered = sorted(songs, key=numeric_key)
+
+    limits = [int(value) for name, _, value in rules if name == "limit"]
+    return ordered[:min(limits)] if limits else ordered
+
+
+class SmartPlaylists:
+    """
+    Definiciones de las listas inteligentes ({id: {"name": ..., "rules": [...]}}) y sus resultados en caché
+
+    Args:
+        path: archivo JSON con las definiciones
+        history: PlayHistory
+        facts: SongFacts (se debe mantener al día desde fuera)
+        all_songs: IDs de la biblioteca
+        duration_of: duración de una canción que aún no la tiene en los metadatos
+    """
+
+    def __init__(self, path: str, history, facts: SongFacts, all_songs: Callable[[], List[str]],
+                 duration_of: Callable[[str], Optional[float]]):
+        self.store = JsonStore(path, ensure_ascii=False, indent=2)
+        self.history = history
+        self.facts = facts
+        self._all_songs = all_songs
+        self._duration_of = duration_of
+        self._cache: Dict[str, Tuple[tuple, float, List[str]]] = {}  # id -> (clave, instante, canciones)
+
+    @staticmethod
+    def normalize_id(smart_id: str) -> str:
+        """'3', '3s' o '3S' -> '3S'"""
+        if smart_id[-1:] in ("s", "S"):
+            smart_id = smart_id[:-1]
+        return f"{smart_id}S"
+
+    def all(self) -> Dict[str, dict]:
+        return self.store.data
+
+    def get(self, smart_id: str) -> Optional[dict]:
+        return self.store.data.get(self.normalize_id(smart_id))
+
+    def create(self, name: str, tokens: Iterable[str]) -> str:
+        """Crea una lista inteligente; devuelve su ID (ValueError si las reglas no son válidas)"""
+        tokens = [token.lower() for token in tokens]
+        parse_rules(tokens)
+        with self.store.batch():
+            ids = [int(smart_id[:-1]) for smart_id in self.store.data if smart_id[:-1].isdigit()]
+            smart_id = f"{max(ids, default=0) + 1}S"
+            self.store.set(smart_id, {"name": name, "rules": tokens})
+        return smart_id
+
+    def delete(self, smart_id: str) -> bool:
+        smart_id = self.normalize_id(smart_id)
+        self._cache.pop(smart_id, None)
+        return self.store.delete(smart_id)
+
+    def songs(self, smart_id: str) -> Optional[List[str]]:
+        """Canciones actuales de una lista inteligente (None si no existe)"""
+        smart_id = self.normalize_id(smart_id)
+        definition = self.store.data.get(smart_id)
+        if definition is None:
+            return None
+        now = time.time()
+        cached = self._cache.get(smart_id)
+        if cached and cached[0] == self._cache_key(definition) and now - cached[1] < CACHE_SECONDS:
+            return list(cached[2])
+        songs = evaluate(parse_rules(definition["rules"]), self.history, self.facts,
+                         self._all_songs, self._duration_of, now)
+        # La clave se toma después de evaluar (guardar luego las duraciones medidas la invalida una vez)
+        self._cache[smart_id] = (self._cache_key(definition), now, songs)
+        return list(songs)
+
+    def _cache_key(self, definition: dict) -> tuple:
+        return tuple(definition["rules"]), self.history.version, self.facts.version
@@ -0,0 +1,261 @@
+"""
+Capa de persistencia compartida para los archivos JSON de PyMusic
+
+Todas las escrituras completas pasan por atomic_write_json o atomic_write_text:
+se escribe en un archivo temporal junto al destino, se hace fsync y se
+renombra encima del original, de modo que un corte a mitad de escritura deja
+siempre la versión anterior intacta. append_text añade al final de un archivo
+con una sola escritura, para los formatos de registro (listas v2). JsonStore
+mantiene un documento en memoria y permite agrupar varios cambios en una sola
+escritura (group commit).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+import profiling
+from logs import get_logger
+
+log = get_logger("storage")
+
+TEMP_SUFFIX = ".tmp"
+
+# Un cerrojo por archivo destino: el temporal tiene nombre fijo (<archivo>.tmp)
+# para que la recuperación al arrancar no tenga que recorrer carpetas
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _path_locks_guard:
+        lock = _path_locks.get(path)
+        if lock is None:
+            lock = _path_locks[path] = threading.Lock()
+        return lock
+
+
+def _fsync_dir(directory: str):
+    """Persiste la entrada de directorio tras el rename (no disponible en Windows)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path: str, write: Callable[[Any], None]):
+    path = os.path.abspath(path)
+    temp_path = path + TEMP_SUFFIX
+    with _lock_for(path):
+        with open(temp_path, "w", encoding="utf-8") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+            written = os.fstat(f.fileno()).st_size
+        os.replace(temp_path, path)
+        _fsync_dir(os.path.dirname(path))
+    profiling.count("file_writes")
+    profiling.count("bytes_written", written)
+
+
+def remove_temp(path: str) -> bool:
+    """Borra el temporal que dejó una escritura interrumpida de path (sin pisar una en curso)"""
+    path = os.path.abspath(path)
+    with _lock_for(path):
+        try:
+            os.remove(path + TEMP_SUFFIX)
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def atomic_write_json(path: str, data: Any, **dump_kwargs):
+    """Escribe JSON de forma atómica: temporal + fsync + rename"""
+    _atomic_write(path, lambda f: json.dump(data, f, **dump_kwargs))
+
+
+def atomic_write_text(path: str, text: str):
+    """Escribe un archivo de texto de forma atómica: temporal + fsync + rename"""
+    _atomic_write(path, lambda f: f.write(text))
+
+
+def append_text(path: str, text: str):
+    """
+    Añade texto al final de un archivo con una sola escritura + fsync
+
+    Un corte a mitad solo puede dejar la última línea incompleta (sin salto de
+    línea final); los lectores deben ignorarla. Antes de añadir se recorta esa
+    línea incompleta para que no se junte con la primera línea nueva.
+    """
+    path = os.path.abspath(path)
+    data = text.encode("utf-8")
+    with _lock_for(path):
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size:
+                os.lseek(fd, max(0, size - 4096), os.SEEK_SET)
+                tail = os.read(fd, 4096)
+                if not tail.endswith(b"\n"):
+                    os.ftruncate(fd, size - len(tail) + tail.rfind(b"\n") + 1)
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    profiling.count("file_writes")
+    profiling.count("bytes_written", len(data))
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """Lee un JSON; devuelve default si el archivo no existe"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profiling.count("file_reads")
+            profiling.count("json_loads")
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def recover_json(path: str, rebuild: Optional[Callable[[], Any]] = None, **dump_kwargs) -> str:
+    """
+    Comprobación de arranque para un archivo JSON
+
+    Elimina el temporal que haya dejado una escritura interrumpida y valida el
+    archivo. Si está dañado se aparta como <archivo>.corrupt-<timestamp> (para
+    no perder los datos) y, si se indica, se reconstruye con rebuild().
+
+    Returns:
+        'ok', 'missing', 'rebuilt' o 'quarantined'
+    """
+    temp_path = path + TEMP_SUFFIX
+    if os.path.exists(temp_path):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+    if not os.path.exists(path):
+        if rebuild is None:
+            return "missing"
+        atomic_write_json(path, rebuild(), **dump_kwargs)
+        return "rebuilt"
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profiling.count("file_reads")
+            profiling.count("json_loads")
+            json.load(f)
+        return "ok"
+    except (ValueError, UnicodeDecodeError):
+        pass
+
+    quarantine = f"{path}.corrupt-{int(time.time())}"
+    os.replace(path, quarantine)
+    log.warning(f"⚠ {os.path.basename(path)} estaba dañado; copia guardada en {os.path.basename(quarantine)}")
+    if rebuild is None:
+        return "quarantined"
+    atomic_write_json(path, rebuild(), **dump_kwargs)
+    return "rebuilt"
+
+
+class JsonStore:
+    """
+    Documento JSON mantenido en memoria con escrituras atómicas
+
+    El documento se relee si el archivo cambia en disco (por ejemplo, si el
+    usuario edita metadata.json a mano). Dentro de batch() las llamadas a
+    save() solo marcan el documento como pendiente y se escribe una vez al salir.
+
+    decode/encode convierten entre el JSON del archivo y el objeto que se
+    mantiene en memoria (por ejemplo, registros de records.py).
+    """
+
+    def __init__(self, path: str, default: Callable[[], Any] = dict,
+                 decode: Optional[Callable[[Any], Any]] = None, encode: Optional[Callable[[Any], Any]] = None,
+                 **dump_kwargs):
+        self.path = path
+        self._default = default
+        self._decode = decode
+        self._encode = encode
+        self._dump_kwargs = dump_kwargs
+        self._lock = threading.RLock()
+        self._data = None
+        self._mtime = None
+        self._batch_depth = 0
+        self._dirty = False
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    @property
+    def data(self):
+        """Documento actual (el mismo objeto mientras no cambie en disco)"""
+        with self._lock:
+            if self._dirty:
+                return self._data
+            mtime = self._current_mtime()
+            if self._data is None or mtime != self._mtime:
+                self._data = read_json(self.path, None)
+                if self._data is None:
+                    self._data = self._default()
+                elif self._decode:
+                    self._data = self._decode(self._data)
+                self._mtime = mtime
+            return self._data
+
+    def save(self):
+        """Guarda el documento (o lo deja pendiente si hay un batch abierto)"""
+        with self._lock:
+            self._dirty = True
+            if self._batch_depth == 0:
+                self._commit()
+
+    def set(self, key, value):
+        with self._lock:
+            self.data[key] = value
+            self.save()
+
+    def delete(self, key) -> bool:
+        with self._lock:
+            if key not in self.data:
+                return False
+            del self.data[key]
+            self.save()
+            return True
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa todos los save() del bloque en una sola escritura
+
+        El cerrojo se mantiene durante todo el bloque: otro hilo no puede
+        guardar (ni codificar el documento) mientras este lo modifica. Los
+        lectores de data también esperan, así que el trabajo lento (decodificar,
+        convertir) se hace antes y el bloque solo aplica los resultados.
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self._commit()
+
+    def _commit(self):
+        document = self._encode(self._data) if self._encode else self._data
+        atomic_write_json(self.path, document, **self._dump_kwargs)
+        self._mtime = self._current_mtime()
+        self._dirty = False
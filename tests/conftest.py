@@ -0,0 +1,35 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Los módulos de PyMusic están en la raíz del repositorio (y los backends falsos en benchmarks/)
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (REPO_DIR, os.path.join(REPO_DIR, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def player(tmp_path, monkeypatch):
+    """MusicPlayer sobre una biblioteca sintética de 10 canciones y una lista (1L)"""
+    from library import generate_library
+    from main import MusicPlayer
+
+    # user_stats.json se crea en el directorio actual
+    monkeypatch.chdir(tmp_path)
+    generate_library(str(tmp_path), 10, 1, 5)
+    music_player = MusicPlayer(base_dir=str(tmp_path))
+    yield music_player
+    music_player.library.stop()
+
+
+@pytest.fixture
+def store_is_free():
+    """Comprueba desde otro hilo que se puede leer el documento de un JsonStore sin esperar"""
+    def check(store, timeout=1.0):
+        done = threading.Event()
+        threading.Thread(target=lambda: (store.data, done.set()), daemon=True).start()
+        return done.wait(timeout)
+    return check
@@ -0,0 +1,60 @@
+import io
+import subprocess
+import sys
+import time
+
+import audio_output
+from audio_output import WavOutput
+from playback_clock import PlaybackClock
+
+# Un "decodificador" que emite N tramas estéreo de silencio
+_DECODER = "import sys\nsys.stdout.buffer.write(bytes(4 * int(sys.argv[1])))\n"
+
+
+def _wait_until_done(output, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while output.get_busy() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_clock_follows_the_frames_written(monkeypatch, tmp_path):
+    monkeypatch.setattr(audio_output, "_start_decoder",
+                        lambda source, frequency, channels, start=0.0:
+                        subprocess.Popen([sys.executable, "-c", _DECODER, str(frequency * 3)],
+                                         stdout=subprocess.PIPE))
+    output = WavOutput(str(tmp_path / "out.wav"), frequency=1000)
+    clock = PlaybackClock(output.time_source)
+    output.load(str(tmp_path / "song.mp3"))
+    clock.start()
+    output.play()
+    _wait_until_done(output)
+    output.close()
+
+    assert output.rendered_seconds == 3.0
+    assert clock.position == 3.0 and clock.listened == 3.0
+
+
+def test_play_passes_start_to_the_decoder(monkeypatch, tmp_path):
+    commands = []
+
+    class _Decoder:
+        def __init__(self, command, **kwargs):
+            commands.append(command)
+            self.stdout = io.BytesIO()
+
+        def kill(self):
+            pass
+
+        def wait(self):
+            return 0
+
+    monkeypatch.setattr(audio_output.subprocess, "Popen", _Decoder)
+    output = WavOutput(str(tmp_path / "out.wav"))
+    output.load(str(tmp_path / "song.mp3"))
+    output.play(start=42.5)
+    output.play()
+    output.close()
+
+    assert commands[0][commands[0].index("-ss") + 1] == "42.500"
+    assert commands[0].index("-ss") < commands[0].index("-i")
+    assert "-ss" not in commands[1]
@@ -0,0 +1,61 @@
+import sys
+import threading
+import types
+
+import crossfade
+from crossfade import CrossfadeEngine
+
+
+class _Index:
+    duration = 183.7
+
+
+def _engine(monkeypatch, decode):
+    fake_pygame = types.ModuleType("pygame")
+    fake_pygame.mixer = types.SimpleNamespace(get_init=lambda: (44100, -16, 2),
+                                              Sound=lambda buffer: ("sound", len(buffer)))
+    monkeypatch.setitem(sys.modules, "pygame", fake_pygame)
+    monkeypatch.setattr(crossfade, "decode_window", decode)
+    player = types.SimpleNamespace(current_song_id="7", current_song_duration=183, songs_dir="/songs",
+                                   _frame_index=lambda song_id: _Index())
+    return CrossfadeEngine(player, seconds=5)
+
+
+def test_tail_window_uses_exact_duration(monkeypatch):
+    calls = []
+    engine = _engine(monkeypatch, lambda path, start, seconds, *a: calls.append((start, seconds)) or b"\0" * 8)
+    engine._prepare("7")
+    engine._decoder.shutdown(wait=True)
+    assert calls == [(183.7 - 5, 5)]
+    assert engine._tail == ("7", ("sound", 8))
+
+
+def test_prepare_does_not_block_the_scheduler_thread(monkeypatch):
+    release = threading.Event()
+
+    def slow_decode(*args):
+        release.wait(5)
+        return b"\0" * 8
+
+    engine = _engine(monkeypatch, slow_decode)
+    done = threading.Event()
+    threading.Thread(target=lambda: (engine._prepare("7"), done.set()), daemon=True).start()
+    assert done.wait(1)
+    assert engine._tail is None
+    release.set()
+    engine._decoder.shutdown(wait=True)
+    assert engine._tail is not None
+
+
+def test_tail_of_a_song_that_already_changed_is_dropped(monkeypatch):
+    engine = _engine(monkeypatch, lambda *a: b"\0" * 8)
+    player = engine._player
+
+    def decode(*args):
+        player.current_song_id = "8"
+        return b"\0" * 8
+
+    monkeypatch.setattr(crossfade, "decode_window", decode)
+    engine._prepare("7")
+    engine._decoder.shutdown(wait=True)
+    assert engine._tail is None
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+import fake_backends
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """yt_dlp falso sin latencias; se retira de sys.modules al terminar"""
+    config = fake_backends.FakeConfig(search_latency=0, download_latency=0, api_latency=0)
+    fake = fake_backends.FakeYtDlp(config, fake_backends.StageTimer())
+    module = fake.make_module()
+    monkeypatch.setitem(sys.modules, "yt_dlp", module)
+    if "downloader" in sys.modules:
+        monkeypatch.setattr(sys.modules["downloader"], "yt_dlp", module)
+    # Las pausas fijas tras cada descarga no cambian el resultado
+    monkeypatch.setattr("main.time.sleep", lambda _: None)
+    return fake
+
+
+def _fail_first(monkeypatch, backend, attempts):
+    results = iter([True] * attempts)
+    monkeypatch.setattr(backend, "chance", lambda probability: next(results, False))
+
+
+def test_failed_strategy_falls_back_to_the_next(player, backend, monkeypatch):
+    _fail_first(monkeypatch, backend, 2)
+    songs = len(player.metadata.data)
+
+    song_id = player.download_youtube_video("https://www.youtube.com/watch?v=abc")
+
+    assert song_id is not None
+    assert os.path.exists(os.path.join(player.songs_dir, f"{song_id}.mp3"))
+    assert len(player.metadata.data) == songs + 1
+    assert backend.timer.counters == {"failed_attempts": 2, "downloads": 1}
+    assert not player.downloading
+
+
+def test_all_strategies_failing_returns_none(player, backend):
+    backend.config.failure_rate = 1.0
+    songs = sorted(os.listdir(player.songs_dir))
+
+    assert player.download_youtube_video("https://www.youtube.com/watch?v=abc") is None
+    assert sorted(os.listdir(player.songs_dir)) == songs
+    # Se prueba cada estrategia una vez
+    assert backend.timer.counters == {"failed_attempts": 4}
+
+
+def test_cancel_discards_the_download(player, backend, monkeypatch):
+    songs = sorted(os.listdir(player.songs_dir))
+    download = backend.download
+
+    def cancelled(url, opts):
+        info = download(url, opts)
+        player.cancel_download = True
+        return info
+
+    monkeypatch.setattr(backend, "download", cancelled)
+
+    assert player.download_youtube_video("https://www.youtube.com/watch?v=abc") is None
+    assert sorted(os.listdir(player.songs_dir)) == songs
+    assert backend.timer.counters["downloads"] == 1
+    assert not player.cancel_download
+
+
+def test_download_by_name_failure_rate(player, backend):
+    backend.add_track("Blue Sky", "The Nobodies")
+
+    assert player.downloader.download_by_name("Blue Sky", "The Nobodies") is not None
+    backend.config.failure_rate = 1.0
+    assert player.downloader.download_by_name("Blue Sky", "The Nobodies") is None
+    assert backend.timer.counters == {"downloads": 1, "failed_attempts": 1}
+    assert backend.timer.samples["search"]
@@ -0,0 +1,67 @@
+import pytest
+
+import fingerprint
+import main
+from fingerprint import FingerprintIndex
+
+
+def test_rename_does_not_fingerprint_again(player, monkeypatch):
+    monkeypatch.setattr(main, "FINGERPRINT_ON_IMPORT", True)
+    monkeypatch.setattr(main, "NORMALIZE_LOUDNESS", False)
+    jobs = []
+    monkeypatch.setattr(player, "_submit_analysis", lambda task, song_id: jobs.append((task.__name__, song_id)))
+    player.fingerprints.store.set("3", {"mtime": player.library.song_mtime("3"), "fp": ""})
+
+    assert player.rename_song("3", "Hola")
+    assert player.get_song_title("3") == "Hola"
+    assert jobs == []
+
+    # Sin huella guardada (o con el audio cambiado) sí se calcula
+    player.rename_song("4", "Adiós")
+    assert jobs == [("_fingerprint_song", "4")]
+
+
+@pytest.fixture
+def np():
+    return pytest.importorskip("numpy")
+
+
+def _fp(np, seed, frames=400):
+    return np.random.default_rng(seed).integers(0, 2 ** 32, frames, dtype=np.uint32)
+
+
+def test_add_and_remove_update_the_index_in_place(tmp_path, np):
+    index = FingerprintIndex(str(tmp_path / "fingerprints.json"))
+    for i in range(3):
+        index.add(str(i), _fp(np, i), 1.0)
+    assert index.match(_fp(np, 1))[0][0] == "1"
+    lookup = index._lookup
+
+    index.add("9", _fp(np, 9), 1.0)
+    assert index._lookup is lookup
+    assert index.match(_fp(np, 9))[0][0] == "9"
+
+    # Volver a añadir una canción sustituye sus entradas
+    index.add("9", _fp(np, 10), 2.0)
+    assert index.match(_fp(np, 9)) == []
+    assert index.match(_fp(np, 10))[0][0] == "9"
+
+    assert index.remove("1")
+    assert index._lookup is lookup
+    assert index.match(_fp(np, 1)) == []
+    assert all(entry[0] != "1" for entries in lookup.values() for entry in entries)
+
+
+def test_build_many_decodes_outside_the_store_lock(tmp_path, np, monkeypatch, store_is_free):
+    index = FingerprintIndex(str(tmp_path / "fingerprints.json"))
+    free = []
+
+    def fingerprint_file(path):
+        free.append(store_is_free(index.store))
+        return _fp(np, int(path))
+
+    monkeypatch.setattr(fingerprint, "fingerprint_file", fingerprint_file)
+
+    assert index.build_many({str(i): (str(i), 1.0) for i in range(4)}, workers=2) == 4
+    assert free == [True] * 4
+    assert sorted(index.store.data) == ["0", "1", "2", "3"]
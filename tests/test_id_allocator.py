@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+# Cada proceso reserva IDs desde varios hilos, con next() y con reserve(), y los imprime en JSON
+_WORKER = """
+import json, os, sys, threading
+sys.path.insert(0, sys.argv[1])
+from id_allocator import IdSequence
+
+songs_dir = sys.argv[2]
+sequence = IdSequence(os.path.join(songs_dir, "counter.json"), "next_id",
+                      is_taken=lambda song_id: os.path.exists(os.path.join(songs_dir, song_id + ".mp3")))
+ids = []
+lock = threading.Lock()
+
+def allocate():
+    for i in range(20):
+        got = sequence.reserve(3) if i % 2 else [sequence.next()]
+        with lock:
+            ids.extend(got)
+
+threads = [threading.Thread(target=allocate) for _ in range(4)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+print(json.dumps(ids))
+"""
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_ids_are_unique_across_threads_and_processes(tmp_path):
+    taken = {"3", "7", "50"}
+    for song_id in taken:
+        (tmp_path / f"{song_id}.mp3").write_bytes(b"")
+
+    workers = [subprocess.Popen([sys.executable, "-c", _WORKER, REPO_DIR, str(tmp_path)],
+                                stdout=subprocess.PIPE, text=True) for _ in range(4)]
+    ids = []
+    for worker in workers:
+        out, _ = worker.communicate(timeout=60)
+        assert worker.returncode == 0
+        ids.extend(json.loads(out))
+
+    # 4 procesos x 4 hilos x (10 next() + 10 reserve(3))
+    assert len(ids) == 4 * 4 * 40
+    assert len(set(ids)) == len(ids)
+    assert not taken & set(ids)
+    # Sin huecos salvo los IDs que ya existían
+    assert sorted(map(int, ids)) == [n for n in range(1, len(ids) + len(taken) + 1) if str(n) not in taken]
+    with open(tmp_path / "counter.json", encoding="utf-8") as f:
+        assert json.load(f)["next_id"] == len(ids) + len(taken) + 1
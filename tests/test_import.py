@@ -0,0 +1,26 @@
+import os
+import shutil
+
+import main
+
+
+def test_folder_import_converts_outside_the_metadata_lock(player, tmp_path, monkeypatch, store_is_free):
+    folder = tmp_path / "nuevas"
+    folder.mkdir()
+    for name in ("Uno", "Dos", "Tres"):
+        shutil.copy(os.path.join(player.songs_dir, "1.mp3"), folder / f"{name}.mp3")
+    free = []
+    copy = shutil.copy2
+
+    def checked_copy(source, target):
+        free.append(store_is_free(player.metadata))
+        return copy(source, target)
+
+    monkeypatch.setattr(shutil, "copy2", checked_copy)
+    monkeypatch.setattr(main, "FINGERPRINT_ON_IMPORT", False)
+    monkeypatch.setattr(main, "NORMALIZE_LOUDNESS", False)
+
+    imported = player._import_from_folder(str(folder))
+
+    assert free == [True, True, True]
+    assert sorted(player.metadata.data[song_id].title for song_id in imported) == ["Dos", "Tres", "Uno"]
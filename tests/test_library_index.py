@@ -0,0 +1,76 @@
+import os
+import threading
+
+import library_index
+from library_index import LibraryIndex
+
+
+def _library(tmp_path, songs=("1.mp3", "2.mp3", "3.mp3")):
+    songs_dir, lists_dir = tmp_path / "Songs", tmp_path / "Lists"
+    songs_dir.mkdir()
+    lists_dir.mkdir()
+    for name in songs:
+        (songs_dir / name).write_bytes(b"")
+    return LibraryIndex(str(songs_dir), str(lists_dir))
+
+
+class _VanishingEntry:
+    """DirEntry de un archivo borrado entre scandir() y stat()"""
+
+    def __init__(self, entry):
+        self.name = entry.name
+
+    def is_file(self):
+        return True
+
+    def stat(self):
+        raise FileNotFoundError(self.name)
+
+
+def test_rescan_skips_entry_deleted_during_scan(tmp_path, monkeypatch):
+    index = _library(tmp_path)
+    real_scandir = os.scandir
+
+    class Scan:
+        def __init__(self, path):
+            self._it = real_scandir(path)
+
+        def __enter__(self):
+            return (_VanishingEntry(e) if e.name == "2.mp3" else e for e in self._it)
+
+        def __exit__(self, *exc):
+            self._it.close()
+
+    monkeypatch.setattr(library_index.os, "scandir", Scan)
+    index.rescan()
+    index._ready.set()
+    assert sorted(index.song_files()) == ["1.mp3", "3.mp3"]
+
+
+def test_unreadable_folder_keeps_previous_index(tmp_path, monkeypatch):
+    index = _library(tmp_path)
+    index.rescan()
+    index._ready.set()
+
+    def denied(path):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(library_index.os, "scandir", denied)
+    index.rescan()
+    assert sorted(index.song_files()) == ["1.mp3", "2.mp3", "3.mp3"]
+
+
+def test_failed_initial_scan_does_not_block_queries(tmp_path, monkeypatch):
+    index = _library(tmp_path)
+
+    def broken(key=None):
+        raise OSError("disco no disponible")
+
+    monkeypatch.setattr(index, "rescan", broken)
+    monkeypatch.setattr(threading, "excepthook", lambda args: None)
+    index.start()
+    try:
+        assert index._ready.wait(2)
+        assert index.song_files() == []
+    finally:
+        index.stop()
@@ -0,0 +1,99 @@
+import subprocess
+import sys
+
+import main
+import mix_export
+from records import Playlist
+
+# Un "decodificador" que emite la ruta como PCM: N tramas estéreo con el valor V ("V:N"), o falla con "fail"
+_DECODER = ("import sys, struct\n"
+            "if sys.argv[1] == 'fail': sys.exit(1)\n"
+            "value, frames = map(int, sys.argv[1].split(':'))\n"
+            "sys.stdout.buffer.write(struct.pack('<h', value) * 2 * frames)\n")
+_ENCODER = "import shutil, sys\nshutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], 'wb'))\n"
+
+
+def _fake_ffmpeg(monkeypatch):
+    monkeypatch.setattr(mix_export, "_decoder_command",
+                        lambda path, gain_db, frequency, channels: [sys.executable, "-c", _DECODER, path])
+    monkeypatch.setattr(mix_export, "_open_encoder",
+                        lambda target, *args: subprocess.Popen([sys.executable, "-c", _ENCODER, target],
+                                                               stdin=subprocess.PIPE, stderr=subprocess.PIPE))
+
+
+def test_streams_tracks_in_chunks_in_order(monkeypatch, tmp_path):
+    _fake_ffmpeg(monkeypatch)
+    monkeypatch.setattr(mix_export, "CHUNK_BYTES", 4096)
+    monkeypatch.setattr(mix_export, "PREFETCH_CHUNKS", 2)
+    target = tmp_path / "mix.raw"
+    tracks = [("1", "100:50000", None), ("2", "fail", None), ("3", "-7:30000", None)]
+
+    result = mix_export.export_mix(tracks, str(target), workers=2, frequency=1000)
+
+    data = target.read_bytes()
+    assert len(data) == 80000 * 4
+    assert data[:4] == data[50000 * 4 - 4:50000 * 4] == (100).to_bytes(2, "little", signed=True) * 2
+    assert data[-4:] == (-7).to_bytes(2, "little", signed=True) * 2
+    assert result["skipped"] == ["2"] and result["tracks"] == 2
+    assert result["seconds"] == 80.0
+
+
+def test_crossfade_keeps_only_the_window(monkeypatch, tmp_path):
+    _fake_ffmpeg(monkeypatch)
+    monkeypatch.setattr(mix_export, "CHUNK_BYTES", 4096)
+    target = tmp_path / "mix.raw"
+    # El segundo tema no dura el doble del fundido: se pega sin fundir, como en vivo
+    tracks = [("1", "1000:10000", None), ("2", "2000:10000", None), ("3", "3000:1500", None)]
+
+    result = mix_export.export_mix(tracks, str(target), crossfade=1.0, frequency=1000)
+
+    data = target.read_bytes()
+    assert len(data) == (10000 + 9000 + 1500) * 4
+    ramp = data[9000 * 4:10000 * 4]
+    first = int.from_bytes(ramp[:2], "little", signed=True)
+    last = int.from_bytes(ramp[-2:], "little", signed=True)
+    assert first == 1000 and 1990 <= last <= 2000
+    assert data[19000 * 4:19000 * 4 + 2] == (3000).to_bytes(2, "little", signed=True)
+    assert result["seconds"] == 20.5
+
+
+def test_default_workers_are_capped(monkeypatch, tmp_path):
+    _fake_ffmpeg(monkeypatch)
+    monkeypatch.setattr(mix_export.os, "cpu_count", lambda: 64)
+    started = []
+    original = mix_export._TrackStream
+
+    def counting(*args):
+        started.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(mix_export, "_TrackStream", counting)
+    tracks = [(str(i), "1:10", None) for i in range(10)]
+    seen = []
+
+    mix_export.export_mix(tracks, str(tmp_path / "mix.raw"), frequency=1000,
+                          on_track=lambda position, song_id, ok: seen.append(len(started)))
+
+    # Al escribir la primera canción solo se han lanzado DEFAULT_WORKERS + 1 decodificadores
+    assert seen[0] == mix_export.DEFAULT_WORKERS + 1
+    assert len(started) == 10
+
+
+def test_export_leaves_headroom_like_the_player(player, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "NORMALIZE_LOUDNESS", True)
+    monkeypatch.setattr(main, "NORMALIZE_HEADROOM_DB", 6.0)
+    gains = {"1": 12.0, "2": 3.0, "3": -4.0}
+    for song_id, entry in player.metadata.data.items():
+        entry.gain_db = gains.get(song_id)
+    player._save_playlist("1L", Playlist("mezcla", ["1", "2", "3", "4"]))
+    exported = []
+
+    def export(tracks, target, **kwargs):
+        exported.extend(tracks)
+        return {"tracks": len(tracks), "skipped": [], "seconds": 0.0, "elapsed_s": 0.0}
+
+    monkeypatch.setattr(mix_export, "export_mix", export)
+    player.export_mix("1", str(tmp_path / "mix.mp3"))
+
+    applied = {song_id: gain_db for song_id, _path, gain_db in exported}
+    assert applied == {"1": 0.0, "2": -3.0, "3": -10.0, "4": -6.0}
@@ -0,0 +1,55 @@
+import os
+import time
+
+from play_history import PlayHistory
+
+
+def _history(tmp_path, **kwargs):
+    return PlayHistory(str(tmp_path / "play_history.jsonl"), **kwargs)
+
+
+def test_idle_player_flushes_on_timer(tmp_path):
+    history = _history(tmp_path, flush_seconds=0.1)
+    history.record("1", 30.0)
+    assert not os.path.exists(history.path)
+    deadline = time.monotonic() + 2
+    while not os.path.exists(history.path) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    with open(history.path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+
+
+def test_rollups_written_only_on_close_or_interval(tmp_path):
+    history = _history(tmp_path, flush_events=1)
+    history.record("1", 30.0)
+    history.record("2", 40.0)
+    assert os.path.exists(history.path)
+    assert not os.path.exists(history.rollups_path)
+    history.close()
+    assert os.path.exists(history.rollups_path)
+
+    frequent = _history(tmp_path, flush_events=1, rollups_seconds=0)
+    frequent.record("3", 10.0)
+    assert frequent.totals()["plays"] == 3
+
+
+def test_unsaved_rollups_are_rebuilt_from_the_log(tmp_path):
+    history = _history(tmp_path, flush_events=1)
+    history.record("1", 30.0)
+    history.close()
+    history.record("1", 30.0)
+    history.record("2", 15.0, skipped=True)
+    # Sin close(): los resúmenes en disco se quedaron en la primera escucha
+    reopened = _history(tmp_path)
+    assert reopened.plays("1") == 2
+    assert reopened.totals() == {"plays": 2, "seconds": 75.0}
+
+
+def test_forget_is_saved_immediately(tmp_path):
+    history = _history(tmp_path, flush_events=1)
+    history.record("1", 30.0)
+    history.record("2", 30.0)
+    history.forget("1")
+    reopened = _history(tmp_path)
+    assert reopened.plays("1") == 0
+    assert reopened.plays("2") == 1
@@ -0,0 +1,90 @@
+import json
+import os
+
+import playlist_format
+from playlist_format import append_ops, convert_directory, needs_compaction, parse_v2, render_v2
+
+HEADER = json.dumps({"format": "pymusic-playlist", "version": 2, "name": "chill"}) + "\n"
+
+
+def test_replay_of_add_and_remove_operations():
+    # "-id" quita las apariciones anteriores; las que se añaden después se quedan
+    text = HEADER + "+1\n+2\n+1\n-1\n+3\n+1\n-9\n"
+    playlist, ops = parse_v2(text)
+    assert playlist == {"name": "chill", "songs": ["2", "3", "1"]}
+    assert ops == 7
+
+
+def test_torn_last_line_is_ignored():
+    playlist, ops = parse_v2(HEADER + "+1\n+2\n+3")
+    assert playlist["songs"] == ["1", "2"] and ops == 2
+    playlist, ops = parse_v2(HEADER + "+1\n-")
+    assert playlist["songs"] == ["1"] and ops == 1
+
+
+def test_append_trims_a_torn_line_before_writing(tmp_path):
+    path = str(tmp_path / "1L.list")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER + "+1\n+2\n+3")
+    assert append_ops(path, added=["4"], removed=["1"]) == 2
+    playlist, ops = playlist_format.read(path)
+    assert playlist["songs"] == ["2", "4"]
+    assert ops == 4
+
+
+def test_compaction_threshold_and_rewrite(tmp_path, monkeypatch):
+    monkeypatch.setattr(playlist_format, "COMPACT_MIN_OPS", 4)
+    assert not needs_compaction(4, 1)
+    assert needs_compaction(5, 1)
+    assert not needs_compaction(10, 5)
+    assert needs_compaction(11, 5)
+
+    path = str(tmp_path / "1L.list")
+    playlist_format.write_v2(path, {"name": "chill", "songs": ["1"]})
+    for _ in range(3):
+        append_ops(path, added=["2"], removed=["2"])
+    playlist, ops = playlist_format.read(path)
+    assert playlist["songs"] == ["1", "2"] and needs_compaction(ops, len(playlist["songs"]))
+    # Compactar es reescribir el estado con una línea "+id" por canción
+    playlist_format.write_v2(path, playlist)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == render_v2(playlist) == HEADER + "+1\n+2\n"
+    assert playlist_format.read(path) == (playlist, 2)
+
+
+def test_player_compacts_a_long_log(player, monkeypatch):
+    monkeypatch.setattr(playlist_format, "COMPACT_MIN_OPS", 4)
+    path = os.path.join(player.lists_dir, "1L.list")
+    songs = player._load_playlist("1L").songs
+    for _ in range(6):
+        player.edit_playlist("1", "remove", songs[0])
+        player.edit_playlist("1", "add", songs[0])
+    _, ops = playlist_format.read(path)
+    # Sin compactar serían len(songs) + 12 operaciones
+    assert ops <= 2 * len(songs) < len(songs) + 12
+    assert sorted(player._load_playlist("1L").songs) == sorted(songs)
+
+
+def test_convert_v1_to_v2_and_back(tmp_path):
+    lists_dir = str(tmp_path)
+    playlists = {"1L": {"name": "uno", "songs": ["3", "1", "2"]}, "2L": {"name": "dós", "songs": []}}
+    for playlist_id, playlist in playlists.items():
+        playlist_format.write_v1(os.path.join(lists_dir, playlist_id + ".json"), playlist)
+
+    assert convert_directory(lists_dir, 2) == ["1L", "2L"]
+    assert sorted(os.listdir(lists_dir)) == ["1L.list", "2L.list"]
+    assert convert_directory(lists_dir, 2) == []
+    assert {p: playlist_format.read(os.path.join(lists_dir, p + ".list"))[0] for p in playlists} == playlists
+
+    assert convert_directory(lists_dir, 1) == ["1L", "2L"]
+    assert sorted(os.listdir(lists_dir)) == ["1L.json", "2L.json"]
+    assert {p: playlist_format.read(os.path.join(lists_dir, p + ".json"))[0] for p in playlists} == playlists
+
+
+def test_convert_prefers_v2_when_both_exist(tmp_path):
+    lists_dir = str(tmp_path)
+    playlist_format.write_v1(os.path.join(lists_dir, "1L.json"), {"name": "viejo", "songs": ["1"]})
+    playlist_format.write_v2(os.path.join(lists_dir, "1L.list"), {"name": "nuevo", "songs": ["2"]})
+    assert convert_directory(lists_dir, 2) == ["1L"]
+    assert os.listdir(lists_dir) == ["1L.list"]
+    assert playlist_format.read(os.path.join(lists_dir, "1L.list"))[0]["name"] == "nuevo"
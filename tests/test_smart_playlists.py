@@ -0,0 +1,42 @@
+import time
+
+import main
+
+
+def test_rename_keeps_the_added_date(player):
+    player.metadata.data["3"].added_date = "2025-01-01 10:00:00"
+    player.smart_lists.create("nuevas", ["added:7d"])
+    player._ensure_song_facts()
+
+    assert player.rename_song("3", "Hola")
+    assert player.metadata.data["3"].added_date == "2025-01-01 10:00:00"
+    assert "3" not in player.smart_songs("1S")
+
+
+def test_new_songs_get_an_added_date(player, monkeypatch):
+    monkeypatch.setattr(main, "FINGERPRINT_ON_IMPORT", False)
+    monkeypatch.setattr(main, "NORMALIZE_LOUDNESS", False)
+    player.metadata.delete("3")
+    player.save_song_metadata("3", "Nueva")
+    assert player.metadata.data["3"].added_date.startswith(time.strftime("%Y-%m-%d"))
+
+
+def test_duration_rule_measures_outside_the_metadata_lock(player, monkeypatch, store_is_free):
+    for entry in player.metadata.data.values():
+        entry.duration = None
+    free = []
+
+    def measure(song_id):
+        free.append(store_is_free(player.metadata))
+        return 100 if int(song_id) % 2 else 300
+
+    monkeypatch.setattr(player, "get_song_duration", measure)
+    smart_id = player.smart_lists.create("cortas", ["duration<2m"])
+
+    assert player.smart_songs(smart_id) == ["1", "3", "5", "7", "9"]
+    assert free == [True] * 10
+    assert player.metadata.data["2"].duration == 300
+    # La segunda vez las duraciones ya están en los metadatos
+    free.clear()
+    assert player.smart_songs(smart_id) == ["1", "3", "5", "7", "9"]
+    assert free == []
@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+
+import storage
+from storage import JsonStore, remove_temp
+
+
+def test_batch_blocks_other_writers_until_it_ends(tmp_path):
+    store = JsonStore(str(tmp_path / "metadata.json"))
+    inside, release = threading.Event(), threading.Event()
+    saved = threading.Event()
+
+    def writer():
+        inside.wait()
+        store.set("b", 2)
+        saved.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    with store.batch():
+        store.set("a", 1)
+        inside.set()
+        # El otro hilo no puede guardar mientras el batch está abierto
+        assert not saved.wait(0.2)
+        store.set("c", 3)
+    thread.join(2)
+    assert saved.is_set()
+    with open(store.path, encoding="utf-8") as f:
+        assert json.load(f) == {"a": 1, "b": 2, "c": 3}
+
+
+def test_nested_batches_write_once(tmp_path, monkeypatch):
+    store = JsonStore(str(tmp_path / "metadata.json"))
+    writes = []
+    real = storage.atomic_write_json
+    monkeypatch.setattr(storage, "atomic_write_json", lambda *a, **k: (writes.append(a[0]), real(*a, **k)))
+    with store.batch():
+        store.set("a", 1)
+        with store.batch():
+            store.set("b", 2)
+        assert writes == []
+    assert len(writes) == 1
+
+
+def test_remove_temp_waits_for_write_in_progress(tmp_path):
+    path = str(tmp_path / "1L.list")
+    temp = path + storage.TEMP_SUFFIX
+    with open(temp, "w") as f:
+        f.write("a medio escribir")
+    removed = threading.Event()
+    with storage._lock_for(os.path.abspath(path)):
+        thread = threading.Thread(target=lambda: (remove_temp(path), removed.set()))
+        thread.start()
+        assert not removed.wait(0.2)
+        assert os.path.exists(temp)
+    thread.join(2)
+    assert removed.is_set() and not os.path.exists(temp)
+    assert remove_temp(path) is False
@@ -0,0 +1,65 @@
+import pytest
+
+import loudness
+import main
+
+
+@pytest.fixture
+def normalized(player, monkeypatch):
+    monkeypatch.setattr(main, "NORMALIZE_LOUDNESS", True)
+    monkeypatch.setattr(main, "NORMALIZE_HEADROOM_DB", 6.0)
+    return player
+
+
+def test_default_volume_keeps_unity_gain(normalized):
+    normalized.volume = main.DEFAULT_VOLUME
+    normalized.metadata.data["1"].gain_db = None
+    normalized.metadata.data["2"].gain_db = 0.0
+    assert normalized._effective_volume("1") == pytest.approx(1.0)
+    assert normalized._effective_volume("2") == pytest.approx(1.0)
+    assert normalized._effective_volume(None) == pytest.approx(1.0)
+
+
+def test_negative_gain_lowers_loud_tracks_at_any_volume(normalized):
+    normalized.metadata.data["1"].gain_db = -6.0
+    normalized.volume = main.DEFAULT_VOLUME
+    assert normalized._effective_volume("1") == pytest.approx(loudness.gain_to_factor(-6.0))
+    normalized.volume = 0.5
+    assert normalized._effective_volume("1") == pytest.approx(0.5 * loudness.gain_to_factor(-6.0))
+
+
+def test_positive_gain_uses_the_room_below_full_volume(normalized):
+    normalized.volume = 0.25
+    normalized.metadata.data["1"].gain_db = 6.0
+    normalized.metadata.data["2"].gain_db = 12.0
+    normalized.metadata.data["3"].gain_db = 0.0
+    assert normalized._effective_volume("1") == pytest.approx(0.25 * loudness.gain_to_factor(6.0))
+    # Como mucho NORMALIZE_HEADROOM_DB de subida
+    assert normalized._effective_volume("2") == pytest.approx(normalized._effective_volume("1"))
+    assert normalized._effective_volume("3") == pytest.approx(0.25)
+    normalized.volume = main.DEFAULT_VOLUME
+    assert normalized._effective_volume("1") == pytest.approx(1.0)
+
+
+def test_without_normalization_gain_is_ignored(player, monkeypatch):
+    monkeypatch.setattr(main, "NORMALIZE_LOUDNESS", False)
+    player.metadata.data["1"].gain_db = -10.0
+    player.volume = 0.5
+    assert player._effective_volume("1") == pytest.approx(0.5)
+    player.volume = 1.5
+    assert player._effective_volume("1") == pytest.approx(1.0)
+
+
+def test_normalize_analyses_outside_the_metadata_lock(player, monkeypatch, store_is_free):
+    free = []
+
+    def analyze(path):
+        free.append(store_is_free(player.metadata))
+        return {"loudness": -20.0}
+
+    monkeypatch.setattr(loudness, "analyze", analyze)
+
+    assert player.normalize_library("all") == 10
+    assert free == [True] * 10
+    assert all(entry.gain_db == loudness.gain_for(-20.0, main.TARGET_LOUDNESS)
+               for entry in player.metadata.data.values())
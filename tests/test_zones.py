@@ -0,0 +1,36 @@
+import threading
+
+import main
+import user_stats
+from user_stats import UserStats
+
+
+def test_zone_shares_stats_and_cache_without_building_its_own(player, monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("la zona no debe crear sus propias estadísticas ni caché")
+
+    monkeypatch.setattr(main, "UserStats", unexpected)
+    monkeypatch.setattr(main, "AudioCache", unexpected)
+
+    zone = player.zones.add("cocina", "null")
+
+    assert zone.stats is player.stats
+    assert zone.audio_cache is player.audio_cache
+    assert zone.library is player.library
+
+
+def test_concurrent_increments_are_not_lost(tmp_path, monkeypatch):
+    monkeypatch.setattr(user_stats, "atomic_write_json", lambda *args, **kwargs: None)
+    stats = UserStats(str(tmp_path / "user_stats.json"))
+
+    def play():
+        for _ in range(500):
+            stats.increment("songs_played")
+
+    threads = [threading.Thread(target=play) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stats.get_stats()["songs_played"] == 4000
@@ -1,12 +1,20 @@
 
 import json
 import os
+import threading
 import time
 from typing import Dict, Any
+import profiling
+from logs import get_logger
+from storage import atomic_write_json
+
+log = get_logger("stats")
 
 class UserStats:
     def __init__(self, stats_file: str = "user_stats.json"):
         self.stats_file = stats_file
+        # El reproductor principal y sus zonas comparten la instancia desde varios hilos
+        self._lock = threading.RLock()
         self.stats = self._load_stats()
     
     def _load_stats(self) -> Dict[str, Any]:
@@ -27,30 +35,34 @@ class UserStats:
         try:
             if os.path.exists(self.stats_file):
                 with open(self.stats_file, 'r') as f:
+                    profiling.count("file_reads")
+                    profiling.count("json_loads")
                     return {**default_stats, **json.load(f)}
         except Exception as e:
-            print(f"Error cargando estadísticas: {e}")
+            log.error(f"Error cargando estadísticas: {e}")
         
         return default_stats
     
     def _save_stats(self):
         """Guarda las estadísticas en el archivo."""
-        self.stats["last_updated"] = int(time.time())
-        try:
-            with open(self.stats_file, 'w') as f:
-                json.dump(self.stats, f, indent=4)
-        except Exception as e:
-            print(f"Error guardando estadísticas: {e}")
+        with self._lock:
+            self.stats["last_updated"] = int(time.time())
+            try:
+                atomic_write_json(self.stats_file, self.stats, indent=4)
+            except Exception as e:
+                log.error(f"Error guardando estadísticas: {e}")
     
     def increment(self, stat_name: str, amount: int = 1):
         """Incrementa un contador de estadísticas."""
-        if stat_name in self.stats and isinstance(self.stats[stat_name], (int, float)):
-            self.stats[stat_name] += amount
-            self._save_stats()
+        with self._lock:
+            if stat_name in self.stats and isinstance(self.stats[stat_name], (int, float)):
+                self.stats[stat_name] += amount
+                self._save_stats()
     
     def get_stats(self) -> Dict[str, Any]:
         """Devuelve todas las estadísticas."""
-        return self.stats.copy()
+        with self._lock:
+            return self.stats.copy()
     
     def get_formatted_stats(self) -> str:
         """Devuelve las estadísticas formateadas como texto."""
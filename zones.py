@@ -0,0 +1,111 @@
+"""
+Zonas de reproducción: varias salas desde un solo proceso
+
+Cada zona es un MusicPlayer con su propia salida de audio (audio_output) y su
+propio estado de reproducción: lista, cola aleatoria, reloj, volumen y
+pausa. La biblioteca no se duplica: el índice de Songs/ y Lists/, los
+metadatos, el historial, las listas inteligentes, las estadísticas y la caché
+de audio son los del reproductor principal (MusicPlayer(shared=...)).
+
+Las descargas y la gestión de la biblioteca no pertenecen a ninguna zona:
+ZoneManager.run() solo manda a la zona los comandos de reproducción
+(ZONE_COMMANDS) y el resto los atiende el reproductor principal, así que hay
+un único flujo de descargas para todas las salas.
+"""
+import threading
+from typing import Dict, List
+
+from audio_output import open_output
+
+# Métodos de MusicPlayer que actúan sobre la reproducción de una zona
+ZONE_COMMANDS = {
+    "play_playlist", "play_song", "skip_song", "stop_playback", "toggle_pause", "resume_playback",
+    "set_volume", "seek", "set_crossfade", "smart_command",
+}
+
+
+class ZoneManager:
+    """
+    Zonas adicionales de un MusicPlayer (el principal suena por pygame.mixer.music)
+
+    Args:
+        player: reproductor principal, dueño de la biblioteca y de las descargas
+    """
+
+    def __init__(self, player):
+        self._player = player
+        self._zones: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, spec: str):
+        """Crea la zona name con la salida spec ("null", "device:<nombre>")"""
+        name = name.lower()
+        with self._lock:
+            if name in self._zones:
+                raise ValueError(f"La zona {name} ya existe")
+            output = open_output(spec)
+            zone = type(self._player)(output=output, shared=self._player)
+            zone.zone_name = name
+            self._zones[name] = zone
+            return zone
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            zone = self._zones.pop(name.lower(), None)
+        if zone is None:
+            return False
+        self._close(zone)
+        return True
+
+    @staticmethod
+    def _close(zone):
+        if zone.is_playing:
+            zone.stop_playback()
+        zone.mixer.close()
+
+    def get(self, name: str):
+        return self._zones.get(name.lower())
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._zones)
+
+    def run(self, name: str, command: str):
+        """Ejecuta command en la zona name (o en el principal si no es de reproducción)"""
+        zone = self.get(name)
+        if zone is None:
+            raise KeyError(name)
+        parts = command.split()
+        handler = zone.commands.get(parts[0].lower()) if parts else None
+        if handler is not None and handler.__name__ not in ZONE_COMMANDS:
+            return self._player.process_command(command)
+        return zone.process_command(command)
+
+    def status(self) -> List[Dict[str, object]]:
+        """Estado de cada zona: nombre, salida, canción, lista, volumen"""
+        rows = []
+        for name in self.names():
+            zone = self.get(name)
+            if zone is None:
+                continue
+            rows.append({
+                "name": name,
+                "output": zone.mixer.describe(),
+                "playing": bool(zone.is_playing),
+                "paused": bool(zone.is_paused),
+                "song_id": zone.current_song_id,
+                "song": zone.current_song_title,
+                "playlist": zone.current_playlist_name,
+                "position": round(zone.clock.position, 1) if zone.is_playing else 0,
+                "volume": zone.volume,
+            })
+        return rows
+
+    def stop_all(self):
+        with self._lock:
+            zones, self._zones = list(self._zones.values()), {}
+        for zone in zones:
+            self._close(zone)
+
+    def __len__(self) -> int:
+        return len(self._zones)